@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Command-line front end for Persian File Copier Pro
+Runs copy, sync, verify and scan jobs without a GUI and reports progress as JSON lines on stdout
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import copy_engine
+import task_scheduler
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+# Exit codes
+EXIT_OK = 0
+EXIT_FAILED = 1  # At least one task failed
+EXIT_USAGE = 2  # Bad arguments (argparse uses 2 as well)
+EXIT_MISMATCH = 3  # Verification found files that differ
+EXIT_INTERRUPTED = 130  # Stopped with Ctrl+C; checkpoints keep the progress
+
+COMMANDS = ("copy", "sync", "verify", "scan", "paste")
+
+# Files remembered by "copy FILE" (context menu) until "paste DESTINATION", resume checkpoints
+# and measured buffer sizes. They sit in the user's home folder because the command line is
+# started from any folder, and "paste" usually starts somewhere other than "copy".
+STATE_DIR = ".persian_file_copier"
+CLIPBOARD_FILE = "clipboard.json"
+CHECKPOINT_DIR = "checkpoints"
+TUNING_FILE = "buffer_tuning.json"
+
+# Commands that copy data and so may have measured better buffer sizes
+COPYING_COMMANDS = ("copy", "sync", "paste")
+
+
+class JsonReporter:
+    """Print one JSON object per line; safe to call from worker threads"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **fields):
+        line = json.dumps(dict(event=event, **fields), ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def progress(self, task: Dict):
+        self.emit("progress", task=task["id"], copied=task["copied"], size=task["size"],
+                  progress=round(task["progress"], 1), speed=round(task["speed"], 2))
+
+
+def is_cli_command(argv: List[str]) -> bool:
+    """Whether argv (without the program name) asks for a headless command"""
+    return bool(argv) and argv[0] in COMMANDS
+
+
+def load_settings(path: str) -> Dict:
+    """The GUI's settings file if there is one; the engine has defaults for everything else"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def current_drives() -> List[Dict]:
+    """Mounted drives for the device scheduler; without psutil every path counts as one unknown drive"""
+    if not PSUTIL_AVAILABLE:
+        return []
+    try:
+        return [{"device": p.device, "mountpoint": p.mountpoint, "fstype": p.fstype}
+                for p in psutil.disk_partitions(all=False)]
+    except Exception:
+        return []
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="copy_cli.py",
+        description="Persian File Copier Pro - headless copy engine"
+    )
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--settings", default="settings.json",
+                        help="settings file to read (default: settings.json)")
+    common.add_argument("--interval", type=float, default=1.0,
+                        help="seconds between progress lines per task (default: 1.0)")
+    common.add_argument("--quiet", action="store_true", help="no progress lines, only results")
+
+    copying = argparse.ArgumentParser(add_help=False)
+    copying.add_argument("--jobs", type=int, help="tasks running at once (default: max_threads)")
+    copying.add_argument("--rate", type=float, help="global bandwidth limit in MB/s (0 = unlimited)")
+    copying.add_argument("--no-verify", action="store_true", help="skip content verification")
+    copying.add_argument("--if-exists", choices=("skip", "overwrite", "update-delta"),
+                         help="what to do with existing destinations (default: overwrite_policy)")
+
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    commands.required = True
+
+    copy_parser = commands.add_parser("copy", parents=[common, copying],
+                                      help="copy files or folders into a destination folder")
+    copy_parser.add_argument("paths", nargs="+", metavar="PATH",
+                             help="sources followed by the destination folder; "
+                                  "a single path is remembered for a later paste")
+
+    sync_parser = commands.add_parser("sync", parents=[common, copying],
+                                      help="mirror a folder, copying only new and changed files")
+    sync_parser.add_argument("source")
+    sync_parser.add_argument("destination")
+    sync_parser.add_argument("--compare-hash", action="store_true",
+                             help="compare equal-sized files by content instead of modified time")
+    sync_parser.add_argument("--delete-extras", action="store_true",
+                             help="remove destination files that are not in the source")
+
+    verify_parser = commands.add_parser("verify", parents=[common],
+                                        help="compare a copy with its source")
+    verify_parser.add_argument("source")
+    verify_parser.add_argument("destination")
+    verify_parser.add_argument("--stop-on-first", action="store_true",
+                               help="stop at the first file that differs")
+
+    scan_parser = commands.add_parser("scan", parents=[common], help="count the files and bytes under a path")
+    scan_parser.add_argument("path")
+    scan_parser.add_argument("--files", action="store_true", help="also print one line per file")
+
+    paste_parser = commands.add_parser("paste", parents=[common, copying],
+                                       help="copy the paths remembered by 'copy PATH' into a folder")
+    paste_parser.add_argument("destination")
+    return parser
+
+
+def apply_overrides(settings: Dict, args: argparse.Namespace):
+    """Fold command-line options into the settings the engine reads"""
+    if getattr(args, "rate", None) is not None:
+        settings["global_rate_limit_mb"] = args.rate
+    if getattr(args, "no_verify", False):
+        settings["verify_copy"] = False
+    if getattr(args, "if_exists", None):
+        settings["overwrite_policy"] = args.if_exists
+    if getattr(args, "jobs", None):
+        settings["max_threads"] = args.jobs
+
+
+def run_tasks(engine: copy_engine.CopyEngine, tasks: List[copy_engine.CopyTask], reporter: JsonReporter,
+              interval: float, quiet: bool) -> int:
+    """Run tasks on the device scheduler and return the exit code"""
+    jobs = max(1, int(engine.settings.get("max_threads", 4)))
+    counts = {"completed": 0, "skipped": 0, "cancelled": 0, "paused": 0, "failed": 0, "mismatched": 0}
+    counts_lock = threading.Lock()
+
+    def on_file_error(path: str, error: Exception):
+        reporter.emit("file_error", path=path, error=str(error))
+
+    def run(task: Dict):
+        reporter.emit("start", task=task["id"], source=task["source"],
+                      destination=task["destination"], size=task["size"])
+        progress = None if quiet else (lambda: reporter.progress(task))
+        try:
+            result = engine.run_task(task, progress_callback=progress, on_error=on_file_error,
+                                     update_interval=interval)
+        except copy_engine.VerificationError as e:
+            reporter.emit("error", task=task["id"], error=str(e), mismatches=task["mismatches"])
+            with counts_lock:
+                counts["mismatched"] += 1
+            return
+        except Exception as e:
+            reporter.emit("error", task=task["id"], error=str(e))
+            with counts_lock:
+                counts["failed"] += 1
+            return
+        reporter.emit("done", task=task["id"], result=result, method=task["copy_method"],
+                      hash_algorithm=task["hash_algorithm"], hash=task["source_hash"])
+        with counts_lock:
+            counts[result] += 1
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        scheduler = task_scheduler.DeviceScheduler(
+            executor,
+            current_drives,
+            {
+                "hdd": engine.settings.get("hdd_concurrency", 1),
+                "ssd": engine.settings.get("ssd_concurrency", 4),
+                "network": engine.settings.get("network_concurrency", 2),
+                "unknown": engine.settings.get("ssd_concurrency", 4)
+            },
+            max_running=jobs,
+            order_of=lambda task: task["id"]
+        )
+        futures = [scheduler.submit(task, run) for task in tasks]
+        try:
+            for future in futures:
+                while not future.done():
+                    future.exception(timeout=0.5)  # Short waits keep Ctrl+C responsive
+        except KeyboardInterrupt:
+            # Stop like a cancel - running copies save their checkpoints
+            for task in tasks:
+                task["cancelled"] = True
+            for future in futures:
+                future.cancel()
+            reporter.emit("interrupted")
+            executor.shutdown(wait=True)
+            reporter.emit("summary", exit_code=EXIT_INTERRUPTED, **counts)
+            return EXIT_INTERRUPTED
+
+    if counts["failed"]:
+        exit_code = EXIT_FAILED
+    elif counts["mismatched"]:
+        exit_code = EXIT_MISMATCH
+    else:
+        exit_code = EXIT_OK
+    reporter.emit("summary", exit_code=exit_code, **counts)
+    return exit_code
+
+
+def make_tasks(sources: List[str], destination_for) -> List[copy_engine.CopyTask]:
+    tasks = []
+    for task_id, source in enumerate(sources):
+        source = os.path.abspath(source)
+        tasks.append(copy_engine.CopyTask(source, destination_for(source), copy_engine.path_size(source),
+                                          task_id, state=copy_engine.TaskState.RUNNING))
+    return tasks
+
+
+def command_copy(engine, args, reporter) -> int:
+    if len(args.paths) == 1:
+        # Context menu "copy": remember the path for a later paste
+        clipboard = read_clipboard()
+        path = os.path.abspath(args.paths[0])
+        if not os.path.exists(path):
+            reporter.emit("error", error=f"Source not found: {path}")
+            return EXIT_USAGE
+        if path not in clipboard:
+            clipboard.append(path)
+        write_clipboard(clipboard)
+        reporter.emit("clipboard", paths=clipboard)
+        return EXIT_OK
+
+    *sources, destination = args.paths
+    return copy_into(engine, sources, destination, args, reporter)
+
+
+def command_paste(engine, args, reporter) -> int:
+    sources = read_clipboard()
+    if not sources:
+        reporter.emit("error", error="Nothing to paste")
+        return EXIT_USAGE
+    exit_code = copy_into(engine, sources, args.destination, args, reporter)
+    if exit_code == EXIT_OK:
+        write_clipboard([])
+    return exit_code
+
+
+def copy_into(engine, sources: List[str], destination: str, args, reporter) -> int:
+    missing = [source for source in sources if not os.path.exists(source)]
+    if missing:
+        reporter.emit("error", error=f"Source not found: {', '.join(missing)}")
+        return EXIT_USAGE
+    destination = os.path.abspath(destination)
+    tasks = make_tasks(sources, lambda source: os.path.join(destination, os.path.basename(source)))
+    return run_tasks(engine, tasks, reporter, args.interval, args.quiet)
+
+
+def command_sync(engine, args, reporter) -> int:
+    if not os.path.isdir(args.source):
+        reporter.emit("error", error=f"Not a folder: {args.source}")
+        return EXIT_USAGE
+    engine.settings["sync_mode"] = True
+    engine.settings["sync_compare_hash"] = args.compare_hash
+    engine.settings["sync_delete_extras"] = args.delete_extras
+    destination = os.path.abspath(args.destination)
+    tasks = make_tasks([args.source], lambda source: destination)
+    return run_tasks(engine, tasks, reporter, args.interval, args.quiet)
+
+
+def command_verify(engine, args, reporter) -> int:
+    source = os.path.abspath(args.source)
+    if not os.path.exists(source):
+        reporter.emit("error", error=f"Source not found: {source}")
+        return EXIT_USAGE
+    engine.settings["verify_stop_on_first"] = args.stop_on_first
+    task = copy_engine.CopyTask(source, os.path.abspath(args.destination), copy_engine.path_size(source))
+    try:
+        matches = engine.verify(task)
+    except OSError as e:
+        reporter.emit("error", error=str(e))
+        return EXIT_FAILED
+    reporter.emit("verify", source=task["source"], destination=task["destination"], match=matches,
+                  mismatches=task["mismatches"], hash_algorithm=task["hash_algorithm"], hash=task["source_hash"])
+    return EXIT_OK if matches else EXIT_MISMATCH
+
+
+def command_scan(engine, args, reporter) -> int:
+    path = os.path.abspath(args.path)
+    if os.path.isfile(path):
+        directories, files = [], [(os.path.basename(path), os.path.getsize(path))]
+    elif os.path.isdir(path):
+        directories, files = copy_engine.scan_tree(path)
+    else:
+        reporter.emit("error", error=f"Not found: {path}")
+        return EXIT_USAGE
+    if args.files:
+        for relative_path, size in files:
+            reporter.emit("file", path=relative_path, size=size)
+    reporter.emit("scan", path=path, directories=len(directories), files=len(files),
+                  bytes=sum(size for _, size in files))
+    return EXIT_OK
+
+
+def state_path(name: str) -> str:
+    return os.path.join(os.path.expanduser("~"), STATE_DIR, name)
+
+
+def clipboard_path() -> str:
+    return state_path(CLIPBOARD_FILE)
+
+
+def read_clipboard() -> List[str]:
+    try:
+        with open(clipboard_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def write_clipboard(paths: List[str]):
+    path = clipboard_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(paths, f, ensure_ascii=False)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run one command and return its exit code"""
+    parser = build_parser()
+    try:
+        args = parser.parse_args(argv)
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else EXIT_USAGE
+
+    # Log records go to stderr so stdout stays pure JSON
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s: %(message)s", stream=sys.stderr)
+    reporter = JsonReporter()
+
+    try:
+        settings = load_settings(args.settings)
+    except (OSError, ValueError) as e:
+        reporter.emit("error", error=f"Cannot read settings: {e}")
+        return EXIT_USAGE
+    apply_overrides(settings, args)
+
+    engine = copy_engine.CopyEngine(settings, state_path(CHECKPOINT_DIR), state_path(TUNING_FILE),
+                                    logger=logging.getLogger("copy_cli"))
+    handlers = {
+        "copy": command_copy,
+        "paste": command_paste,
+        "sync": command_sync,
+        "verify": command_verify,
+        "scan": command_scan
+    }
+    try:
+        return handlers[args.command](engine, args, reporter)
+    finally:
+        if args.command in COPYING_COMMANDS:
+            try:
+                os.makedirs(os.path.dirname(engine.tuner.path), exist_ok=True)
+                engine.tuner.save()
+            except OSError:
+                pass
+        engine.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2320 @@
+"""
+Copy engine for Persian File Copier Pro
+Low-level file transfer routines used by the copy tasks
+"""
+
+import asyncio
+import errno
+import hashlib
+import json
+import logging
+import mmap
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from enum import Enum
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+# Kernel copies never pass through Python memory, so chunks can be large.
+# They are still bounded so pause/cancel and progress stay responsive.
+KERNEL_CHUNK_SIZE = 8 * 1024 * 1024  # 8MB
+
+# Striped copies hand out the file in ranges of this size, so fast workers take more of them
+STRIPE_SIZE = 64 * 1024 * 1024  # 64MB
+
+# Directory copies send files below the small-file threshold to the worker pool in batches
+SMALL_FILE_BATCH = 64
+
+# With the page-cache option on, copied ranges are dropped in windows of this size.
+# The destination lags one window behind so its pages have been written back first.
+CACHE_DROP_WINDOW = 32 * 1024 * 1024  # 32MB
+
+# Memory-mapped copies write the mapping out in slices of at least this size,
+# so the task row still gets progress updates
+MMAP_SLICE_SIZE = 4 * 1024 * 1024  # 4MB
+
+# Adaptive buffer sizing measures throughput over windows of this length and
+# moves the chunk size by powers of two inside these bounds
+TUNING_WINDOW = 0.5  # seconds
+TUNING_MIN_BUFFER = 32 * 1024  # 32KB
+TUNING_MAX_BUFFER = 16 * 1024 * 1024  # 16MB
+
+# O_DIRECT transfers need buffers, offsets and lengths aligned to the device block size.
+# Page alignment satisfies every common block device and is what anonymous mmaps give us.
+DIRECT_IO_SUPPORTED = hasattr(os, "O_DIRECT")
+DIRECT_IO_ALIGNMENT = mmap.PAGESIZE
+DIRECT_IO_MIN_CHUNK = 1024 * 1024  # 1MB - direct I/O needs big requests to reach device speed
+
+# Positional I/O lets several threads work on one file without sharing a file offset
+STRIPED_COPY_SUPPORTED = hasattr(os, "pread") and hasattr(os, "pwrite")
+
+# Content verification hashes the copied chunks as they stream past.
+# xxHash is far faster when installed; BLAKE2 is always available.
+HASH_ALGORITHMS = ("xxh3_128", "blake2b")
+DEFAULT_HASH_ALGORITHM = "xxh3_128" if XXHASH_AVAILABLE else "blake2b"
+HASH_CHUNK_SIZE = 1024 * 1024  # 1MB - read-back chunk size
+
+# Resumable copies record the committed prefix of each file at most every checkpoint interval.
+# Directory checkpoints list finished files and are rewritten at most this often.
+CHECKPOINT_INTERVAL = 256 * 1024 * 1024  # 256MB
+TREE_CHECKPOINT_SECONDS = 2.0
+
+# Delta updates compare source and destination in blocks of this size and rewrite only
+# the blocks that differ
+DELTA_BLOCK_SIZE = 1024 * 1024  # 1MB
+
+# Sync mode treats files as unchanged when sizes match and mtimes are this close.
+# FAT and exFAT only store modification times to 2 seconds.
+SYNC_MTIME_TOLERANCE = 2.0  # seconds
+
+# The asyncio engine keeps up to this many positional reads/writes in flight across all
+# tasks, each moving one chunk
+ASYNC_QUEUE_DEPTH = 32
+ASYNC_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# Rate limits are token buckets that hold at most this many seconds of traffic,
+# so an idle link may burst briefly but never bank a whole night of credit
+RATE_BURST_SECONDS = 1.0
+THROTTLE_SLICE = 0.1  # seconds - longest sleep between cancel checks while throttled
+
+# How hard the engine pushes written data to stable storage
+DURABILITY_POLICIES = ("none", "flush-at-end", "fsync-at-end", "fsync-every-N-MB")
+
+# Errors meaning "this kernel copy path is not available here" rather than a real I/O failure
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EBADF,
+    getattr(errno, "EOPNOTSUPP", errno.EINVAL),
+    getattr(errno, "ENOTSUP", errno.EINVAL),
+}
+
+
+class RateLimiter:
+    """Token bucket measured in bytes per second; a rate of 0 means unlimited.
+
+    Callers take tokens for what they move and may drive the bucket into debt,
+    then wait until it refills. The rate can change at any time and waiting
+    callers pick the new rate up on their next check.
+    """
+
+    def __init__(self, rate: float = 0):
+        self.rate = max(0.0, float(rate))
+        self._tokens = self.rate * RATE_BURST_SECONDS
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        if self.rate > 0:
+            self._tokens = min(self.rate * RATE_BURST_SECONDS, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def set_rate(self, rate: float):
+        rate = max(0.0, float(rate))
+        with self._lock:
+            if rate == self.rate:
+                return
+            self._refill(time.monotonic())
+            self.rate = rate
+            if rate == 0:
+                self._tokens = 0  # Unlimited - forget any debt
+            else:
+                self._tokens = min(self._tokens, rate * RATE_BURST_SECONDS)
+
+    def take(self, nbytes: int):
+        with self._lock:
+            if self.rate > 0:
+                self._refill(time.monotonic())
+                self._tokens -= nbytes
+
+    def wait_time(self) -> float:
+        """Seconds until the bucket is out of debt"""
+        with self._lock:
+            if self.rate <= 0:
+                return 0.0
+            self._refill(time.monotonic())
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+
+def parse_bandwidth_schedule(text: str) -> List[Tuple[int, int, float]]:
+    """Parse "22:00-06:00=0, 08:00-18:00=20" into (start minute, end minute, MB/s) windows.
+
+    A rate of 0 means unlimited. Windows may wrap past midnight; the first match wins.
+    """
+    windows = []
+    for item in text.replace(";", ",").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            span, rate = item.split("=")
+            start, end = span.split("-")
+            minutes = []
+            for clock in (start, end):
+                hours, mins = clock.strip().split(":")
+                hours, mins = int(hours), int(mins)
+                if not (0 <= hours <= 24 and 0 <= mins < 60) or hours * 60 + mins > 24 * 60:
+                    raise ValueError
+                minutes.append(hours * 60 + mins)
+            rate = float(rate)
+        except ValueError:
+            raise ValueError(f"Invalid bandwidth schedule entry: {item!r} (expected HH:MM-HH:MM=MB/s)")
+        if rate < 0:
+            raise ValueError(f"Invalid bandwidth schedule entry: {item!r} (rate must not be negative)")
+        windows.append((minutes[0], minutes[1], rate))
+    return windows
+
+
+def parse_destination_limits(text: str) -> Dict[str, float]:
+    """Parse "/mnt/nas=50; D:\\Backup=20" into {path prefix: MB/s}"""
+    limits = {}
+    for item in text.split(";"):
+        item = item.strip()
+        if not item:
+            continue
+        path, sep, rate = item.rpartition("=")
+        try:
+            rate = float(rate)
+        except ValueError:
+            rate = -1
+        if not sep or not path.strip() or rate < 0:
+            raise ValueError(f"Invalid destination limit: {item!r} (expected path=MB/s)")
+        limits[os.path.normpath(os.path.abspath(path.strip()))] = rate
+    return limits
+
+
+class Throttle:
+    """Shared bandwidth limits: one global bucket plus one per limited destination.
+
+    The global rate follows the time-of-day schedule when a window matches and the
+    configured limit otherwise. Every task copying under a limited destination path
+    draws from that destination's bucket. Per-task limits live on the task itself
+    (task["rate_limit_mb"]) and are applied by its ProgressMeter.
+    """
+
+    def __init__(self, global_rate_mb: float = 0, destination_limits: Optional[Dict[str, float]] = None,
+                 schedule: Optional[List[Tuple[int, int, float]]] = None):
+        self.global_limiter = RateLimiter()
+        self.destinations: Dict[str, RateLimiter] = {}
+        self.global_rate_mb = 0.0
+        self.schedule: List[Tuple[int, int, float]] = []
+        self._lock = threading.Lock()
+        self.configure(global_rate_mb, destination_limits, schedule)
+
+    @classmethod
+    def from_settings(cls, settings: Dict) -> "Throttle":
+        throttle = cls()
+        throttle.configure_from_settings(settings)
+        return throttle
+
+    def configure_from_settings(self, settings: Dict):
+        self.configure(
+            settings.get("global_rate_limit_mb", 0),
+            parse_destination_limits(settings.get("destination_rate_limits", "")),
+            parse_bandwidth_schedule(settings.get("bandwidth_schedule", ""))
+        )
+
+    def configure(self, global_rate_mb: float = 0, destination_limits: Optional[Dict[str, float]] = None,
+                  schedule: Optional[List[Tuple[int, int, float]]] = None):
+        """Apply new limits; copies already running slow down or speed up on their next chunk"""
+        with self._lock:
+            self.global_rate_mb = max(0.0, float(global_rate_mb))
+            self.schedule = list(schedule or [])
+            limits = destination_limits or {}
+            # Keep the buckets of unchanged destinations so their state carries over,
+            # and release copies still waiting on the buckets of removed ones
+            for path, limiter in self.destinations.items():
+                if path not in limits:
+                    limiter.set_rate(0)
+            self.destinations = {path: self.destinations.get(path) or RateLimiter() for path in limits}
+            for path, rate in limits.items():
+                self.destinations[path].set_rate(rate * 1024 * 1024)
+        self.global_limiter.set_rate(self.current_global_rate())
+
+    def current_global_rate(self, now: Optional[time.struct_time] = None) -> float:
+        """Global limit in bytes/s for the given local time"""
+        now = now or time.localtime()
+        minute = now.tm_hour * 60 + now.tm_min
+        rate = self.global_rate_mb
+        for start, end, window_rate in self.schedule:
+            inside = start <= minute < end if start <= end else (minute >= start or minute < end)
+            if inside:
+                rate = window_rate
+                break
+        return rate * 1024 * 1024
+
+    def limiters_for(self, task: Dict) -> List[RateLimiter]:
+        """The shared buckets a task's traffic counts against"""
+        self.global_limiter.set_rate(self.current_global_rate())
+        limiters = [self.global_limiter]
+        destination = os.path.normpath(os.path.abspath(task["destination"]))
+        best = None
+        with self._lock:
+            for path in self.destinations:
+                if destination == path or destination.startswith(path.rstrip("/\\") + os.sep):
+                    if best is None or len(path) > len(best):
+                        best = path
+            if best is not None:
+                limiters.append(self.destinations[best])
+        return limiters
+
+
+def throttle_delay(limiters: List[RateLimiter]) -> float:
+    return max((limiter.wait_time() for limiter in limiters), default=0.0)
+
+
+class ProgressMeter:
+    """Fold copied byte counts into a task's copied/progress/speed fields.
+
+    With a throttle, or a task["rate_limit_mb"] above 0, advance also holds the
+    copy back to the slowest applicable rate limit.
+    """
+
+    def __init__(self, task: Dict, callback: Optional[Callable[[], None]] = None,
+                 update_interval: float = 0.25, throttle: Optional[Throttle] = None):
+        self.task = task
+        self.callback = callback
+        self.update_interval = update_interval
+        self.copied_since_update = 0
+        self.throttle = throttle
+        self.task_limiter = RateLimiter()  # Per-task limit, re-read from the task on every chunk
+        self._lock = threading.Lock()  # Striped copies advance one meter from several threads
+
+    def advance(self, nbytes: int, pace: bool = True):
+        """Record nbytes as copied and publish progress when the interval elapsed"""
+        with self._lock:
+            self.task["copied"] += nbytes
+            self.copied_since_update += nbytes
+
+            current_time = time.time()
+            if current_time - self.task["last_update"] >= self.update_interval:
+                self.flush(current_time)
+
+        if pace:
+            self.pace(nbytes)
+
+    def reserve(self, nbytes: int) -> List[RateLimiter]:
+        """Take nbytes from every applicable bucket and return them"""
+        self.task_limiter.set_rate(self.task.get("rate_limit_mb", 0) * 1024 * 1024)
+        limiters = self.throttle.limiters_for(self.task) if self.throttle else []
+        if self.task_limiter.rate > 0:
+            limiters.append(self.task_limiter)
+        for limiter in limiters:
+            limiter.take(nbytes)
+        return limiters
+
+    def pace(self, nbytes: int):
+        """Sleep until the buckets nbytes was charged to are out of debt"""
+        limiters = self.reserve(nbytes)
+        while limiters and not self.task["cancelled"]:
+            delay = throttle_delay(limiters)
+            if delay <= 0:
+                break
+            time.sleep(min(delay, THROTTLE_SLICE))
+
+    def flush(self, current_time: Optional[float] = None):
+        """Publish speed and progress for the bytes copied since the last update"""
+        task = self.task
+        current_time = current_time or time.time()
+        elapsed = current_time - task["last_update"]
+        if elapsed > 0:
+            task["speed"] = (self.copied_since_update / (1024 * 1024)) / elapsed  # MB/s
+        task["progress"] = (task["copied"] / task["size"]) * 100 if task["size"] > 0 else 0
+        task["last_update"] = current_time
+        self.copied_since_update = 0
+
+        if self.callback:
+            self.callback()
+
+
+class DurabilityPolicy:
+    """Apply the configured flush/fsync policy to a destination file.
+
+    Striped and async workers report writes concurrently, so the unsynced count is locked.
+    """
+
+    def __init__(self, policy: str = "flush-at-end", fsync_interval_mb: int = 64):
+        if policy not in DURABILITY_POLICIES:
+            policy = "flush-at-end"
+        self.policy = policy
+        self.fsync_interval = max(1, int(fsync_interval_mb)) * 1024 * 1024
+        self.unsynced = 0
+        self._lock = threading.Lock()
+
+    @property
+    def fsyncs(self) -> bool:
+        return self.policy in ("fsync-at-end", "fsync-every-N-MB")
+
+    def after_write(self, dst, nbytes: int):
+        """Called after each chunk; only the periodic policy does any work here"""
+        if self.policy != "fsync-every-N-MB":
+            return
+        with self._lock:
+            self.unsynced += nbytes
+            if self.unsynced < self.fsync_interval:
+                return
+            self.unsynced = 0
+        os.fsync(dst.fileno())  # Outside the lock so other workers keep writing
+
+    def finish(self, dst):
+        """Called once after the last chunk, before the destination is closed"""
+        if self.policy == "none":
+            return
+        dst.flush()
+        if self.fsyncs:
+            os.fsync(dst.fileno())
+
+
+class BufferPool:
+    """Shared pool of reusable copy buffers bounded by a total memory budget.
+
+    Buffers are anonymous mmaps, so they are page-aligned and usable for O_DIRECT transfers.
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget = _align_down(max(int(budget_bytes), 64 * 1024))
+        self.allocated = 0  # Bytes held by the pool, idle or checked out
+        self._free: Dict[int, List[mmap.mmap]] = {}
+        self._condition = threading.Condition()
+
+    def acquire(self, size: int) -> mmap.mmap:
+        """Check out a buffer of size bytes rounded up to a page, waiting if the budget is used up"""
+        size = min(_align_up(max(int(size), 1)), self.budget)
+        with self._condition:
+            while True:
+                idle = self._free.get(size)
+                if idle:
+                    return idle.pop()
+                if self.allocated + size <= self.budget or self._evict_idle(size):
+                    self.allocated += size
+                    return mmap.mmap(-1, size)
+                self._condition.wait()
+
+    def release(self, buffer: mmap.mmap):
+        """Return a buffer to the pool"""
+        with self._condition:
+            self._free.setdefault(len(buffer), []).append(buffer)
+            self._condition.notify_all()
+
+    @contextmanager
+    def buffer(self, size: int):
+        """Context manager yielding a memoryview over a pooled buffer"""
+        buffer = self.acquire(size)
+        try:
+            with memoryview(buffer) as view:
+                yield view
+        finally:
+            self.release(buffer)
+
+    def _evict_idle(self, size: int) -> bool:
+        """Drop idle buffers of other sizes until size more bytes fit in the budget"""
+        for idle_size, idle in self._free.items():
+            while idle and self.allocated + size > self.budget:
+                idle.pop()
+                self.allocated -= idle_size
+        return self.allocated + size <= self.budget
+
+
+def _align_up(size: int) -> int:
+    return -(-size // DIRECT_IO_ALIGNMENT) * DIRECT_IO_ALIGNMENT
+
+
+def _align_down(size: int) -> int:
+    return size // DIRECT_IO_ALIGNMENT * DIRECT_IO_ALIGNMENT
+
+
+class CacheAdvisor:
+    """posix_fadvise hints: sequential read-ahead and dropping copied ranges from the page cache"""
+
+    def __init__(self, src_fd: int, dst_fd: int, drop_cache: bool = False, offset: int = 0):
+        self.src_fd = src_fd
+        self.dst_fd = dst_fd
+        self.enabled = hasattr(os, "posix_fadvise")
+        self.drop_cache = drop_cache and self.enabled
+        self.offset = offset  # Where the sequential copy starts (non-zero when resuming)
+        self.src_dropped = offset
+        self.dst_dropped = offset
+        self._advise(src_fd, 0, 0, "POSIX_FADV_SEQUENTIAL")
+
+    def advance(self, nbytes: int):
+        """Called after each sequential chunk; drops whole windows behind the copy position"""
+        if not self.drop_cache:
+            return
+        self.offset += nbytes
+        if self.offset - self.src_dropped < CACHE_DROP_WINDOW:
+            return
+        self._advise(self.src_fd, self.src_dropped, self.offset - self.src_dropped, "POSIX_FADV_DONTNEED")
+        self.src_dropped = self.offset
+        dst_end = self.offset - CACHE_DROP_WINDOW
+        if dst_end > self.dst_dropped:
+            self._advise(self.dst_fd, self.dst_dropped, dst_end - self.dst_dropped, "POSIX_FADV_DONTNEED")
+            self.dst_dropped = dst_end
+
+    def drop_range(self, offset: int, length: int):
+        """Drop one finished range of both files (used by striped copies)"""
+        if self.drop_cache:
+            self._advise(self.src_fd, offset, length, "POSIX_FADV_DONTNEED")
+            self._advise(self.dst_fd, offset, length, "POSIX_FADV_DONTNEED")
+
+    def finish(self):
+        """Drop whatever is left of both files once the copy is done"""
+        if self.drop_cache:
+            self._advise(self.src_fd, 0, 0, "POSIX_FADV_DONTNEED")
+            self._advise(self.dst_fd, 0, 0, "POSIX_FADV_DONTNEED")
+
+    def _advise(self, fd: int, offset: int, length: int, advice: str):
+        if not self.enabled:
+            return
+        try:
+            os.posix_fadvise(fd, offset, length, getattr(os, advice))
+        except OSError:
+            pass  # Hints only - pipes and some filesystems reject them
+
+
+class TuningSession:
+    """Hill-climbs the chunk size of one copy from measured throughput"""
+
+    def __init__(self, initial_size: int, adaptive: bool = True):
+        self.size = initial_size
+        self.adaptive = adaptive
+        self.best_size = initial_size
+        self.best_rate = 0.0  # Bytes per second
+        self.direction = 2  # Multiply (2) or divide (0.5) the size on the next step
+        self.settled = not adaptive
+        self.window_start = time.time()
+        self.window_bytes = 0
+
+    def record(self, nbytes: int) -> bool:
+        """Account for a finished chunk; return True when the chunk size changed"""
+        if self.settled:
+            return False
+        self.window_bytes += nbytes
+        current_time = time.time()
+        elapsed = current_time - self.window_start
+        if elapsed < TUNING_WINDOW or elapsed <= 0:
+            return False
+
+        rate = self.window_bytes / elapsed
+        self.window_start = current_time
+        self.window_bytes = 0
+
+        if rate > self.best_rate * 1.05:
+            # Clearly faster - keep moving the same way
+            self.best_size, self.best_rate = self.size, rate
+        elif self.direction == 2 and self.best_size == self.size // 2:
+            # Growing stopped helping; try the other side of the best size once
+            self.direction = 0.5
+            self.size = self.best_size
+        else:
+            self.settled = True
+
+        next_size = int(self.size * self.direction)
+        if self.settled or not TUNING_MIN_BUFFER <= next_size <= TUNING_MAX_BUFFER:
+            self.settled = True
+            changed = self.size != self.best_size
+            self.size = self.best_size
+            return changed
+
+        self.size = next_size
+        return True
+
+
+class BufferTuner:
+    """Remembers the best chunk size per source/destination mount pair across runs"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.profiles: Dict[str, Dict] = {}
+        self._mounts: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        if path:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.profiles = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self.profiles = {}
+
+    def mount_point(self, path: str) -> str:
+        """Return the mount point holding path, cached per directory"""
+        directory = os.path.dirname(os.path.abspath(path))
+        with self._lock:
+            if directory in self._mounts:
+                return self._mounts[directory]
+        mount = directory
+        while not os.path.ismount(mount):
+            parent = os.path.dirname(mount)
+            if parent == mount:
+                break
+            mount = parent
+        with self._lock:
+            self._mounts[directory] = mount
+        return mount
+
+    def pair_key(self, source: str, destination: str) -> str:
+        return f"{self.mount_point(source)} -> {self.mount_point(destination)}"
+
+    def initial_size(self, source: str, destination: str, default_size: int) -> int:
+        """The remembered best size for this mount pair, or the configured default"""
+        key = self.pair_key(source, destination)
+        with self._lock:
+            profile = self.profiles.get(key)
+        return profile["buffer_size"] if profile else default_size
+
+    def start(self, source: str, destination: str, default_size: int) -> TuningSession:
+        """Begin tuning a copy, starting from the remembered or configured size"""
+        session = TuningSession(self.initial_size(source, destination, default_size))
+        session.pair = self.pair_key(source, destination)
+        return session
+
+    def finish(self, session: TuningSession):
+        """Keep the session's best size if it measured anything"""
+        if not session.adaptive or session.best_rate <= 0:
+            return
+        with self._lock:
+            self.profiles[session.pair] = {
+                "buffer_size": session.best_size,
+                "mb_per_s": round(session.best_rate / (1024 * 1024), 1),
+                "updated": time.time()
+            }
+
+    def save(self):
+        """Write the remembered sizes to disk"""
+        if not self.path:
+            return
+        with self._lock:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.profiles, f, indent=4, ensure_ascii=False)
+
+
+class CheckpointStore:
+    """Directory of JSON checkpoints, one per source/destination pair.
+
+    With sync set, the destination is fsynced before each offset is recorded. Without it a
+    crash may lose data behind a recorded offset; the prefix check on resume catches that
+    and the file starts over.
+    """
+
+    def __init__(self, directory: str, interval: int = CHECKPOINT_INTERVAL, sync: bool = True):
+        self.directory = directory
+        self.interval = max(1024 * 1024, int(interval))
+        self.sync = sync
+
+    def path(self, source: str, destination: str) -> str:
+        key = hashlib.sha1(f"{os.path.abspath(source)}\0{os.path.abspath(destination)}".encode("utf-8"))
+        return os.path.join(self.directory, key.hexdigest() + ".json")
+
+    def load(self, source: str, destination: str) -> Optional[Dict]:
+        try:
+            with open(self.path(source, destination), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def exists(self, source: str, destination: str) -> bool:
+        return os.path.exists(self.path(source, destination))
+
+    def save(self, source: str, destination: str, state: Dict):
+        """Replace the checkpoint atomically so a crash never leaves half a file behind"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(source, destination)
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(dict(state, source=source, destination=destination), f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+    def journal_path(self, source: str, destination: str) -> str:
+        return self.path(source, destination)[:-len(".json")] + ".journal"
+
+    def append_journal(self, source: str, destination: str, entries: List[str]):
+        """Append entries, one JSON string per line, and make them durable"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.journal_path(source, destination), "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read_journal(self, source: str, destination: str) -> List[str]:
+        """Entries appended so far; a line cut short by a crash is ignored"""
+        entries = []
+        try:
+            with open(self.journal_path(source, destination), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        pass
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def clear_journal(self, source: str, destination: str):
+        try:
+            os.remove(self.journal_path(source, destination))
+        except FileNotFoundError:
+            pass
+
+    def clear(self, source: str, destination: str):
+        try:
+            os.remove(self.path(source, destination))
+        except FileNotFoundError:
+            pass
+        self.clear_journal(source, destination)
+
+    def begin_file(self, source: str, destination: str, algorithm: Optional[str]) -> "FileCheckpoint":
+        return FileCheckpoint(self, source, destination, algorithm)
+
+    def begin_tree(self, source: str, destination: str) -> "TreeCheckpoint":
+        return TreeCheckpoint(self, source, destination)
+
+
+class FileCheckpoint:
+    """Committed offset of one file, plus the hash of everything before it when hashing.
+
+    Without an algorithm (verification off, or a kernel path copies the data) only the
+    offset and the source size and mtime are stored, and no chunk has to pass through a
+    hasher - kernel and striped copies stay usable.
+    """
+
+    def __init__(self, store: CheckpointStore, source: str, destination: str, algorithm: Optional[str]):
+        self.store = store
+        self.source = source
+        self.destination = destination
+        self.algorithm = algorithm
+        stat = os.stat(source)
+        self.source_size = stat.st_size
+        self.source_mtime = stat.st_mtime_ns
+        self.hasher = new_hasher(algorithm) if algorithm else None
+        self.offset = 0
+        self.pending = 0
+
+    def resume(self, pool: Optional[BufferPool] = None) -> int:
+        """Return the offset to continue from, with self.hasher seeded by the verified prefix.
+
+        The destination prefix is re-read and must hash to the recorded value. Offset-only
+        checkpoints hash the source prefix as well and compare the two. Anything else
+        (changed source, shorter or altered destination) starts from zero.
+        """
+        state = self.store.load(self.source, self.destination)
+        if not state or state.get("kind") != "file":
+            return 0
+        offset = state.get("offset", 0)
+        if (state.get("source_size") != self.source_size or state.get("source_mtime") != self.source_mtime
+                or offset <= 0):
+            return 0
+        try:
+            if os.path.getsize(self.destination) < offset:
+                return 0
+            if self.algorithm and state.get("prefix_hash") and state.get("hash_algorithm") == self.algorithm:
+                prefix_hasher = _hash_prefix(self.destination, offset, self.algorithm, pool)
+                expected = state["prefix_hash"]
+            else:
+                algorithm = self.algorithm or DEFAULT_HASH_ALGORITHM
+                prefix_hasher = _hash_prefix(self.source, offset, algorithm, pool)
+                expected = _hash_prefix(self.destination, offset, algorithm, pool).hexdigest()
+        except OSError:
+            return 0
+        if prefix_hasher.hexdigest() != expected:
+            return 0
+
+        if self.algorithm:
+            self.hasher = prefix_hasher
+        self.offset = offset
+        return offset
+
+    def restart(self) -> int:
+        """Discard a resumed prefix and start the file over"""
+        self.hasher = new_hasher(self.algorithm) if self.algorithm else None
+        self.offset = 0
+        return 0
+
+    def advance(self, dst, nbytes: int):
+        """Called after each chunk has been written and hashed"""
+        self.offset += nbytes
+        self.pending += nbytes
+        if self.pending >= self.store.interval:
+            self.commit(dst)
+
+    def commit(self, dst):
+        """Flush the destination to disk if the store syncs, then record the offset as committed"""
+        if self.store.sync:
+            os.fsync(dst.fileno())
+        self.store.save(self.source, self.destination, {
+            "kind": "file",
+            "source_size": self.source_size,
+            "source_mtime": self.source_mtime,
+            "offset": self.offset,
+            "hash_algorithm": self.algorithm or "",
+            "prefix_hash": self.hasher.hexdigest() if self.hasher is not None else "",
+            "updated": time.time()
+        })
+        self.pending = 0
+
+    def clear(self):
+        self.store.clear(self.source, self.destination)
+
+
+class TreeCheckpoint:
+    """Files of a directory copy that are finished, saved at most every few seconds.
+
+    Newly finished files are appended to a journal next to the checkpoint, so a save costs
+    only the files since the last one. The full list is rewritten once, when the copy stops
+    short and commits.
+    """
+
+    def __init__(self, store: CheckpointStore, source: str, destination: str):
+        self.store = store
+        self.source = source
+        self.destination = destination
+        self.completed = set()
+        self.unsaved: List[str] = []  # Finished since the last journal append
+        self.last_save = time.time()
+        self._lock = threading.Lock()
+        self._journal_lock = threading.Lock()  # Appends run outside _lock so workers keep going
+
+    def resume(self) -> set:
+        """Return the recorded files whose copies still match the source size and mtime"""
+        state = self.store.load(self.source, self.destination)
+        if not state or state.get("kind") != "tree":
+            return set()
+        recorded = state.get("completed_files", []) + self.store.read_journal(self.source, self.destination)
+        for relative_path in recorded:
+            try:
+                src_stat = os.stat(os.path.join(self.source, relative_path))
+                dst_stat = os.stat(os.path.join(self.destination, relative_path))
+            except OSError:
+                continue
+            # copystat gave the copy the source mtime, so both must still agree
+            if src_stat.st_size == dst_stat.st_size and src_stat.st_mtime_ns == dst_stat.st_mtime_ns:
+                self.completed.add(relative_path)
+        return set(self.completed)
+
+    def file_done(self, relative_path: str):
+        with self._lock:
+            self.completed.add(relative_path)
+            self.unsaved.append(relative_path)
+            if time.time() - self.last_save < TREE_CHECKPOINT_SECONDS:
+                return
+            entries, self.unsaved = self.unsaved, []
+            self.last_save = time.time()
+        with self._journal_lock:
+            if not self.store.exists(self.source, self.destination):
+                self._save([])  # The journal extends a checkpoint, which must exist to be resumed
+            self.store.append_journal(self.source, self.destination, entries)
+
+    def commit(self):
+        """Compact the journal into one checkpoint holding every finished file"""
+        with self._lock, self._journal_lock:
+            self._save(sorted(self.completed))
+            self.store.clear_journal(self.source, self.destination)
+            self.unsaved = []
+            self.last_save = time.time()
+
+    def _save(self, completed_files: List[str]):
+        self.store.save(self.source, self.destination, {
+            "kind": "tree",
+            "completed_files": completed_files,
+            "updated": time.time()
+        })
+
+    def clear(self):
+        self.store.clear(self.source, self.destination)
+
+
+class CopyOptions:
+    """Engine knobs shared by every copy of a task, usually built from the app settings"""
+
+    def __init__(self, zero_copy: bool = True, durability: Optional[DurabilityPolicy] = None,
+                 pool: Optional[BufferPool] = None, preallocate: bool = True,
+                 stripe_workers: int = 4, tree_workers: int = 8,
+                 small_file_threshold: int = 1024 * 1024, drop_cache: bool = False,
+                 mmap_min_size: int = 4 * 1024 * 1024, mmap_max_size: int = 512 * 1024 * 1024,
+                 tuner: Optional[BufferTuner] = None, hash_algorithm: Optional[str] = None,
+                 readback: bool = True, verify_workers: int = 8,
+                 checkpoints: Optional[CheckpointStore] = None, delta: bool = False,
+                 throttle: Optional[Throttle] = None):
+        self.zero_copy = zero_copy
+        self.durability = durability or DurabilityPolicy()
+        self.pool = pool or BufferPool(64 * 1024 * 1024)
+        self.preallocate = preallocate
+        self.stripe_workers = max(1, int(stripe_workers))
+        self.tree_workers = max(1, int(tree_workers))
+        self.small_file_threshold = small_file_threshold
+        self.drop_cache = drop_cache
+        self.mmap_min_size = mmap_min_size
+        self.mmap_max_size = mmap_max_size
+        self.tuner = tuner  # None keeps the buffer size fixed
+        self.hash_algorithm = hash_algorithm  # None skips content hashing
+        self.readback = readback  # Re-read the destination to check it against the source hash
+        self.verify_workers = max(1, int(verify_workers))
+        self.checkpoints = checkpoints  # None disables resumable copies
+        self.delta = delta  # Update existing destinations in place, rewriting changed blocks only
+        self.throttle = throttle  # None leaves only per-task rate limits
+
+    @classmethod
+    def from_settings(cls, settings: Dict, pool: Optional[BufferPool] = None,
+                      tuner: Optional[BufferTuner] = None,
+                      checkpoints: Optional[CheckpointStore] = None,
+                      throttle: Optional[Throttle] = None) -> "CopyOptions":
+        """Build options from the settings dict kept by FileCopierApp"""
+        return cls(
+            zero_copy=settings.get("zero_copy", True),
+            durability=DurabilityPolicy(
+                settings.get("durability_policy", "flush-at-end"),
+                settings.get("fsync_interval_mb", 64)
+            ),
+            pool=pool,
+            preallocate=settings.get("preallocate", True),
+            stripe_workers=settings.get("stripe_workers", 4),
+            tree_workers=settings.get("tree_workers", 8),
+            small_file_threshold=settings.get("small_file_threshold_kb", 1024) * 1024,
+            drop_cache=settings.get("avoid_page_cache", False),
+            mmap_min_size=settings.get("mmap_min_mb", 4) * 1024 * 1024,
+            mmap_max_size=settings.get("mmap_max_mb", 512) * 1024 * 1024,
+            tuner=tuner if settings.get("adaptive_buffer", True) else None,
+            hash_algorithm=DEFAULT_HASH_ALGORITHM if settings.get("verify_copy", True) else None,
+            readback=settings.get("verify_readback", True),
+            verify_workers=settings.get("verify_workers", 8),
+            checkpoints=checkpoints if settings.get("resume_checkpoints", True) else None,
+            delta=settings.get("overwrite_policy", "prompt") == "update-delta",
+            throttle=throttle
+        )
+
+
+def new_hasher(algorithm: str):
+    """Create an incremental hash object for one of HASH_ALGORITHMS"""
+    if algorithm == "xxh3_128":
+        if not XXHASH_AVAILABLE:
+            raise ValueError("xxh3_128 needs the xxhash package")
+        return xxhash.xxh3_128()
+    if algorithm == "blake2b":
+        return hashlib.blake2b(digest_size=32)
+    raise ValueError(f"Unknown hash algorithm: {algorithm}")
+
+
+def hash_file(path: str, algorithm: str, pool: Optional[BufferPool] = None,
+              uncached: bool = False, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """Hash the contents of path in one sequential pass.
+
+    With uncached set, written-back pages are dropped first so the data comes from the device
+    and not from the copy of it still sitting in the page cache.
+    """
+    hasher = new_hasher(algorithm)
+    pool = pool or BufferPool(chunk_size)
+    with open(path, "rb", buffering=0) as f:
+        if uncached and hasattr(os, "posix_fadvise"):
+            os.fsync(f.fileno())
+            try:
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+            except OSError:
+                pass
+        with pool.buffer(chunk_size) as buffer:
+            while True:
+                read = f.readinto(buffer)
+                if not read:
+                    break
+                hasher.update(buffer[:read])
+    return hasher.hexdigest()
+
+
+def _hash_prefix(path: str, length: int, algorithm: str, pool: Optional[BufferPool] = None,
+                 chunk_size: int = HASH_CHUNK_SIZE):
+    """Return a hasher fed with the first length bytes of path, ready to take more data"""
+    hasher = new_hasher(algorithm)
+    pool = pool or BufferPool(chunk_size)
+    with open(path, "rb", buffering=0) as f, pool.buffer(chunk_size) as buffer:
+        remaining = length
+        while remaining:
+            read = f.readinto(buffer[:min(len(buffer), remaining)])
+            if not read:
+                raise IOError(f"{path} is shorter than {length} bytes")
+            hasher.update(buffer[:read])
+            remaining -= read
+    return hasher
+
+
+def record_hashes(task: Dict, hasher, options: CopyOptions):
+    """Store the streamed source hash and, if enabled, the read-back destination hash"""
+    task["hash_algorithm"] = options.hash_algorithm
+    task["source_hash"] = hasher.hexdigest()
+    if options.readback:
+        task["destination_hash"] = hash_file(task["destination"], options.hash_algorithm,
+                                             options.pool, uncached=True)
+    else:
+        task["destination_hash"] = ""
+
+
+def preallocate(fd: int, size: int) -> bool:
+    """Reserve size bytes for fd up front; return False if the filesystem cannot.
+
+    Running out of space raises here, before any data is copied, instead of midway.
+    """
+    if size <= 0 or not hasattr(os, "posix_fallocate"):
+        return False
+    try:
+        os.posix_fallocate(fd, 0, size)
+        return True
+    except OSError as e:
+        if e.errno in _UNSUPPORTED_ERRNOS:
+            return False
+        raise
+
+
+def wait_while_paused(task: Dict) -> bool:
+    """Block while the task is paused; return False once it has been cancelled.
+
+    Only pauses without a checkpoint wait here. A checkpointed task is paused by stopping
+    it like a cancel, which frees its worker; the checkpoint keeps its place.
+    """
+    while task["paused"] and not task["cancelled"]:
+        time.sleep(0.1)
+    return not task["cancelled"]
+
+
+def kernel_copy_methods():
+    """Return the (name, function) in-kernel copy paths available on this platform"""
+    methods = []
+    if hasattr(os, "copy_file_range"):
+        methods.append(("copy_file_range",
+                        lambda src_fd, dst_fd, count: os.copy_file_range(src_fd, dst_fd, count)))
+    if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+        # Linux can sendfile() into regular files; offset=None uses and advances the source position
+        methods.append(("sendfile",
+                        lambda src_fd, dst_fd, count: os.sendfile(dst_fd, src_fd, None, count)))
+    return methods
+
+
+def _kernel_copy_loop(task: Dict, kernel_copy, src, dst, meter: ProgressMeter,
+                      durability: DurabilityPolicy, advisor: CacheAdvisor,
+                      checkpoint: Optional[FileCheckpoint] = None) -> bool:
+    """Copy with an in-kernel path; return False if the path is unusable for these files"""
+    src_fd, dst_fd = src.fileno(), dst.fileno()
+    while wait_while_paused(task):
+        try:
+            copied = kernel_copy(src_fd, dst_fd, KERNEL_CHUNK_SIZE)
+        except OSError as e:
+            if e.errno in _UNSUPPORTED_ERRNOS:
+                # Both descriptors still sit at the last committed offset,
+                # so the next path simply continues from there
+                return False
+            raise
+
+        if copied == 0:
+            # Some filesystems (procfs, FUSE) report EOF early instead of failing
+            return os.lseek(src_fd, 0, os.SEEK_CUR) >= os.fstat(src_fd).st_size
+        if checkpoint is not None:
+            checkpoint.advance(dst, copied)
+
+        durability.after_write(dst, copied)
+        advisor.advance(copied)
+        meter.advance(copied)
+    return True
+
+
+def _readwrite_loop(task: Dict, src, dst, pool: BufferPool, tuning: TuningSession, size_limit: int,
+                    meter: ProgressMeter, durability: DurabilityPolicy, advisor: CacheAdvisor,
+                    hasher=None, checkpoint: Optional[FileCheckpoint] = None):
+    """Portable user-space copy loop reading straight into a pooled buffer"""
+    while wait_while_paused(task):
+        # Swap buffers whenever the tuner picks a new chunk size
+        with pool.buffer(min(tuning.size, size_limit)) as buffer:
+            resized = False
+            while not resized and wait_while_paused(task):
+                chunk_size = src.readinto(buffer)
+                if not chunk_size:
+                    return
+
+                _write_all(dst, buffer[:chunk_size])  # Slicing a memoryview does not copy
+                if hasher is not None:
+                    hasher.update(buffer[:chunk_size])
+                if checkpoint is not None:
+                    checkpoint.advance(dst, chunk_size)
+
+                durability.after_write(dst, chunk_size)
+                advisor.advance(chunk_size)
+                meter.advance(chunk_size)
+                resized = tuning.record(chunk_size)
+
+
+def _write_all(dst, view: memoryview):
+    """Write a whole memoryview, retrying short writes"""
+    while view:
+        written = dst.write(view)
+        view = view[written:]
+
+
+def _mmap_loop(task: Dict, src, dst, slice_size: int, meter: ProgressMeter,
+               durability: DurabilityPolicy, advisor: CacheAdvisor, hasher=None,
+               checkpoint: Optional[FileCheckpoint] = None) -> bool:
+    """Write a read-only mapping of the source straight to the destination.
+
+    Returns False when the source cannot be mapped (special files, some network filesystems).
+    """
+    offset = src.tell()
+    try:
+        source_map = mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return False
+
+    with source_map, memoryview(source_map) as mapped:
+        if hasattr(source_map, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            source_map.madvise(mmap.MADV_SEQUENTIAL)
+
+        while offset < len(mapped) and wait_while_paused(task):
+            end = min(offset + slice_size, len(mapped))
+            _write_all(dst, mapped[offset:end])
+            if hasher is not None:
+                hasher.update(mapped[offset:end])
+            chunk_size = end - offset
+            offset = end
+            if checkpoint is not None:
+                checkpoint.advance(dst, chunk_size)
+
+            durability.after_write(dst, chunk_size)
+            advisor.advance(chunk_size)
+            meter.advance(chunk_size)
+
+    src.seek(offset)
+    return True
+
+
+def streamed_hash_algorithm(options: CopyOptions) -> Optional[str]:
+    """Algorithm to hash chunks with as they are copied, or None when a kernel path will copy them.
+
+    In-kernel copies never pass the data through user space. Their copies are verified
+    afterwards by hashing both sides, so hashing never takes the kernel path away.
+    """
+    if options.zero_copy and kernel_copy_methods():
+        return None
+    return options.hash_algorithm
+
+
+def copy_file(task: Dict, buffer_size: int, progress_callback: Optional[Callable[[], None]] = None,
+              update_interval: float = 0.25, options: Optional[CopyOptions] = None) -> str:
+    """Copy task["source"] to task["destination"], preferring in-kernel copy paths.
+
+    Returns the name of the path that finished the copy and records it in task["copy_method"].
+    """
+    options = options or CopyOptions()
+    meter = ProgressMeter(task, progress_callback, update_interval, options.throttle)
+    algorithm = streamed_hash_algorithm(options)
+    checkpoint = None
+    hasher = None
+    if options.checkpoints:
+        checkpoint = options.checkpoints.begin_file(task["source"], task["destination"], algorithm)
+    elif algorithm:
+        hasher = new_hasher(algorithm)
+
+    method = copy_stream(task, task["source"], task["destination"], buffer_size, meter, options,
+                         hasher, checkpoint)
+    meter.flush()
+
+    if checkpoint is not None:
+        hasher = checkpoint.hasher  # Covers the resumed prefix as well
+        if not task["cancelled"]:
+            checkpoint.clear()
+    if algorithm and not task["cancelled"]:
+        record_hashes(task, hasher, options)
+    return method
+
+
+def copy_stream(task: Dict, source: str, destination: str, buffer_size: int, meter: ProgressMeter,
+                options: Optional[CopyOptions] = None, hasher=None,
+                checkpoint: Optional[FileCheckpoint] = None) -> str:
+    """Copy the data of one file on behalf of task, advancing meter as chunks land.
+
+    When hasher is given every chunk is fed to it, so the in-kernel paths are skipped.
+    A checkpoint brings its own hasher when hashing; the copy resumes after the prefix
+    it verifies and the committed offset is recorded as the copy goes.
+    """
+    options = options or CopyOptions()
+    durability = options.durability
+    resume_offset = 0
+    if checkpoint is not None:
+        resume_offset = checkpoint.resume(options.pool)
+        hasher = checkpoint.hasher
+
+    # Unbuffered handles keep the file offsets in the descriptors, so a kernel path
+    # that gives up midway can hand over to the next one without losing data
+    with open(source, "rb", buffering=0) as src, \
+            open(destination, "r+b" if resume_offset else "wb", buffering=0) as dst:
+        file_size = os.fstat(src.fileno()).st_size
+        if resume_offset:
+            # Anything written after the last checkpoint is copied again
+            os.ftruncate(dst.fileno(), resume_offset)
+            src.seek(resume_offset)
+            dst.seek(resume_offset)
+            meter.advance(resume_offset, pace=False)
+        preallocated = options.preallocate and preallocate(dst.fileno(), file_size)
+        advisor = CacheAdvisor(src.fileno(), dst.fileno(), options.drop_cache, resume_offset)
+
+        method = None
+        if options.zero_copy and hasher is None:
+            for name, kernel_copy in kernel_copy_methods():
+                task["copy_method"] = name
+                if _kernel_copy_loop(task, kernel_copy, src, dst, meter, durability, advisor, checkpoint):
+                    method = name
+                    break
+
+        # Without a kernel path, medium files are mapped instead of copied through a buffer
+        if method is None and options.mmap_min_size <= file_size <= options.mmap_max_size:
+            task["copy_method"] = "mmap"
+            if _mmap_loop(task, src, dst, max(buffer_size, MMAP_SLICE_SIZE), meter, durability, advisor,
+                          hasher, checkpoint):
+                method = "mmap"
+
+        if method is None:
+            method = task["copy_method"] = "readwrite"
+            if options.tuner:
+                tuning = options.tuner.start(source, destination, buffer_size)
+            else:
+                tuning = TuningSession(buffer_size, adaptive=False)
+            # Small files never need a buffer larger than themselves
+            size_limit = max(file_size, TUNING_MIN_BUFFER)
+            _readwrite_loop(task, src, dst, options.pool, tuning, size_limit, meter, durability, advisor,
+                            hasher, checkpoint)
+            if options.tuner:
+                options.tuner.finish(tuning)
+
+        if checkpoint is not None and task["cancelled"]:
+            checkpoint.commit(dst)  # A restart continues from here
+        if preallocated:
+            # Trim the reservation to what was written (source shrank or task was cancelled)
+            os.ftruncate(dst.fileno(), dst.tell())
+        durability.finish(dst)
+        advisor.finish()
+
+    return method
+
+
+def _read_at(fd: int, buffer: memoryview, offset: int) -> int:
+    """Positional readinto; falls back to pread where preadv is missing"""
+    if hasattr(os, "preadv"):
+        return os.preadv(fd, [buffer], offset)
+    data = os.pread(fd, len(buffer), offset)
+    buffer[:len(data)] = data
+    return len(data)
+
+
+def _write_at(fd: int, view: memoryview, offset: int):
+    """Positional write that retries short writes"""
+    while view:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+
+
+def copy_file_delta(task: Dict, progress_callback: Optional[Callable[[], None]] = None,
+                    update_interval: float = 0.25, options: Optional[CopyOptions] = None) -> Dict:
+    """Bring the existing task["destination"] up to date with task["source"] in place.
+
+    Returns the summary from delta_stream and records "delta" in task["copy_method"].
+    """
+    options = options or CopyOptions()
+    meter = ProgressMeter(task, progress_callback, update_interval, options.throttle)
+    hasher = new_hasher(options.hash_algorithm) if options.hash_algorithm else None
+    task["copy_method"] = "delta"
+    summary = delta_stream(task, task["source"], task["destination"], meter, options, hasher)
+    meter.flush()
+    if hasher is not None and not task["cancelled"]:
+        record_hashes(task, hasher, options)
+    return summary
+
+
+def delta_stream(task: Dict, source: str, destination: str, meter: ProgressMeter,
+                 options: Optional[CopyOptions] = None, hasher=None) -> Dict:
+    """Compare source and destination block by block and pwrite only the blocks that differ.
+
+    Both files are local, so blocks are compared directly instead of through checksums;
+    it is the same test at the cost of a memcmp. Blocks sit at fixed offsets, which suits
+    files that change in place (VM images, databases, archives being appended to).
+    The destination is truncated to the source size at the end.
+    """
+    options = options or CopyOptions()
+    durability = options.durability
+    summary = {"blocks": 0, "changed_blocks": 0, "bytes_written": 0}
+
+    # One pooled buffer split in two: holding two at once could wait forever on a small budget
+    with open(source, "rb", buffering=0) as src, open(destination, "r+b", buffering=0) as dst, \
+            options.pool.buffer(2 * DELTA_BLOCK_SIZE) as blocks:
+        block_size = len(blocks) // 2  # Smaller than DELTA_BLOCK_SIZE when the budget is
+        src_block, dst_block = blocks[:block_size], blocks[block_size:2 * block_size]
+        src_fd, dst_fd = src.fileno(), dst.fileno()
+        advisor = CacheAdvisor(src_fd, dst_fd, options.drop_cache)
+        offset = 0
+        while wait_while_paused(task):
+            chunk_size = _read_at(src_fd, src_block, offset)
+            if not chunk_size:
+                break
+            existing = _read_at(dst_fd, dst_block, offset)
+
+            summary["blocks"] += 1
+            if existing != chunk_size or src_block[:chunk_size] != dst_block[:chunk_size]:
+                _write_at(dst_fd, src_block[:chunk_size], offset)
+                durability.after_write(dst, chunk_size)
+                summary["changed_blocks"] += 1
+                summary["bytes_written"] += chunk_size
+            if hasher is not None:
+                hasher.update(src_block[:chunk_size])
+
+            offset += chunk_size
+            advisor.advance(chunk_size)
+            meter.advance(chunk_size)
+
+        if not task["cancelled"] and os.fstat(dst_fd).st_size != offset:
+            os.ftruncate(dst_fd, offset)
+        durability.finish(dst)
+        advisor.finish()
+
+    return summary
+
+
+def copy_file_striped(task: Dict, buffer_size: int,
+                      progress_callback: Optional[Callable[[], None]] = None,
+                      update_interval: float = 0.25, options: Optional[CopyOptions] = None) -> str:
+    """Copy one large file with several threads, each filling its own ranges via pread/pwrite.
+
+    Stripes finish out of order, so a checkpoint records the contiguous prefix of finished
+    stripes and a resumed copy starts its stripes after it.
+    """
+    options = options or CopyOptions()
+    meter = ProgressMeter(task, progress_callback, update_interval, options.throttle)
+    durability = options.durability
+    pool = options.pool
+    workers = options.stripe_workers
+    task["copy_method"] = "striped"
+
+    checkpoint = None
+    resume_offset = 0
+    if options.checkpoints:
+        # Striped copies never stream a hash, so the checkpoint holds the offset only
+        checkpoint = options.checkpoints.begin_file(task["source"], task["destination"], None)
+        resume_offset = checkpoint.resume(pool)
+
+    file_size = os.path.getsize(task["source"])
+    next_stripe = iter(range(resume_offset, file_size, STRIPE_SIZE))
+    stripe_lock = threading.Lock()
+    failed = threading.Event()
+    finished_stripes: Dict[int, int] = {}  # Start -> end of stripes done past the frontier
+    frontier = resume_offset  # Everything before this offset has been written
+
+    def stripe_done(dst, start: int, end: int):
+        nonlocal frontier
+        with stripe_lock:
+            finished_stripes[start] = end
+            previous = frontier
+            while frontier in finished_stripes:
+                frontier = finished_stripes.pop(frontier)
+            if checkpoint is not None and frontier > previous:
+                checkpoint.advance(dst, frontier - previous)
+
+    def copy_stripes(src_fd: int, dst_fd: int, dst, advisor: CacheAdvisor):
+        with pool.buffer(buffer_size) as buffer:
+            while not failed.is_set():
+                with stripe_lock:
+                    start = next(next_stripe, None)
+                if start is None:
+                    return
+
+                offset = start
+                end = min(start + STRIPE_SIZE, file_size)
+                while offset < end and wait_while_paused(task):
+                    chunk_size = _read_at(src_fd, buffer[:min(len(buffer), end - offset)], offset)
+                    if not chunk_size:
+                        raise IOError(f"Unexpected end of file at offset {offset}")
+                    _write_at(dst_fd, buffer[:chunk_size], offset)
+                    offset += chunk_size
+
+                    durability.after_write(dst, chunk_size)
+                    meter.advance(chunk_size)
+
+                if offset < end:
+                    return  # Cancelled midway; this stripe is copied again on resume
+                stripe_done(dst, start, end)
+                advisor.drop_range(start, end - start)
+
+    with open(task["source"], "rb", buffering=0) as src, \
+            open(task["destination"], "r+b" if resume_offset else "wb", buffering=0) as dst:
+        if resume_offset:
+            meter.advance(resume_offset, pace=False)
+        # Size the destination up front so every range can be written in place
+        if not (options.preallocate and preallocate(dst.fileno(), file_size)):
+            os.ftruncate(dst.fileno(), file_size)
+        advisor = CacheAdvisor(src.fileno(), dst.fileno(), options.drop_cache, resume_offset)
+
+        def run_worker():
+            try:
+                copy_stripes(src.fileno(), dst.fileno(), dst, advisor)
+            except Exception:
+                failed.set()
+                raise
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stripe") as stripe_pool:
+            futures = [stripe_pool.submit(run_worker) for _ in range(workers)]
+
+        if task["cancelled"] or failed.is_set():
+            # The destination was sized up front, so zeros past the copied ranges must not stay
+            # behind looking like a finished copy. A checkpoint keeps the contiguous prefix for
+            # its resume; otherwise nothing is kept.
+            os.ftruncate(dst.fileno(), frontier if checkpoint is not None else 0)
+            if checkpoint is not None:
+                checkpoint.commit(dst)
+        for future in futures:
+            future.result()  # Re-raise the first worker error, if any
+
+        durability.finish(dst)
+        advisor.finish()
+        meter.flush()
+
+    if checkpoint is not None and not task["cancelled"]:
+        checkpoint.clear()
+    return task["copy_method"]
+
+
+def scan_tree(source: str) -> Tuple[List[str], List[Tuple[str, int]]]:
+    """Walk source once and return its relative directories and (relative file, size) pairs"""
+    directories = []
+    files = []
+    pending = [""]
+    while pending:
+        relative_dir = pending.pop()
+        with os.scandir(os.path.join(source, relative_dir)) as entries:
+            for entry in entries:
+                relative_path = os.path.join(relative_dir, entry.name)
+                try:
+                    if entry.is_dir():
+                        directories.append(relative_path)
+                        pending.append(relative_path)
+                    else:
+                        files.append((relative_path, entry.stat().st_size))
+                except OSError:
+                    files.append((relative_path, 0))  # Let the copy report the real error
+    return directories, files
+
+
+def copy_tree(task: Dict, buffer_size: int, progress_callback: Optional[Callable[[], None]] = None,
+              update_interval: float = 0.5, options: Optional[CopyOptions] = None,
+              on_error: Optional[Callable[[str, Exception], None]] = None,
+              tree: Optional[Tuple[List[str], List[Tuple[str, int]]]] = None,
+              skip: Optional[set] = None) -> Dict:
+    """Copy the directory task["source"] into task["destination"].
+
+    The tree is walked once and every directory is created up front. Small files are then
+    fanned out over a worker pool in batches while large files stream on the calling
+    thread. Per-file failures go to on_error and the rest of the tree is still copied.
+    With checkpoints enabled, files finished by an earlier run are skipped and large
+    files resume from their own checkpoints. A caller that already walked the source can
+    pass the scan_tree result as tree, and relative paths in skip count as already done.
+    """
+    source = task["source"]
+    destination = task["destination"]
+    options = options or CopyOptions()
+    meter = ProgressMeter(task, progress_callback, update_interval, options.throttle)
+    small_file_threshold = options.small_file_threshold
+
+    directories, files = tree if tree is not None else scan_tree(source)
+    os.makedirs(destination, exist_ok=True)
+    for relative_dir in directories:
+        os.makedirs(os.path.join(destination, relative_dir), exist_ok=True)
+
+    checkpoint = options.checkpoints.begin_tree(source, destination) if options.checkpoints else None
+    completed = checkpoint.resume() if checkpoint else set()
+    if skip:
+        completed |= skip
+    if completed:
+        meter.advance(sum(size for relative_path, size in files if relative_path in completed), pace=False)
+        remaining = [item for item in files if item[0] not in completed]
+    else:
+        remaining = files
+
+    small_files = [item for item in remaining if item[1] < small_file_threshold]
+    large_files = [item for item in remaining if item[1] >= small_file_threshold]
+    summary = {"directories": len(directories), "files": len(files), "errors": 0}
+    summary_lock = threading.Lock()
+
+    def report_error(path: str, error: Exception):
+        with summary_lock:
+            summary["errors"] += 1
+        if on_error:
+            on_error(path, error)
+
+    def copy_batch(batch: List[Tuple[str, int]]):
+        for relative_path, size in batch:
+            if not wait_while_paused(task):
+                return
+            src_path = os.path.join(source, relative_path)
+            dst_path = os.path.join(destination, relative_path)
+            try:
+                shutil.copyfile(src_path, dst_path)
+                shutil.copystat(src_path, dst_path)
+                meter.advance(size)
+            except Exception as e:
+                report_error(src_path, e)
+                continue
+            if checkpoint:
+                checkpoint.file_done(relative_path)
+
+    with ThreadPoolExecutor(max_workers=options.tree_workers, thread_name_prefix="tree") as batch_pool:
+        for start in range(0, len(small_files), SMALL_FILE_BATCH):
+            batch_pool.submit(copy_batch, small_files[start:start + SMALL_FILE_BATCH])
+
+        # Large files stream on this thread while the batches run
+        for relative_path, _ in large_files:
+            if not wait_while_paused(task):
+                break
+            src_path = os.path.join(source, relative_path)
+            dst_path = os.path.join(destination, relative_path)
+            file_checkpoint = None
+            try:
+                if options.delta and os.path.isfile(dst_path):
+                    # Existing copies are updated in place; a rerun simply compares again
+                    delta_stream(task, src_path, dst_path, meter, options)
+                else:
+                    if checkpoint:
+                        file_checkpoint = options.checkpoints.begin_file(
+                            src_path, dst_path, streamed_hash_algorithm(options))
+                    copy_stream(task, src_path, dst_path, buffer_size, meter, options,
+                                checkpoint=file_checkpoint)
+                if task["cancelled"]:
+                    break
+                shutil.copystat(src_path, dst_path)
+            except Exception as e:
+                report_error(src_path, e)
+                continue
+            if file_checkpoint:
+                file_checkpoint.clear()
+            if checkpoint:
+                checkpoint.file_done(relative_path)
+
+    # Directory timestamps last, deepest first, so copying into them does not change them again
+    for relative_dir in sorted(directories, key=lambda d: d.count(os.sep), reverse=True) + [""]:
+        try:
+            shutil.copystat(os.path.join(source, relative_dir), os.path.join(destination, relative_dir))
+        except OSError:
+            pass
+
+    if checkpoint:
+        if task["cancelled"] or summary["errors"]:
+            checkpoint.commit()
+        else:
+            checkpoint.clear()
+
+    task["copy_method"] = "batched-tree"
+    meter.flush()
+    return summary
+
+
+def plan_sync(source: str, destination: str, options: Optional[CopyOptions] = None,
+              compare_hash: bool = False, tree: Optional[Tuple[List[str], List[Tuple[str, int]]]] = None) -> Dict:
+    """Work out which files of source are missing or out of date under destination.
+
+    A file is unchanged when the sizes match and, by default, the mtimes agree within
+    SYNC_MTIME_TOLERANCE. With compare_hash, equal-sized files are hashed on the verify
+    workers instead and mtimes are ignored. Also lists destination entries that have no
+    source counterpart.
+    """
+    options = options or CopyOptions()
+    directories, files = tree if tree is not None else scan_tree(source)
+    plan = {"copy": [], "unchanged": set(), "extra_files": [], "extra_directories": []}
+
+    candidates = []
+    for relative_path, size in files:
+        try:
+            dst_stat = os.stat(os.path.join(destination, relative_path))
+        except OSError:
+            plan["copy"].append(relative_path)
+            continue
+        if dst_stat.st_size != size:
+            plan["copy"].append(relative_path)
+        elif compare_hash:
+            candidates.append(relative_path)
+        else:
+            try:
+                src_mtime = os.stat(os.path.join(source, relative_path)).st_mtime
+            except OSError:
+                plan["copy"].append(relative_path)  # Let the copy report the real error
+                continue
+            if abs(src_mtime - dst_stat.st_mtime) <= SYNC_MTIME_TOLERANCE:
+                plan["unchanged"].add(relative_path)
+            else:
+                plan["copy"].append(relative_path)
+
+    def same_content(relative_path: str) -> bool:
+        algorithm = options.hash_algorithm or DEFAULT_HASH_ALGORITHM
+        try:
+            return (hash_file(os.path.join(source, relative_path), algorithm, options.pool) ==
+                    hash_file(os.path.join(destination, relative_path), algorithm, options.pool))
+        except OSError:
+            return False
+
+    if candidates:
+        with ThreadPoolExecutor(max_workers=options.verify_workers, thread_name_prefix="sync") as hash_pool:
+            for relative_path, same in zip(candidates, hash_pool.map(same_content, candidates)):
+                if same:
+                    plan["unchanged"].add(relative_path)
+                else:
+                    plan["copy"].append(relative_path)
+
+    if os.path.isdir(destination):
+        source_files = {relative_path for relative_path, _ in files}
+        source_directories = set(directories)
+        dst_directories, dst_files = scan_tree(destination)
+
+        def inside_extra(relative_path: str) -> bool:
+            return any(relative_path.startswith(parent + os.sep) for parent in plan["extra_directories"])
+
+        # Only the topmost extra directories; removing them takes their contents along
+        for relative_dir in sorted(dst_directories):
+            if relative_dir not in source_directories and not inside_extra(relative_dir):
+                plan["extra_directories"].append(relative_dir)
+        plan["extra_files"] = [
+            relative_path for relative_path, _ in dst_files
+            if relative_path not in source_files and not inside_extra(relative_path)
+        ]
+
+    return plan
+
+
+def sync_tree(task: Dict, buffer_size: int, progress_callback: Optional[Callable[[], None]] = None,
+              update_interval: float = 0.5, options: Optional[CopyOptions] = None,
+              on_error: Optional[Callable[[str, Exception], None]] = None,
+              compare_hash: bool = False, delete_extras: bool = False) -> Dict:
+    """Mirror task["source"] into task["destination"], copying only new and changed files.
+
+    With delete_extras, destination files and directories missing from the source are removed.
+    """
+    source = task["source"]
+    destination = task["destination"]
+    options = options or CopyOptions()
+    tree = scan_tree(source)
+    plan = plan_sync(source, destination, options, compare_hash, tree)
+    sizes = dict(tree[1])
+    if not has_free_space(destination if os.path.isdir(destination) else os.path.dirname(destination),
+                          sum(sizes[relative_path] for relative_path in plan["copy"])):
+        raise OSError(errno.ENOSPC, "Insufficient disk space")
+
+    summary = {"copied": len(plan["copy"]), "unchanged": len(plan["unchanged"]), "deleted": 0}
+    if delete_extras and not task["cancelled"]:
+        for relative_path in plan["extra_files"]:
+            try:
+                os.remove(os.path.join(destination, relative_path))
+                summary["deleted"] += 1
+            except OSError as e:
+                if on_error:
+                    on_error(os.path.join(destination, relative_path), e)
+        for relative_dir in plan["extra_directories"]:
+            try:
+                shutil.rmtree(os.path.join(destination, relative_dir))
+                summary["deleted"] += 1
+            except OSError as e:
+                if on_error:
+                    on_error(os.path.join(destination, relative_dir), e)
+
+    summary.update(copy_tree(task, buffer_size, progress_callback, update_interval, options, on_error,
+                             tree=tree, skip=plan["unchanged"]))
+    task["copy_method"] = "sync"
+    return summary
+
+
+def verify_tree(task: Dict, options: Optional[CopyOptions] = None, stop_on_first: bool = False,
+                on_mismatch: Optional[Callable[[str, str], None]] = None) -> Dict:
+    """Compare every file under task["source"] with its copy under task["destination"].
+
+    Sizes are compared first. With hashing and read-back enabled in options, both sides are
+    then hashed. Small files are handed to the verify workers in batches, like copy_tree. Each mismatch goes to on_mismatch as (relative path, reason). With
+    stop_on_first set, the remaining batches are abandoned after the first mismatch.
+    """
+    source = task["source"]
+    destination = task["destination"]
+    options = options or CopyOptions()
+    algorithm = options.hash_algorithm if options.readback else None
+
+    _, files = scan_tree(source)
+    summary = {"files": len(files), "verified": 0, "mismatches": []}
+    summary_lock = threading.Lock()
+    stop = threading.Event()
+
+    def check_file(relative_path: str) -> Optional[str]:
+        src_path = os.path.join(source, relative_path)
+        dst_path = os.path.join(destination, relative_path)
+        try:
+            dst_size = os.path.getsize(dst_path)
+        except FileNotFoundError:
+            return "missing"
+        if dst_size != os.path.getsize(src_path):
+            return "size differs"
+        if algorithm and hash_file(src_path, algorithm, options.pool) != hash_file(dst_path, algorithm, options.pool):
+            return "content differs"
+        return None
+
+    def verify_batch(batch: List[Tuple[str, int]]):
+        for relative_path, _ in batch:
+            if stop.is_set() or not wait_while_paused(task):
+                return
+            try:
+                reason = check_file(relative_path)
+            except OSError as e:
+                reason = f"unreadable: {e}"
+
+            with summary_lock:
+                if reason is None:
+                    summary["verified"] += 1
+                    continue
+                summary["mismatches"].append((relative_path, reason))
+            if on_mismatch:
+                on_mismatch(relative_path, reason)
+            if stop_on_first:
+                stop.set()
+
+    with ThreadPoolExecutor(max_workers=options.verify_workers, thread_name_prefix="verify") as verify_pool:
+        # Large files go out one at a time, biggest first, so no worker is left with several
+        large_files = sorted((item for item in files if item[1] >= options.small_file_threshold),
+                             key=lambda item: item[1], reverse=True)
+        for item in large_files:
+            verify_pool.submit(verify_batch, [item])
+
+        small_files = [item for item in files if item[1] < options.small_file_threshold]
+        for start in range(0, len(small_files), SMALL_FILE_BATCH):
+            verify_pool.submit(verify_batch, small_files[start:start + SMALL_FILE_BATCH])
+
+    return summary
+
+
+def copy_file_direct(task: Dict, buffer_size: int, progress_callback: Optional[Callable[[], None]] = None,
+                     update_interval: float = 0.25, options: Optional[CopyOptions] = None) -> str:
+    """Copy a very large file with O_DIRECT, bypassing the page cache.
+
+    Falls back to copy_file when the platform or either filesystem rejects O_DIRECT.
+    """
+    options = options or CopyOptions()
+    if not DIRECT_IO_SUPPORTED:
+        return copy_file(task, buffer_size, progress_callback, update_interval, options)
+
+    try:
+        src_fd = os.open(task["source"], os.O_RDONLY | os.O_DIRECT)
+    except OSError as e:
+        if e.errno not in _UNSUPPORTED_ERRNOS:
+            raise
+        return copy_file(task, buffer_size, progress_callback, update_interval, options)
+
+    checkpoint = None
+    resume_offset = 0
+    if options.checkpoints:
+        checkpoint = options.checkpoints.begin_file(task["source"], task["destination"],
+                                                    options.hash_algorithm)
+        resume_offset = checkpoint.resume(options.pool)
+        if resume_offset % DIRECT_IO_ALIGNMENT:
+            resume_offset = checkpoint.restart()  # O_DIRECT can only continue from an aligned offset
+
+    try:
+        flags = os.O_WRONLY | os.O_CREAT | os.O_DIRECT | (0 if resume_offset else os.O_TRUNC)
+        dst_fd = os.open(task["destination"], flags, 0o666)
+    except OSError as e:
+        os.close(src_fd)
+        if e.errno not in _UNSUPPORTED_ERRNOS:
+            raise
+        return copy_file(task, buffer_size, progress_callback, update_interval, options)
+
+    meter = ProgressMeter(task, progress_callback, update_interval, options.throttle)
+    durability = options.durability
+    if checkpoint is not None:
+        hasher = checkpoint.hasher
+    else:
+        hasher = new_hasher(options.hash_algorithm) if options.hash_algorithm else None
+    chunk_size = _align_up(max(buffer_size, DIRECT_IO_MIN_CHUNK))
+    task["copy_method"] = "direct"
+
+    with open(src_fd, "rb", buffering=0) as src, open(dst_fd, "wb", buffering=0) as dst:
+        file_size = os.fstat(src_fd).st_size
+        if resume_offset:
+            os.ftruncate(dst_fd, resume_offset)
+            os.lseek(src_fd, resume_offset, os.SEEK_SET)
+            os.lseek(dst_fd, resume_offset, os.SEEK_SET)
+            meter.advance(resume_offset, pace=False)
+        if options.preallocate:
+            preallocate(dst_fd, file_size)
+
+        written_total = resume_offset
+        with options.pool.buffer(chunk_size) as buffer:
+            while wait_while_paused(task):
+                try:
+                    chunk_size_read = os.readv(src_fd, [buffer])
+                    if not chunk_size_read:
+                        break
+
+                    # The final chunk is padded to the alignment and trimmed again below
+                    aligned_size = _align_up(chunk_size_read)
+                    if aligned_size != chunk_size_read:
+                        buffer[chunk_size_read:aligned_size] = bytes(aligned_size - chunk_size_read)
+                    view = buffer[:aligned_size]
+                    while view:
+                        written = os.write(dst_fd, view)
+                        view = view[written:]
+                except OSError as e:
+                    if written_total or e.errno not in _UNSUPPORTED_ERRNOS:
+                        raise
+                    # The filesystem accepted O_DIRECT at open() but rejects the transfers
+                    break
+
+                if hasher is not None:
+                    hasher.update(buffer[:chunk_size_read])
+                written_total += chunk_size_read
+                if checkpoint is not None:
+                    checkpoint.advance(dst, chunk_size_read)
+                durability.after_write(dst, chunk_size_read)
+                meter.advance(chunk_size_read)
+
+        if checkpoint is not None and task["cancelled"]:
+            checkpoint.commit(dst)
+        os.ftruncate(dst_fd, written_total)
+        durability.finish(dst)
+
+    if written_total == 0 and file_size > 0 and not task["cancelled"]:
+        return copy_file(task, buffer_size, progress_callback, update_interval, options)
+
+    meter.flush()
+    if checkpoint is not None and not task["cancelled"]:
+        checkpoint.clear()
+    if options.hash_algorithm and not task["cancelled"]:
+        record_hashes(task, hasher, options)
+    return task["copy_method"]
+
+
+class AsyncCopyEngine:
+    """Deep-queue copy engine: one asyncio loop keeps many chunk transfers in flight.
+
+    Every chunk is a positional read and write offloaded to a thread pool sized to the
+    queue depth, so all running tasks together keep up to queue_depth requests outstanding
+    instead of one per worker thread. Chunks are read into buffers checked out of the copy's
+    BufferPool, so the memory budget also caps how much data is in flight. Chunks may complete
+    out of order; they are hashed and checkpointed in order as the contiguous copied prefix grows.
+    """
+
+    def __init__(self, queue_depth: int = ASYNC_QUEUE_DEPTH, chunk_size: int = ASYNC_CHUNK_SIZE):
+        self.queue_depth = max(1, int(queue_depth))
+        self.chunk_size = chunk_size
+        self.executor = ThreadPoolExecutor(max_workers=self.queue_depth, thread_name_prefix="aio")
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="aio-loop", daemon=True)
+        self._thread.start()
+        self._in_flight = asyncio.run_coroutine_threadsafe(self._make_semaphore(), self.loop).result()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    async def _make_semaphore(self) -> asyncio.Semaphore:
+        return asyncio.Semaphore(self.queue_depth)
+
+    async def _run(self, function, *args):
+        """Run blocking work on the I/O pool"""
+        # A cancelled caller still waits for the work, so its buffer never goes back to the pool early
+        future = asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            await asyncio.wait([future])
+            raise
+
+    def resize(self, queue_depth: int):
+        """Change the queue depth; chunks already in flight finish on the old slots and pool"""
+        queue_depth = max(1, int(queue_depth))
+        if queue_depth == self.queue_depth:
+            return
+        old_executor = self.executor
+        self.queue_depth = queue_depth
+        self.executor = ThreadPoolExecutor(max_workers=queue_depth, thread_name_prefix="aio")
+        self._in_flight = asyncio.run_coroutine_threadsafe(self._make_semaphore(), self.loop).result()
+        old_executor.shutdown(wait=False)  # Queued reads and writes still run
+
+    def copy_file(self, task: Dict, progress_callback: Optional[Callable[[], None]] = None,
+                  update_interval: float = 0.25, options: Optional[CopyOptions] = None) -> str:
+        """Copy task["source"] to task["destination"] on the engine loop; blocks the caller until done"""
+        options = options or CopyOptions()
+        meter = ProgressMeter(task, progress_callback, update_interval, options.throttle)
+        checkpoint = None
+        hasher = None
+        if options.checkpoints:
+            checkpoint = options.checkpoints.begin_file(task["source"], task["destination"],
+                                                        options.hash_algorithm)
+        elif options.hash_algorithm:
+            hasher = new_hasher(options.hash_algorithm)
+
+        future = asyncio.run_coroutine_threadsafe(
+            self._copy(task, meter, options, hasher, checkpoint), self.loop)
+        future.result()
+        meter.flush()
+
+        if checkpoint is not None:
+            hasher = checkpoint.hasher
+            if not task["cancelled"]:
+                checkpoint.clear()
+        if options.hash_algorithm and not task["cancelled"]:
+            record_hashes(task, hasher, options)
+        return task["copy_method"]
+
+    async def _copy(self, task: Dict, meter: ProgressMeter, options: CopyOptions,
+                    hasher, checkpoint: Optional[FileCheckpoint]):
+        loop = asyncio.get_running_loop()
+        chunk_size = self.chunk_size
+        task["copy_method"] = "async"
+        resume_offset = 0
+        if checkpoint is not None:
+            resume_offset = await loop.run_in_executor(self.executor, checkpoint.resume, options.pool)
+            hasher = checkpoint.hasher
+
+        with open(task["source"], "rb", buffering=0) as src, \
+                open(task["destination"], "r+b" if resume_offset else "wb", buffering=0) as dst:
+            src_fd, dst_fd = src.fileno(), dst.fileno()
+            file_size = os.fstat(src_fd).st_size
+            if resume_offset:
+                meter.advance(resume_offset, pace=False)
+            # Size the destination up front so chunks can land anywhere in it
+            if not (options.preallocate and preallocate(dst_fd, file_size)):
+                os.ftruncate(dst_fd, file_size)
+
+            window = asyncio.Semaphore(self.queue_depth)  # Chunks of this file not yet hashed
+            # Written chunks waiting for the hash frontier, as (view, pooled buffer)
+            finished: Dict[int, Tuple[memoryview, mmap.mmap]] = {}
+            frontier = resume_offset  # Everything before this offset is written and hashed
+
+            drain_lock = asyncio.Lock()  # One chunk at a time feeds the frontier to the hash
+
+            def release(view: memoryview, buffer: mmap.mmap):
+                view.release()
+                options.pool.release(buffer)
+
+            # fsyncs, hashing and checkpoint writes block, so they run on the I/O pool as well
+            # and the loop stays free to keep other tasks' chunks moving
+            def write_chunk(view: memoryview, offset: int):
+                _write_at(dst_fd, view, offset)
+                options.durability.after_write(dst, len(view))
+
+            def absorb(block: memoryview):
+                if hasher is not None:
+                    hasher.update(block)
+                if checkpoint is not None:
+                    checkpoint.advance(dst, len(block))
+
+            def finish():
+                if task["cancelled"]:
+                    if checkpoint is not None:
+                        checkpoint.commit(dst)
+                    os.ftruncate(dst_fd, frontier)  # Chunks past a gap are copied again on resume
+                options.durability.finish(dst)
+
+            async def copy_chunk(offset: int, view: memoryview, buffer: mmap.mmap):
+                nonlocal frontier
+                length = len(view)
+                try:
+                    # Rate limits are charged before the read so a throttled task holds no queue slot
+                    limiters = meter.reserve(length)
+                    while limiters and not task["cancelled"]:
+                        delay = throttle_delay(limiters)
+                        if delay <= 0:
+                            break
+                        await asyncio.sleep(min(delay, THROTTLE_SLICE))
+                    async with self._in_flight:
+                        count = await self._run(_read_at, src_fd, view, offset)
+                        if count != length:
+                            raise IOError(f"Unexpected end of file at offset {offset + count}")
+                        await self._run(write_chunk, view, offset)
+                except BaseException:
+                    release(view, buffer)
+                    raise
+                meter.advance(length, pace=False)
+
+                # Feed the contiguous prefix to the hash and checkpoint in file order
+                finished[offset] = (view, buffer)
+                async with drain_lock:
+                    while frontier in finished:
+                        block, block_buffer = finished.pop(frontier)
+                        block_length = len(block)
+                        try:
+                            if hasher is not None or checkpoint is not None:
+                                await self._run(absorb, block)
+                        finally:
+                            release(block, block_buffer)
+                        frontier += block_length
+                        window.release()
+
+            pending = []
+            try:
+                offset = resume_offset
+                while offset < file_size:
+                    while task["paused"] and not task["cancelled"]:
+                        await asyncio.sleep(0.1)
+                    if task["cancelled"]:
+                        break
+                    await window.acquire()
+                    # Buffers are checked out in file order, so the frontier chunk always holds one
+                    # and a tight pool budget slows the copy instead of deadlocking it. The wait runs
+                    # on the default executor so it never takes a thread the chunk I/O needs.
+                    buffer = await loop.run_in_executor(None, options.pool.acquire, chunk_size)
+                    length = min(chunk_size, len(buffer), file_size - offset)
+                    pending.append(asyncio.ensure_future(
+                        copy_chunk(offset, memoryview(buffer)[:length], buffer)))
+                    offset += length
+                    for future in pending:
+                        if future.done():
+                            future.result()  # Re-raise the first I/O error
+                    pending = [future for future in pending if not future.done()]
+                await asyncio.gather(*pending)
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                raise
+            finally:
+                for view, buffer in finished.values():
+                    release(view, buffer)
+                finished.clear()
+            await self._run(finish)
+
+    def close(self):
+        """Stop the loop thread and the I/O pool"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+        self.executor.shutdown(wait=False)
+
+
+class VerificationError(Exception):
+    """A copied file or folder does not match its source"""
+
+
+class TaskState(Enum):
+    """Where a task is in its life; the value is the label shown in the task list"""
+    PENDING = "⏳ Pending"
+    STARTING = "🚀 Auto-Starting"
+    RUNNING = "🔄 Running"
+    VERIFYING = "🔍 Verifying"
+    RETRYING = "🔄 Retry"
+    PAUSED = "⏸ Paused"
+    COMPLETED = "✅ Completed"
+    SKIPPED = "⏭ Skipped"
+    CANCELLED = "❌ Cancelled"
+    ERROR = "❌ Error"
+
+
+class CopyTask:
+    """One queued file or folder copy, with every field the engine and FileCopierApp use.
+
+    Slots keep a queued task to a fixed block of pointers instead of a per-task dict, which
+    matters once hundreds of thousands of files are queued. Fields can also be read and
+    written by key (task["copied"]), so the engine works on these and on plain dicts alike.
+    "status" is a read-only key holding the display label for the state.
+    """
+
+    __slots__ = (
+        "id", "source", "destination", "filename", "size", "copied", "progress", "speed",
+        "state", "paused", "cancelled", "suspended", "completed", "start_time", "last_update",
+        "completion_time", "retry_count", "error_message", "copy_method", "direct_io",
+        "hash_algorithm", "source_hash", "destination_hash", "mismatches", "rate_limit_mb",
+        "priority", "future", "ui_dirty"
+    )
+
+    def __init__(self, source: str, destination: str, size: int = 0, task_id: int = 0,
+                 state: TaskState = TaskState.PENDING):
+        self.id = task_id
+        self.source = source
+        self.destination = destination
+        self.filename = os.path.basename(source.rstrip("/\\")) or source
+        self.size = size
+        self.copied = 0
+        self.progress = 0.0
+        self.speed = 0.0
+        self.state = state
+        self.paused = False
+        self.cancelled = False
+        self.suspended = False
+        self.completed = False
+        self.start_time = 0
+        self.last_update = 0
+        self.completion_time = 0
+        self.retry_count = 0
+        self.error_message = ""
+        self.copy_method = ""
+        self.direct_io = None  # None = follow the auto direct I/O setting
+        self.hash_algorithm = ""
+        self.source_hash = ""
+        self.destination_hash = ""
+        self.mismatches = ()  # Replaced by a list when a folder verify finds differences
+        self.rate_limit_mb = 0
+        self.priority = 0
+        self.future = None
+        self.ui_dirty = False
+
+    @property
+    def status(self) -> str:
+        """Label for the task list, with the error message or retry number where there is one"""
+        if self.state is TaskState.ERROR:
+            return f"{self.state.value}: {self.error_message}"
+        if self.state is TaskState.RETRYING:
+            return f"{self.state.value} {self.retry_count}"
+        return self.state.value
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value):
+        try:
+            setattr(self, key, value)  # Names outside __slots__ (and "status") are refused
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__ or key == "status"
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def update(self, fields=(), **more):
+        for key, value in dict(fields, **more).items():
+            self[key] = value
+
+    def __repr__(self) -> str:
+        return f"CopyTask({self.id}, {self.source!r} -> {self.destination!r}, {self.state.name})"
+
+
+def path_size(path: str) -> int:
+    """Size of a file, or the total size of the files under a directory"""
+    if os.path.isdir(path):
+        return sum(size for _, size in scan_tree(path)[1])
+    return os.path.getsize(path)
+
+
+def has_free_space(path: str, required_size: int) -> bool:
+    """Whether the filesystem holding path has room for required_size plus 10%"""
+    try:
+        return shutil.disk_usage(path).free > required_size * 1.1
+    except OSError:
+        return True  # If we can't check, assume it's okay
+
+
+class CopyEngine:
+    """Runs copy tasks from a settings dict with no GUI attached.
+
+    Picks the copy path for each file, mirrors or copies folders, verifies the result and
+    owns the state shared by all tasks: the buffer pool, the buffer tuner, the bandwidth
+    throttle and the asyncio engine. FileCopierApp and copy_cli both drive tasks through it.
+    """
+
+    def __init__(self, settings: Dict, checkpoint_dir: str = "checkpoints",
+                 tuning_path: str = "buffer_tuning.json", logger: Optional[logging.Logger] = None):
+        self.checkpoint_dir = checkpoint_dir
+        self.tuner = BufferTuner(tuning_path)
+        self.throttle = Throttle()
+        self.async_engine: Optional[AsyncCopyEngine] = None  # Started on first use
+        self.logger = logger or logging.getLogger(__name__)
+        self.reconfigure(settings)
+
+    def reconfigure(self, settings: Dict):
+        """Apply (possibly changed) settings; running copies keep their buffers and see new limits"""
+        self.settings = settings
+        self.pool = BufferPool(settings.get("buffer_pool_mb", 64) * 1024 * 1024)
+        if self.async_engine is not None:
+            self.async_engine.resize(settings.get("async_queue_depth", 32))
+        try:
+            self.throttle.configure_from_settings(settings)
+        except ValueError as e:
+            self.logger.warning(f"Ignoring invalid bandwidth limits: {e}")
+            self.throttle.configure(settings.get("global_rate_limit_mb", 0))
+
+    def options(self) -> CopyOptions:
+        # Checkpoints fsync only under the fsync policies; "none" and "flush-at-end" stay at full speed
+        checkpoints = CheckpointStore(
+            self.checkpoint_dir,
+            self.settings.get("checkpoint_interval_mb", 256) * 1024 * 1024,
+            sync=DurabilityPolicy(self.settings.get("durability_policy", "flush-at-end")).fsyncs
+        )
+        return CopyOptions.from_settings(self.settings, pool=self.pool, tuner=self.tuner,
+                                         checkpoints=checkpoints, throttle=self.throttle)
+
+    def get_async_engine(self) -> AsyncCopyEngine:
+        if self.async_engine is None:
+            self.async_engine = AsyncCopyEngine(self.settings.get("async_queue_depth", 32))
+        return self.async_engine
+
+    def close(self):
+        if self.async_engine:
+            self.async_engine.close()
+            self.async_engine = None
+
+    def use_direct_io(self, task: Dict) -> bool:
+        """Whether a file task should use O_DIRECT (per-task choice first, then the size rule)"""
+        if task.get("direct_io") is not None:
+            return task["direct_io"]
+        threshold = self.settings.get("direct_io_threshold_mb", 8192) * 1024 * 1024
+        return self.settings.get("direct_io_auto", False) and task["size"] >= threshold
+
+    def has_checkpoint(self, task: Dict) -> bool:
+        """Whether an interrupted copy of this task can be resumed"""
+        checkpoints = self.options().checkpoints
+        return checkpoints is not None and checkpoints.exists(task["source"], task["destination"])
+
+    def required_space(self, task: Dict) -> int:
+        """Bytes the destination still has to take for this task, for the free-space check"""
+        if self.settings.get("sync_mode", False) and os.path.isdir(task["source"]):
+            return 0  # sync_tree checks the bytes its plan copies
+        delta = self.settings.get("overwrite_policy", "prompt") == "update-delta"
+        if os.path.exists(task["destination"]) and (delta or self.has_checkpoint(task)):
+            # Resumed and in-place updates only add what the destination does not hold yet
+            return max(0, task["size"] - path_size(task["destination"]))
+        return task["size"]
+
+    def run_task(self, task: Dict, progress_callback: Optional[Callable[[], None]] = None,
+                 on_error: Optional[Callable[[str, Exception], None]] = None,
+                 on_verify: Optional[Callable[[], None]] = None,
+                 update_interval: Optional[float] = None) -> str:
+        """Copy one task start to finish: space check, exists policy, copy and verification.
+
+        Returns "completed", "skipped", "cancelled" or "paused". Failures raise; a copy that
+        does not match its source raises VerificationError. update_interval defaults to
+        0.25s for files and 0.5s for folders.
+        """
+        source = task["source"]
+        destination = task["destination"]
+        if not has_free_space(os.path.dirname(destination), self.required_space(task)):
+            raise OSError(errno.ENOSPC, "Insufficient disk space")
+
+        # A checkpointed partial copy is resumed instead, and sync mode brings an existing
+        # folder up to date. "prompt" is left to the caller; here the copy goes ahead.
+        syncing = self.settings.get("sync_mode", False) and os.path.isdir(source)
+        if os.path.exists(destination) and not self.has_checkpoint(task) and not syncing:
+            policy = self.settings.get("overwrite_policy", "prompt")
+            if policy == "skip":
+                return "skipped"
+            if policy == "overwrite" and self.settings.get("create_backup", False) and os.path.isfile(destination):
+                shutil.copy2(destination, destination + ".bak")
+
+        os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+        if os.path.isfile(source):
+            self.copy_file(task, progress_callback, update_interval or 0.25)
+        elif os.path.isdir(source):
+            self.copy_directory(task, progress_callback, update_interval or 0.5, on_error)
+        else:
+            raise FileNotFoundError(errno.ENOENT, "Source not found", source)
+
+        if task.get("suspended"):
+            return "paused"
+        if task["cancelled"]:
+            return "cancelled"
+
+        if self.settings.get("verify_copy", True):
+            if on_verify:
+                on_verify()
+            if not self.verify(task):
+                if task["mismatches"]:
+                    raise VerificationError(f"Copy verification failed: {len(task['mismatches'])} file(s) differ")
+                raise VerificationError("Copy verification failed")
+        return "completed"
+
+    def copy_file(self, task: Dict, progress_callback: Optional[Callable[[], None]] = None,
+                  update_interval: float = 0.25) -> str:
+        """Copy one file over the best path for it and return the name of that path"""
+        # Start from the best size measured for this drive pair; the read/write
+        # loop keeps tuning it while the copy runs
+        buffer_size = self.settings.get("buffer_size", 64 * 1024)
+        if self.settings.get("adaptive_buffer", True):
+            buffer_size = self.tuner.initial_size(task["source"], task["destination"], buffer_size)
+        options = self.options()
+        stripe_threshold = self.settings.get("stripe_threshold_mb", 1024) * 1024 * 1024
+        # Paths that cannot stream a hash leave these empty, so verify hashes both sides
+        task["source_hash"] = task["destination_hash"] = ""
+
+        if options.delta and os.path.isfile(task["destination"]):
+            # Existing destination - rewrite only the blocks that changed
+            summary = copy_file_delta(task, progress_callback, update_interval, options)
+            self.logger.info(
+                f"Delta update of {task['destination']}: {summary['changed_blocks']}/{summary['blocks']} "
+                f"blocks changed, {summary['bytes_written']} bytes written"
+            )
+        elif self.use_direct_io(task):
+            # Far larger than RAM - bypass the page cache with O_DIRECT
+            copy_file_direct(task, buffer_size, progress_callback, update_interval, options)
+        elif self.settings.get("io_engine", "threads") == "async":
+            # Many chunk transfers in flight at once, shared with the other running tasks
+            self.get_async_engine().copy_file(task, progress_callback, update_interval, options)
+        elif STRIPED_COPY_SUPPORTED and options.stripe_workers > 1 and task["size"] >= stripe_threshold:
+            # Huge file - copy ranges in parallel with pread/pwrite; verify hashes both sides afterwards
+            copy_file_striped(task, buffer_size, progress_callback, update_interval, options)
+        else:
+            # Kernel copy (copy_file_range/sendfile) when available, read/write loop otherwise
+            copy_file(task, buffer_size, progress_callback, update_interval, options)
+        self.logger.info(f"Copied {task['source']} via {task['copy_method']}")
+        return task["copy_method"]
+
+    def copy_directory(self, task: Dict, progress_callback: Optional[Callable[[], None]] = None,
+                       update_interval: float = 0.5,
+                       on_error: Optional[Callable[[str, Exception], None]] = None) -> Dict:
+        """Copy a folder, or mirror it when sync mode is on, and return the summary"""
+        source = task["source"]
+        buffer_size = self.settings.get("buffer_size", 64 * 1024)
+        if self.settings.get("sync_mode", False):
+            # Mirror: only new and changed files are copied
+            summary = sync_tree(
+                task, buffer_size, progress_callback, update_interval, self.options(), on_error,
+                compare_hash=self.settings.get("sync_compare_hash", False),
+                delete_extras=self.settings.get("sync_delete_extras", False)
+            )
+            self.logger.info(
+                f"Synced {source}: {summary['copied']} copied, {summary['unchanged']} unchanged, "
+                f"{summary['deleted']} removed from destination"
+            )
+        else:
+            # One walk, directories created up front, small files copied in parallel batches
+            summary = copy_tree(task, buffer_size, progress_callback, update_interval, self.options(), on_error)
+        if summary["errors"]:
+            # Partial copy - the files that could be copied were
+            self.logger.warning(f"Partial copy error for {source}: {summary['errors']} files failed")
+        return summary
+
+    def verify(self, task: Dict) -> bool:
+        """Check task["destination"] against task["source"]; folder mismatches go to task["mismatches"]"""
+        source = task["source"]
+        destination = task["destination"]
+        if os.path.isdir(source):
+            if not os.path.isdir(destination):
+                return False
+            summary = verify_tree(task, self.options(),
+                                  stop_on_first=self.settings.get("verify_stop_on_first", False),
+                                  on_mismatch=lambda path, reason: self.logger.error(
+                                      f"Verification mismatch in {destination}: {path} ({reason})"))
+            task["mismatches"] = [relative_path for relative_path, _ in summary["mismatches"]]
+            if not task["mismatches"]:
+                self.logger.info(f"Verified {summary['verified']} files in {destination}")
+            return not task["mismatches"]
+
+        if not os.path.isfile(source) or not os.path.isfile(destination):
+            return False
+        if os.path.getsize(source) != os.path.getsize(destination):
+            return False
+        if not task.get("source_hash"):
+            # Nothing streamed during a copy - hash both sides now
+            algorithm = DEFAULT_HASH_ALGORITHM
+            task["hash_algorithm"] = algorithm
+            task["source_hash"] = hash_file(source, algorithm, self.pool)
+            task["destination_hash"] = hash_file(destination, algorithm, self.pool, uncached=True)
+        if task.get("destination_hash") and task["destination_hash"] != task["source_hash"]:
+            self.logger.error(
+                f"Hash mismatch for {destination}: {task['hash_algorithm']} "
+                f"{task['source_hash']} != {task['destination_hash']}"
+            )
+            return False
+        self.logger.info(f"Verified {destination} ({task['hash_algorithm']} {task['source_hash']})")
+        return True
@@ -1,11 +1,12 @@
 import os
-import shutil
+import errno
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import customtkinter as ctk
 import threading
 import queue
 import time
+from collections import deque
 import json
 import sys
 import psutil
@@ -15,10 +16,15 @@ import logging
 import re
 from typing import Dict, List, Optional
 from datetime import datetime
-import uuid
 import hashlib
 import base64
 
+import copy_cli
+import copy_engine
+from copy_engine import CopyTask, TaskState
+import task_registry
+import task_scheduler
+
 # Native drag and drop implementation - more reliable than tkinterdnd2
 class NativeDragDrop:
     def __init__(self, widget, callback):
@@ -138,9 +144,14 @@ class FileCopierApp:
         self.setup_app_icon()
         
         # Initialize variables
-        self.copy_tasks = []
+        self.copy_tasks = task_registry.TaskRegistry()  # Queue order plus running progress totals
+        self.completion_check_pending = False
         self.task_queue = queue.Queue()
+        self.dirty_tasks = deque()  # Tasks whose rows changed; workers append, the UI timer drains
+        self.retry_tasks = deque()  # (due time, task) of failed copies; the UI timer submits them
         self.executor = None
+        self.scheduler = None
+        self.engine = None  # Tk-free copy engine, created with the executor
         self.is_copying = False
         self.clipboard_files = []
         self.current_dir = os.getcwd()
@@ -159,6 +170,9 @@ class FileCopierApp:
         # Start auto-cleanup of completed tasks
         self.start_auto_cleanup()
         
+        # One timer applies all task progress to the tree
+        self.root.after(100, self.run_task_updates)
+        
         # Check license on startup
         self.check_license_on_startup()
         
@@ -229,15 +243,8 @@ class FileCopierApp:
 
     def add_copy_task(self, source, destination):
         """Add a copy task to the queue"""
-        task = {
-            "id": str(uuid.uuid4()),
-            "source": source,
-            "destination": destination,
-            "status": "pending",
-            "progress": 0,
-            "created": datetime.now()
-        }
-        self.copy_tasks.append(task)
+        if not self.add_task(source, destination):
+            return
         self.update_recent_operations(f"کپی {os.path.basename(source)}", "در صف")
         self.update_status(f"تسک کپی اضافه شد: {os.path.basename(source)}")
 
@@ -362,6 +369,98 @@ class FileCopierApp:
         
         max_workers = self.settings.get("max_threads", optimal_threads)
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        
+        # The engine owns the copy buffers (one memory budget for all workers, so raising
+        # max_threads cannot exhaust RAM), the buffer sizes measured per drive pair and
+        # the bandwidth limits, which running copies re-read on every chunk
+        if self.engine is None:
+            self.engine = copy_engine.CopyEngine(self.settings, logger=self.logger)
+        else:
+            self.engine.reconfigure(self.settings)
+        
+        # Tasks reach the pool through the device scheduler, which keeps per-disk limits
+        # and hands over only as many tasks as there are workers; the rest wait in
+        # priority and queue order, so reordering the task list changes what runs next
+        if self.scheduler is None:
+            self.scheduler = task_scheduler.DeviceScheduler(
+                self.executor,
+                lambda: self.all_drives,
+                self.get_device_limits(),
+                on_wait=self.mark_task_waiting,
+                max_running=max_workers,
+                order_of=lambda task: self.copy_tasks.position(task)
+            )
+        else:
+            # Settings were saved - keep the waiting tasks, use the new pool and limits
+            self.scheduler.executor = self.executor
+            self.scheduler.set_limits(self.get_device_limits())
+            self.scheduler.set_max_running(max_workers)
+
+    def get_device_limits(self) -> Dict[str, int]:
+        """Per-device-kind concurrency limits from settings"""
+        return {
+            "hdd": self.settings.get("hdd_concurrency", 1),
+            "ssd": self.settings.get("ssd_concurrency", 4),
+            "network": self.settings.get("network_concurrency", 2),
+            "unknown": self.settings.get("ssd_concurrency", 4)
+        }
+
+    def submit_task(self, task: Dict):
+        """Queue a task on the device scheduler"""
+        task["future"] = self.scheduler.submit(task, self.copy_task)
+
+    def mark_task_waiting(self, task: Dict):
+        """Show a task that is waiting for its disk to become free"""
+        task["state"] = TaskState.PENDING
+        self.publish_task(task)
+
+    def publish_task(self, task: Dict):
+        """Mark a task's row for the next UI refresh; safe to call from any thread"""
+        # deque.append is atomic, and the flag keeps a busy task from queueing twice per frame
+        if not task.get("ui_dirty"):
+            task["ui_dirty"] = True
+            self.dirty_tasks.append(task)
+
+    def run_task_updates(self):
+        """UI timer: apply the task rows published since the last frame, then re-arm"""
+        try:
+            self.flush_task_updates()
+        except Exception as e:
+            self.logger.error(f"Error applying task updates: {e}")
+        interval = self.settings.get("progress_update_interval", 0.5)
+        self.root.after(max(20, int(interval * 1000)), self.run_task_updates)
+
+    def flush_task_updates(self):
+        """Refresh every published row once, then the overall progress once"""
+        # Take the completion flag before draining: a worker publishes its final state before
+        # it raises the flag, so a raised flag's task is always in this batch. Taken after the
+        # drain, the flag could be consumed against a task whose final state is still queued.
+        check_completion = self.completion_check_pending
+        self.completion_check_pending = False
+        self.submit_due_retries()
+        batch = {}
+        for _ in range(len(self.dirty_tasks)):
+            task = self.dirty_tasks.popleft()
+            task["ui_dirty"] = False  # Cleared before reading, so later progress queues it again
+            batch[id(task)] = task
+        
+        if batch:
+            for task in batch.values():
+                self.refresh_task_row(task)
+            self.update_overall_progress()
+        
+        if check_completion:
+            self.check_all_tasks_complete()
+
+    def submit_due_retries(self):
+        """Queue the failed copies whose retry delay is over; runs on the UI thread"""
+        now = time.time()
+        for _ in range(len(self.retry_tasks)):
+            due, task = self.retry_tasks.popleft()
+            if due > now:
+                self.retry_tasks.append((due, task))
+            elif task["state"] == TaskState.RETRYING and not task["cancelled"]:
+                self.submit_task(task)
 
     def load_settings(self) -> Dict:
         """Load application settings from file"""
@@ -370,13 +469,44 @@ class FileCopierApp:
             "buffer_size": 64 * 1024,  # 64KB default
             "max_threads": 4,
             "overwrite_policy": "prompt",
+            "sync_mode": False,
+            "sync_compare_hash": False,
+            "sync_delete_extras": False,
             "window_geometry": "1100x700",
             "verify_copy": True,
+            "verify_readback": True,
+            "verify_workers": 8,
+            "verify_stop_on_first": False,
+            "resume_checkpoints": True,
+            "checkpoint_interval_mb": 256,
             "show_hidden_files": False,
             "auto_retry": True,
             "retry_count": 3,
             "progress_update_interval": 0.5,
             "use_compression": False,
+            "zero_copy": True,
+            "durability_policy": "flush-at-end",
+            "fsync_interval_mb": 64,
+            "buffer_pool_mb": 64,
+            "stripe_threshold_mb": 1024,
+            "stripe_workers": 4,
+            "io_engine": "threads",
+            "async_queue_depth": 32,
+            "hdd_concurrency": 1,
+            "ssd_concurrency": 4,
+            "network_concurrency": 2,
+            "global_rate_limit_mb": 0,
+            "destination_rate_limits": "",
+            "bandwidth_schedule": "",
+            "tree_workers": 8,
+            "small_file_threshold_kb": 1024,
+            "preallocate": True,
+            "adaptive_buffer": True,
+            "avoid_page_cache": False,
+            "direct_io_auto": False,
+            "direct_io_threshold_mb": 8192,
+            "mmap_min_mb": 4,
+            "mmap_max_mb": 512,
             "preserve_permissions": True,
             "create_backup": False,
             "notification_sound": True,
@@ -422,6 +552,13 @@ class FileCopierApp:
         except Exception as e:
             self.logger.error(f"Failed to save cache: {e}")
 
+    def save_buffer_tuning(self):
+        """Save measured buffer sizes to disk"""
+        try:
+            self.engine.tuner.save()
+        except Exception as e:
+            self.logger.error(f"Failed to save buffer tuning: {e}")
+
     def initial_system_scan(self):
         """Comprehensive system scan for drives and files at startup"""
         try:
@@ -653,21 +790,21 @@ class FileCopierApp:
                 current_time = time.time()
                 tasks_to_remove = []
                 
-                for i, task in enumerate(self.copy_tasks):
-                    if task["completed"] and task["status"] == "✅ Completed":
+                for task in self.copy_tasks.with_state(TaskState.COMPLETED):
+                    if task["completed"]:
                         # Check if task was completed more than 30 seconds ago
                         completion_time = task.get("completion_time", 0)
                         if completion_time > 0 and (current_time - completion_time) > 30:
-                            tasks_to_remove.append(i)
+                            tasks_to_remove.append(task)
                 
                 # Remove completed tasks from list and tree
-                for i in reversed(tasks_to_remove):
-                    task_id = self.copy_tasks[i]["id"]
+                for task in tasks_to_remove:
                     try:
-                        self.task_tree.delete(str(task_id))
+                        self.task_tree.delete(str(task["id"]))
                     except:
                         pass
-                    self.copy_tasks.pop(i)
+                removed_ids = {task["id"] for task in tasks_to_remove}
+                self.copy_tasks.remove_where(lambda task: task["id"] in removed_ids)
                 
                 if tasks_to_remove:
                     print(f"🧹 Cleaned up {len(tasks_to_remove)} completed tasks")
@@ -1186,6 +1323,15 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
         ctk.CTkButton(task_controls, text="🗑 پاک کردن تکمیل شده", command=self.clear_completed, font=ctk.CTkFont(family="B Nazanin")).pack(side="right", padx=5)
         ctk.CTkButton(task_controls, text="↓ پایین بردن", command=self.move_task_down, font=ctk.CTkFont(family="B Nazanin")).pack(side="right", padx=5)
         ctk.CTkButton(task_controls, text="↑ بالا بردن", command=self.move_task_up, font=ctk.CTkFont(family="B Nazanin")).pack(side="right", padx=5)
+        ctk.CTkButton(task_controls, text="⚡ فوری", command=self.toggle_urgent_selected_task, font=ctk.CTkFont(family="B Nazanin")).pack(side="right", padx=5)
+        ctk.CTkButton(task_controls, text="💿 Direct I/O", command=self.toggle_direct_io_selected_task, font=ctk.CTkFont(family="B Nazanin")).pack(side="left", padx=5)
+        ctk.CTkButton(task_controls, text="🚦 محدودیت سرعت", command=self.set_rate_limit_selected_task, font=ctk.CTkFont(family="B Nazanin")).pack(side="left", padx=5)
+        
+        # Global bandwidth limit, applied to running copies as soon as it is set
+        self.live_rate_limit_var = tk.StringVar(value=str(self.settings.get("global_rate_limit_mb", 0)))
+        ctk.CTkLabel(task_controls, text="MB/s").pack(side="left")
+        ctk.CTkEntry(task_controls, textvariable=self.live_rate_limit_var, width=60).pack(side="left", padx=5)
+        ctk.CTkButton(task_controls, text="🚦 اعمال", width=60, command=self.apply_global_rate_limit, font=ctk.CTkFont(family="B Nazanin")).pack(side="left", padx=5)
         
         # Progress overview
         progress_frame = ctk.CTkFrame(self.tasks_frame)
@@ -1327,6 +1473,46 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
         )
         buffer_rec.pack(pady=(2, 0))
         
+        # Adaptive buffer sizing
+        self.adaptive_buffer_var = tk.BooleanVar(value=self.settings.get("adaptive_buffer", True))
+        adaptive_buffer_checkbox = ctk.CTkCheckBox(
+            buffer_frame,
+            text="📈 Adaptive Buffer Size (tune from measured speed, remembered per drive pair)",
+            variable=self.adaptive_buffer_var,
+            font=ctk.CTkFont(family="B Nazanin", size=12, weight="bold")
+        )
+        adaptive_buffer_checkbox.pack(anchor="w", pady=(5, 0))
+        
+        # Memory-mapped copy size range
+        mmap_frame = ctk.CTkFrame(buffer_frame, fg_color="transparent")
+        mmap_frame.pack(fill="x", pady=(5, 0))
+        
+        ctk.CTkLabel(
+            mmap_frame, 
+            text="🗺 Memory-Mapped Copy From:", 
+            font=ctk.CTkFont(family="B Nazanin", size=12, weight="bold")
+        ).pack(side="left")
+        
+        ctk.CTkLabel(mmap_frame, text="MB").pack(side="right")
+        
+        self.mmap_max_var = tk.StringVar(value=str(self.settings.get("mmap_max_mb", 512)))
+        mmap_max_entry = ctk.CTkEntry(
+            mmap_frame, 
+            textvariable=self.mmap_max_var, 
+            width=60
+        )
+        mmap_max_entry.pack(side="right", padx=5)
+        
+        ctk.CTkLabel(mmap_frame, text="to").pack(side="right")
+        
+        self.mmap_min_var = tk.StringVar(value=str(self.settings.get("mmap_min_mb", 4)))
+        mmap_min_entry = ctk.CTkEntry(
+            mmap_frame, 
+            textvariable=self.mmap_min_var, 
+            width=60
+        )
+        mmap_min_entry.pack(side="right", padx=5)
+        
         # Max threads with slider
         threads_frame = ctk.CTkFrame(perf_frame, fg_color="transparent")
         threads_frame.pack(fill="x", padx=15, pady=8)
@@ -1368,6 +1554,238 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
         )
         threads_rec.pack(pady=(2, 0))
         
+        # Striped copy of huge files
+        stripe_frame = ctk.CTkFrame(perf_frame, fg_color="transparent")
+        stripe_frame.pack(fill="x", padx=15, pady=8)
+        
+        ctk.CTkLabel(
+            stripe_frame, 
+            text="🧩 Parallel Copy Above:", 
+            font=ctk.CTkFont(family="B Nazanin", size=12, weight="bold")
+        ).pack(side="left")
+        
+        self.stripe_workers_var = tk.StringVar(value=str(self.settings.get("stripe_workers", 4)))
+        stripe_workers_entry = ctk.CTkEntry(
+            stripe_frame, 
+            textvariable=self.stripe_workers_var, 
+            width=50
+        )
+        stripe_workers_entry.pack(side="right", padx=5)
+        
+        ctk.CTkLabel(stripe_frame, text="MB, workers:").pack(side="right")
+        
+        self.stripe_threshold_var = tk.StringVar(value=str(self.settings.get("stripe_threshold_mb", 1024)))
+        stripe_threshold_entry = ctk.CTkEntry(
+            stripe_frame, 
+            textvariable=self.stripe_threshold_var, 
+            width=70
+        )
+        stripe_threshold_entry.pack(side="right", padx=5)
+        
+        # I/O engine
+        io_engine_frame = ctk.CTkFrame(perf_frame, fg_color="transparent")
+        io_engine_frame.pack(fill="x", padx=15, pady=8)
+        
+        ctk.CTkLabel(
+            io_engine_frame, 
+            text="🚀 I/O Engine:", 
+            font=ctk.CTkFont(family="B Nazanin", size=12, weight="bold")
+        ).pack(side="left")
+        
+        self.async_queue_depth_var = tk.StringVar(value=str(self.settings.get("async_queue_depth", 32)))
+        async_depth_entry = ctk.CTkEntry(
+            io_engine_frame, 
+            textvariable=self.async_queue_depth_var, 
+            width=60
+        )
+        async_depth_entry.pack(side="right", padx=5)
+        
+        ctk.CTkLabel(io_engine_frame, text="queue depth:").pack(side="right")
+        
+        self.io_engine_var = tk.StringVar(value=self.settings.get("io_engine", "threads"))
+        io_engine_combo = ctk.CTkComboBox(
+            io_engine_frame, 
+            values=["threads", "async"],
+            variable=self.io_engine_var, 
+            width=110
+        )
+        io_engine_combo.pack(side="right", padx=5)
+        
+        # Per-device concurrency
+        device_frame = ctk.CTkFrame(perf_frame, fg_color="transparent")
+        device_frame.pack(fill="x", padx=15, pady=8)
+        
+        ctk.CTkLabel(
+            device_frame, 
+            text="💽 Tasks per Disk:", 
+            font=ctk.CTkFont(family="B Nazanin", size=12, weight="bold")
+        ).pack(side="left")
+        
+        self.network_concurrency_var = tk.StringVar(value=str(self.settings.get("network_concurrency", 2)))
+        network_entry = ctk.CTkEntry(device_frame, textvariable=self.network_concurrency_var, width=40)
+        network_entry.pack(side="right", padx=5)
+        ctk.CTkLabel(device_frame, text="Network").pack(side="right")
+        
+        self.ssd_concurrency_var = tk.StringVar(value=str(self.settings.get("ssd_concurrency", 4)))
+        ssd_entry = ctk.CTkEntry(device_frame, textvariable=self.ssd_concurrency_var, width=40)
+        ssd_entry.pack(side="right", padx=5)
+        ctk.CTkLabel(device_frame, text="SSD").pack(side="right")
+        
+        self.hdd_concurrency_var = tk.StringVar(value=str(self.settings.get("hdd_concurrency", 1)))
+        hdd_entry = ctk.CTkEntry(device_frame, textvariable=self.hdd_concurrency_var, width=40)
+        hdd_entry.pack(side="right", padx=5)
+        ctk.CTkLabel(device_frame, text="HDD").pack(side="right")
+        
+        # Bandwidth limits
+        bandwidth_frame = ctk.CTkFrame(perf_frame, fg_color="transparent")
+        bandwidth_frame.pack(fill="x", padx=15, pady=8)
+        
+        ctk.CTkLabel(
+            bandwidth_frame, 
+            text="🚦 Bandwidth Limit:", 
+            font=ctk.CTkFont(family="B Nazanin", size=12, weight="bold")
+        ).pack(side="left")
+        
+        ctk.CTkLabel(bandwidth_frame, text="MB/s (0 = unlimited)").pack(side="right")
+        
+        self.global_rate_limit_var = tk.StringVar(value=str(self.settings.get("global_rate_limit_mb", 0)))
+        global_rate_entry = ctk.CTkEntry(bandwidth_frame, textvariable=self.global_rate_limit_var, width=60)
+        global_rate_entry.pack(side="right", padx=5)
+        
+        schedule_frame = ctk.CTkFrame(perf_frame, fg_color="transparent")
+        schedule_frame.pack(fill="x", padx=15, pady=8)
+        
+        ctk.CTkLabel(
+            schedule_frame, 
+            text="🕒 Bandwidth Schedule:", 
+            font=ctk.CTkFont(family="B Nazanin", size=12, weight="bold")
+        ).pack(side="left")
+        
+        self.bandwidth_schedule_var = tk.StringVar(value=self.settings.get("bandwidth_schedule", ""))
+        schedule_entry = ctk.CTkEntry(
+            schedule_frame, 
+            textvariable=self.bandwidth_schedule_var, 
+            placeholder_text="22:00-06:00=0, 08:00-18:00=20",
+            width=260
+        )
+        schedule_entry.pack(side="right", padx=5)
+        
+        destination_limit_frame = ctk.CTkFrame(perf_frame, fg_color="transparent")
+        destination_limit_frame.pack(fill="x", padx=15, pady=8)
+        
+        ctk.CTkLabel(
+            destination_limit_frame, 
+            text="📡 Destination Limits:", 
+            font=ctk.CTkFont(family="B Nazanin", size=12, weight="bold")
+        ).pack(side="left")
+        
+        self.destination_rate_limits_var = tk.StringVar(value=self.settings.get("destination_rate_limits", ""))
+        destination_limit_entry = ctk.CTkEntry(
+            destination_limit_frame, 
+            textvariable=self.destination_rate_limits_var, 
+            placeholder_text="/mnt/nas=50; /media/backup=20",
+            width=260
+        )
+        destination_limit_entry.pack(side="right", padx=5)
+        
+        # Small-file batching for directory copies
+        tree_frame = ctk.CTkFrame(perf_frame, fg_color="transparent")
+        tree_frame.pack(fill="x", padx=15, pady=8)
+        
+        ctk.CTkLabel(
+            tree_frame, 
+            text="🗃 Batch Small Files Below:", 
+            font=ctk.CTkFont(family="B Nazanin", size=12, weight="bold")
+        ).pack(side="left")
+        
+        self.tree_workers_var = tk.StringVar(value=str(self.settings.get("tree_workers", 8)))
+        tree_workers_entry = ctk.CTkEntry(
+            tree_frame, 
+            textvariable=self.tree_workers_var, 
+            width=50
+        )
+        tree_workers_entry.pack(side="right", padx=5)
+        
+        ctk.CTkLabel(tree_frame, text="KB, workers:").pack(side="right")
+        
+        self.small_file_threshold_var = tk.StringVar(value=str(self.settings.get("small_file_threshold_kb", 1024)))
+        small_file_entry = ctk.CTkEntry(
+            tree_frame, 
+            textvariable=self.small_file_threshold_var, 
+            width=70
+        )
+        small_file_entry.pack(side="right", padx=5)
+        
+        # Buffer pool memory budget
+        pool_frame = ctk.CTkFrame(perf_frame, fg_color="transparent")
+        pool_frame.pack(fill="x", padx=15, pady=8)
+        
+        ctk.CTkLabel(
+            pool_frame, 
+            text="🧠 Buffer Memory Budget:", 
+            font=ctk.CTkFont(family="B Nazanin", size=12, weight="bold")
+        ).pack(side="left")
+        
+        self.buffer_pool_var = tk.StringVar(value=str(self.settings.get("buffer_pool_mb", 64)))
+        pool_entry = ctk.CTkEntry(
+            pool_frame, 
+            textvariable=self.buffer_pool_var, 
+            width=60,
+            placeholder_text="MB"
+        )
+        pool_entry.pack(side="right", padx=5)
+        
+        ctk.CTkLabel(pool_frame, text="MB").pack(side="right")
+        
+        # Destination preallocation
+        preallocate_frame = ctk.CTkFrame(perf_frame, fg_color="transparent")
+        preallocate_frame.pack(fill="x", padx=15, pady=5)
+        
+        self.preallocate_var = tk.BooleanVar(value=self.settings.get("preallocate", True))
+        preallocate_checkbox = ctk.CTkCheckBox(
+            preallocate_frame,
+            text="📐 Preallocate Destination Files (less fragmentation, fails fast when disk is full)",
+            variable=self.preallocate_var,
+            font=ctk.CTkFont(family="B Nazanin", size=12, weight="bold")
+        )
+        preallocate_checkbox.pack(side="left")
+        
+        # Page cache hints
+        page_cache_frame = ctk.CTkFrame(perf_frame, fg_color="transparent")
+        page_cache_frame.pack(fill="x", padx=15, pady=5)
+        
+        self.avoid_page_cache_var = tk.BooleanVar(value=self.settings.get("avoid_page_cache", False))
+        page_cache_checkbox = ctk.CTkCheckBox(
+            page_cache_frame,
+            text="🧹 Don't Pollute Page Cache (keeps bulk copies from slowing other programs)",
+            variable=self.avoid_page_cache_var,
+            font=ctk.CTkFont(family="B Nazanin", size=12, weight="bold")
+        )
+        page_cache_checkbox.pack(side="left")
+        
+        # Direct I/O for very large files
+        direct_io_frame = ctk.CTkFrame(perf_frame, fg_color="transparent")
+        direct_io_frame.pack(fill="x", padx=15, pady=5)
+        
+        self.direct_io_auto_var = tk.BooleanVar(value=self.settings.get("direct_io_auto", False))
+        direct_io_checkbox = ctk.CTkCheckBox(
+            direct_io_frame,
+            text="💿 Direct I/O (O_DIRECT) for files above",
+            variable=self.direct_io_auto_var,
+            font=ctk.CTkFont(family="B Nazanin", size=12, weight="bold")
+        )
+        direct_io_checkbox.pack(side="left")
+        
+        ctk.CTkLabel(direct_io_frame, text="MB").pack(side="right")
+        
+        self.direct_io_threshold_var = tk.StringVar(value=str(self.settings.get("direct_io_threshold_mb", 8192)))
+        direct_io_entry = ctk.CTkEntry(
+            direct_io_frame, 
+            textvariable=self.direct_io_threshold_var, 
+            width=70
+        )
+        direct_io_entry.pack(side="right", padx=5)
+        
         # Progress update interval
         progress_frame = ctk.CTkFrame(perf_frame, fg_color="transparent")
         progress_frame.pack(fill="x", padx=15, pady=8)
@@ -1403,6 +1821,36 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
         self.progress_slider.pack(fill="x", pady=(5, 0))
         self.progress_slider.set(float(self.progress_interval_var.get()))
         
+        # Durability policy
+        durability_frame = ctk.CTkFrame(perf_frame, fg_color="transparent")
+        durability_frame.pack(fill="x", padx=15, pady=(8, 15))
+        
+        ctk.CTkLabel(
+            durability_frame, 
+            text="💽 Write Durability:", 
+            font=ctk.CTkFont(family="B Nazanin", size=12, weight="bold")
+        ).pack(side="left")
+        
+        self.fsync_interval_var = tk.StringVar(value=str(self.settings.get("fsync_interval_mb", 64)))
+        fsync_entry = ctk.CTkEntry(
+            durability_frame, 
+            textvariable=self.fsync_interval_var, 
+            width=60,
+            placeholder_text="MB"
+        )
+        fsync_entry.pack(side="right", padx=5)
+        
+        ctk.CTkLabel(durability_frame, text="N (MB)").pack(side="right")
+        
+        self.durability_var = tk.StringVar(value=self.settings.get("durability_policy", "flush-at-end"))
+        durability_combo = ctk.CTkComboBox(
+            durability_frame, 
+            values=list(copy_engine.DURABILITY_POLICIES),
+            variable=self.durability_var, 
+            width=160
+        )
+        durability_combo.pack(side="right", padx=5)
+        
         # Behavior Settings
         behavior_frame = ctk.CTkFrame(
             settings_scroll,
@@ -1445,12 +1893,43 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
         self.overwrite_var = tk.StringVar(value=self.settings.get("overwrite_policy", "prompt"))
         overwrite_combo = ctk.CTkComboBox(
             overwrite_frame, 
-            values=["prompt", "overwrite", "skip"],
+            values=["prompt", "overwrite", "skip", "update-delta"],
             variable=self.overwrite_var, 
             width=120
         )
         overwrite_combo.pack(side="right", padx=5)
         
+        # Folder sync mode
+        sync_frame = ctk.CTkFrame(behavior_frame, fg_color="transparent")
+        sync_frame.pack(fill="x", padx=15, pady=5)
+        
+        self.sync_mode_var = tk.BooleanVar(value=self.settings.get("sync_mode", False))
+        sync_checkbox = ctk.CTkCheckBox(
+            sync_frame,
+            text="🔁 Sync Folders (copy only new/changed files)",
+            variable=self.sync_mode_var,
+            font=ctk.CTkFont(family="B Nazanin", size=12, weight="bold")
+        )
+        sync_checkbox.pack(side="left")
+        
+        self.sync_compare_hash_var = tk.BooleanVar(value=self.settings.get("sync_compare_hash", False))
+        sync_hash_checkbox = ctk.CTkCheckBox(
+            sync_frame,
+            text="Compare by Hash",
+            variable=self.sync_compare_hash_var,
+            font=ctk.CTkFont(family="B Nazanin", size=12)
+        )
+        sync_hash_checkbox.pack(side="left", padx=(15, 0))
+        
+        self.sync_delete_extras_var = tk.BooleanVar(value=self.settings.get("sync_delete_extras", False))
+        sync_delete_checkbox = ctk.CTkCheckBox(
+            sync_frame,
+            text="Delete Extras at Destination",
+            variable=self.sync_delete_extras_var,
+            font=ctk.CTkFont(family="B Nazanin", size=12)
+        )
+        sync_delete_checkbox.pack(side="left", padx=(15, 0))
+        
         # Additional behavior settings
         # Auto retry
         retry_frame = ctk.CTkFrame(behavior_frame, fg_color="transparent")
@@ -1483,6 +1962,64 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
         )
         verify_checkbox.pack(side="left")
         
+        self.verify_readback_var = tk.BooleanVar(value=self.settings.get("verify_readback", True))
+        readback_checkbox = ctk.CTkCheckBox(
+            verify_frame,
+            text="Read Back Destination",
+            variable=self.verify_readback_var,
+            font=ctk.CTkFont(family="B Nazanin", size=12)
+        )
+        readback_checkbox.pack(side="left", padx=(15, 0))
+        
+        # Folder verification workers
+        verify_workers_frame = ctk.CTkFrame(behavior_frame, fg_color="transparent")
+        verify_workers_frame.pack(fill="x", padx=15, pady=5)
+        
+        ctk.CTkLabel(
+            verify_workers_frame, 
+            text="🔍 Folder Verify Workers:", 
+            font=ctk.CTkFont(family="B Nazanin", size=12, weight="bold")
+        ).pack(side="left")
+        
+        self.verify_workers_var = tk.StringVar(value=str(self.settings.get("verify_workers", 8)))
+        verify_workers_entry = ctk.CTkEntry(
+            verify_workers_frame, 
+            textvariable=self.verify_workers_var, 
+            width=50
+        )
+        verify_workers_entry.pack(side="left", padx=5)
+        
+        self.verify_stop_on_first_var = tk.BooleanVar(value=self.settings.get("verify_stop_on_first", False))
+        verify_stop_checkbox = ctk.CTkCheckBox(
+            verify_workers_frame,
+            text="Stop at First Mismatch",
+            variable=self.verify_stop_on_first_var,
+            font=ctk.CTkFont(family="B Nazanin", size=12)
+        )
+        verify_stop_checkbox.pack(side="left", padx=(15, 0))
+        
+        # Resumable copies
+        checkpoint_frame = ctk.CTkFrame(behavior_frame, fg_color="transparent")
+        checkpoint_frame.pack(fill="x", padx=15, pady=5)
+        
+        self.resume_checkpoints_var = tk.BooleanVar(value=self.settings.get("resume_checkpoints", True))
+        checkpoint_checkbox = ctk.CTkCheckBox(
+            checkpoint_frame,
+            text="📌 Resume Interrupted Copies (checkpoint every",
+            variable=self.resume_checkpoints_var,
+            font=ctk.CTkFont(family="B Nazanin", size=12, weight="bold")
+        )
+        checkpoint_checkbox.pack(side="left")
+        
+        self.checkpoint_interval_var = tk.StringVar(value=str(self.settings.get("checkpoint_interval_mb", 256)))
+        checkpoint_interval_entry = ctk.CTkEntry(
+            checkpoint_frame, 
+            textvariable=self.checkpoint_interval_var, 
+            width=60
+        )
+        checkpoint_interval_entry.pack(side="left", padx=5)
+        ctk.CTkLabel(checkpoint_frame, text="MB)").pack(side="left")
+        
         # Show hidden files
         hidden_frame = ctk.CTkFrame(behavior_frame, fg_color="transparent")
         hidden_frame.pack(fill="x", padx=15, pady=5)
@@ -1924,8 +2461,7 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
             values = self.file_tree.item(item, "values")
             if len(values) >= 2:
                 source_path = values[1]  # Full path
-                if source_path not in [task["source"] for task in self.copy_tasks]:
-                    self.add_task(source_path, destination)
+                if self.add_task(source_path, destination):
                     added_count += 1
         
         if added_count > 0:
@@ -1935,35 +2471,20 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
         else:
             messagebox.showinfo("Info", "Selected files are already in the queue!")
 
-    def add_task(self, source: str, destination: str):
-        """Add a copy task to the queue"""
+    def add_task(self, source: str, destination: str) -> Optional[CopyTask]:
+        """Add a copy task to the queue; returns None if the source is missing or already queued"""
         if not os.path.exists(source):
-            return
+            return None
         
-        task_id = len(self.copy_tasks)
         filename = os.path.basename(source)
         dest_path = os.path.join(destination, filename)
+        if self.copy_tasks.find(source, dest_path):
+            return None
+        
+        task_id = self.copy_tasks.new_id()
         file_size = self.get_file_size(source)
         
-        task = {
-            "id": task_id,
-            "source": source,
-            "destination": dest_path,
-            "filename": filename,
-            "size": file_size,
-            "copied": 0,
-            "progress": 0.0,
-            "speed": 0.0,
-            "status": "⏳ Pending",
-            "paused": False,
-            "cancelled": False,
-            "completed": False,
-            "start_time": 0,
-            "last_update": 0,
-            "retry_count": 0,
-            "error_message": "",
-            "future": None
-        }
+        task = CopyTask(source, dest_path, file_size, task_id)
         
         self.copy_tasks.append(task)
         
@@ -1975,10 +2496,11 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
             self.format_size(file_size),
             "0 B",
             "0.0",
-            "⏳ Pending"
+            task["status"]
         ))
         
         self.update_overall_progress()
+        return task
 
     def get_selected_task(self):
         """Get the currently selected task"""
@@ -1987,11 +2509,7 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
             messagebox.showinfo("انتخاب تسک", "لطفاً یک تسک را انتخاب کنید!")
             return None
         
-        task_id = int(selected[0])
-        if task_id >= len(self.copy_tasks):
-            return None
-        
-        return self.copy_tasks[task_id]
+        return self.copy_tasks.get(int(selected[0]))
     
     def start_selected_task(self):
         """Start the selected task"""
@@ -1999,13 +2517,17 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
         if not task:
             return
         
-        if task["status"] in ["⏳ Pending", "❌ Cancelled", "❌ Error", "⏸ Paused"]:
-            task["status"] = "🔄 Running"
+        if task["state"] is TaskState.PAUSED:
+            self.resume_task(task)
+            self.update_status(f"ادامه: {task['filename']}")
+        elif task["state"] in (TaskState.PENDING, TaskState.CANCELLED, TaskState.ERROR):
+            task["state"] = TaskState.RUNNING
             task["cancelled"] = False
             task["paused"] = False
+            task["suspended"] = False
             task["start_time"] = time.time()
             task["last_update"] = time.time()
-            task["future"] = self.executor.submit(self.copy_task, task)
+            task["future"] = self.scheduler.submit(task, self.copy_task)
             self.update_task_display(task)
             self.update_status(f"شروع کپی: {task['filename']}")
             
@@ -2040,64 +2562,47 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
     def copy_task(self, task: Dict):
         """Copy a single file/directory with enhanced error handling"""
         try:
-            task["status"] = "🔄 Running"
+            task["state"] = TaskState.RUNNING
             task["start_time"] = time.time()
             task["last_update"] = time.time()
             
-            self.root.after(0, lambda: self.update_task_display(task))
-            
-            source = task["source"]
-            destination = task["destination"]
-            
-            # Check disk space first
-            if not self.check_disk_space(os.path.dirname(destination), task["size"]):
-                raise Exception("Insufficient disk space")
-            
-            # Check if destination exists
-            if os.path.exists(destination):
-                policy = self.settings.get("overwrite_policy", "prompt")
-                if policy == "skip":
-                    task["status"] = "⏭ Skipped"
-                    self.root.after(0, lambda: self.update_task_display(task))
-                    return
-                elif policy == "prompt":
-                    # For now, just overwrite - in a real app you'd show a dialog
-                    pass
-                elif policy == "overwrite":
-                    if self.settings.get("create_backup", False):
-                        backup_path = destination + ".bak"
-                        shutil.copy2(destination, backup_path)
-            
-            # Ensure destination directory exists
-            dest_dir = os.path.dirname(destination)
-            os.makedirs(dest_dir, exist_ok=True)
-            
-            # Copy the file/directory
-            if os.path.isfile(source):
-                self.copy_file(task)
-            elif os.path.isdir(source):
-                self.copy_directory(task)
-            
-            # Verify copy if enabled
-            if self.settings.get("verify_copy", False) and not task["cancelled"]:
-                if not self.verify_copy(source, destination):
-                    raise Exception("Copy verification failed")
-            
-            if not task["cancelled"]:
-                task["status"] = "✅ Completed"
+            self.publish_task(task)
+            
+            def show_verifying():
+                task["state"] = TaskState.VERIFYING
+                self.publish_task(task)
+            
+            # The engine checks space and the exists policy, copies and verifies
+            result = self.engine.run_task(
+                task,
+                progress_callback=lambda: self.publish_task(task),
+                on_error=self.log_file_error,
+                on_verify=show_verifying,
+                update_interval=self.settings.get("progress_update_interval", 0.5)
+            )
+            
+            if result == "skipped":
+                task["state"] = TaskState.SKIPPED
+                self.publish_task(task)
+            elif result == "paused":
+                # The copy stopped at its checkpoint and this worker is free again
+                self.publish_task(task)
+                self.logger.info(f"Paused {task['source']} at {task['copied']} bytes")
+            elif result == "completed":
+                task["state"] = TaskState.COMPLETED
                 task["progress"] = 100.0
                 task["copied"] = task["size"]
                 task["completed"] = True
                 task["completion_time"] = time.time()  # Record completion time for auto-cleanup
-                self.root.after(0, lambda: self.update_task_display(task))
-                self.logger.info(f"Successfully copied {source} to {destination}")
+                self.publish_task(task)
+                self.logger.info(f"Successfully copied {task['source']} to {task['destination']}")
                 
                 # Play notification sound if enabled
                 if self.settings.get("notification_sound", False):
                     self.play_notification_sound()
             
         except Exception as e:
-            error_msg = str(e)
+            error_msg = self.describe_copy_error(task, e)
             task["error_message"] = error_msg
             
             # Auto retry if enabled
@@ -2106,34 +2611,42 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
                 "space" not in error_msg.lower()):
                 
                 task["retry_count"] += 1
-                task["status"] = f"🔄 Retry {task['retry_count']}"
-                self.root.after(2000, lambda: self.copy_task(task))  # Retry after 2 seconds
+                task["state"] = TaskState.RETRYING
+                task["copied"] = 0  # A checkpoint resume counts its prefix again
+                task["speed"] = 0.0
+                # Tk may only be called from the UI thread, so the UI timer submits the retry
+                self.retry_tasks.append((time.time() + 2, task))  # Retry after 2 seconds
+                self.publish_task(task)
             else:
-                task["status"] = f"❌ Error: {error_msg}"
-                self.root.after(0, lambda: self.update_task_display(task))
+                task["state"] = TaskState.ERROR
+                self.publish_task(task)
                 self.logger.error(f"Failed to copy {task['source']}: {e}")
         
         finally:
-            self.root.after(0, self.check_all_tasks_complete)
+            # Raised only after the final publish, so the flush that sees it counts this task
+            self.completion_check_pending = True
     
-    def verify_copy(self, source: str, destination: str) -> bool:
-        """Verify that the copy was successful"""
-        try:
-            if os.path.isfile(source) and os.path.isfile(destination):
-                return os.path.getsize(source) == os.path.getsize(destination)
-            elif os.path.isdir(source) and os.path.isdir(destination):
-                # Simple verification - check if all files exist
-                for root, dirs, files in os.walk(source):
-                    for file in files:
-                        src_file = os.path.join(root, file)
-                        rel_path = os.path.relpath(src_file, source)
-                        dst_file = os.path.join(destination, rel_path)
-                        if not os.path.exists(dst_file):
-                            return False
-                return True
-            return False
-        except:
-            return False
+    def describe_copy_error(self, task: Dict, error: Exception) -> str:
+        """User-facing message for a failed copy"""
+        is_directory = os.path.isdir(task["source"])
+        if isinstance(error, OSError) and error.errno == errno.ENOSPC:
+            return "Insufficient disk space"
+        if isinstance(error, PermissionError):
+            return "دسترسی به پوشه مقصد امکان‌پذیر نیست" if is_directory else "دسترسی به فایل مقصد امکان‌پذیر نیست"
+        if isinstance(error, copy_engine.VerificationError):
+            return str(error)
+        if is_directory:
+            return f"خطا در کپی پوشه: {str(error)}"
+        if isinstance(error, IOError):
+            return f"خطا در خواندن/نوشتن فایل: {str(error)}"
+        return f"خطای غیرمنتظره: {str(error)}"
+    
+    def log_file_error(self, path: str, error: Exception):
+        """Log a file that failed inside a folder copy; the rest of the folder still copies"""
+        if isinstance(error, PermissionError):
+            self.logger.warning(f"Permission denied copying {path}")
+        else:
+            self.logger.warning(f"Error copying file {path}: {error}")
     
     def play_notification_sound(self):
         """Play a notification sound"""
@@ -2148,135 +2661,90 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
             except:
                 pass
 
-    def copy_file(self, task: Dict):
-        """Copy a single file with optimized speed and progress tracking"""
-        source = task["source"]
-        destination = task["destination"]
-        
-        # Dynamic buffer size based on file size for optimal speed
-        file_size = task["size"]
-        if file_size < 1024 * 1024:  # < 1MB
-            buffer_size = 32 * 1024  # 32KB
-        elif file_size < 100 * 1024 * 1024:  # < 100MB
-            buffer_size = 512 * 1024  # 512KB
-        elif file_size < 1024 * 1024 * 1024:  # < 1GB
-            buffer_size = 2 * 1024 * 1024  # 2MB
-        else:  # >= 1GB
-            buffer_size = 8 * 1024 * 1024  # 8MB
-            
-        copied_since_update = 0
-        update_interval = 0.25  # Update every 0.25 seconds for smoother UI
+    def toggle_direct_io_selected_task(self):
+        """Switch direct I/O on or off for the selected task"""
+        task = self.get_selected_task()
+        if not task:
+            return
         
-        try:
-            with open(source, 'rb') as src, open(destination, 'wb') as dst:
-                while not task["cancelled"]:
-                    # Handle pause
-                    while task["paused"] and not task["cancelled"]:
-                        time.sleep(0.1)
-                    
-                    if task["cancelled"]:
-                        break
-                    
-                    chunk = src.read(buffer_size)
-                    if not chunk:
-                        break
-                    
-                    dst.write(chunk)
-                    dst.flush()  # Force write to disk for better reliability
-                    chunk_size = len(chunk)
-                    task["copied"] += chunk_size
-                    copied_since_update += chunk_size
-                    
-                    # Update progress periodically
-                    current_time = time.time()
-                    if current_time - task["last_update"] >= update_interval:
-                        elapsed = current_time - task["last_update"]
-                        if elapsed > 0:
-                            task["speed"] = (copied_since_update / (1024 * 1024)) / elapsed  # MB/s
-                        task["progress"] = (task["copied"] / task["size"]) * 100 if task["size"] > 0 else 0
-                        task["last_update"] = current_time
-                        copied_since_update = 0
-                        
-                        self.root.after(0, lambda: self.update_task_display(task))
-                        
-        except PermissionError:
-            raise Exception("دسترسی به فایل مقصد امکان‌پذیر نیست")
-        except IOError as e:
-            raise Exception(f"خطا در خواندن/نوشتن فایل: {str(e)}")
-        except Exception as e:
-            raise Exception(f"خطای غیرمنتظره: {str(e)}")
+        task["direct_io"] = not self.engine.use_direct_io(task)
+        state = "روشن" if task["direct_io"] else "خاموش"
+        self.update_status(f"Direct I/O {state}: {task['filename']}")
 
-    def copy_directory(self, task: Dict):
-        """Copy a directory with optimized progress tracking"""
-        source = task["source"]
-        destination = task["destination"]
+    def set_rate_limit_selected_task(self):
+        """Ask for a speed limit for the selected task; a running copy picks it up on its next chunk"""
+        task = self.get_selected_task()
+        if not task:
+            return
         
-        copied_since_update = 0
-        update_interval = 0.5  # Update every 0.5 seconds for directories
+        dialog = ctk.CTkInputDialog(
+            text=f"Speed limit for {task['filename']} in MB/s (0 = unlimited):",
+            title="🚦 Task Speed Limit"
+        )
+        value = dialog.get_input()
+        if value is None:
+            return
+        try:
+            rate = float(value)
+            if rate < 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Error", "Speed limit must be a number of MB/s, 0 or more")
+            return
         
-        # Use shutil.copytree with custom copy function for progress
-        def copy_with_progress(src, dst, *, follow_symlinks=True):
-            nonlocal copied_since_update
-            
-            if task["cancelled"]:
-                return
-            
-            # Handle pause
-            while task["paused"] and not task["cancelled"]:
-                time.sleep(0.1)
-            
-            if task["cancelled"]:
-                return
-            
-            try:
-                shutil.copy2(src, dst, follow_symlinks=follow_symlinks)
-                
-                # Update progress
-                file_size = os.path.getsize(dst)  # Use destination size after copy
-                task["copied"] += file_size
-                copied_since_update += file_size
-                task["progress"] = (task["copied"] / task["size"]) * 100 if task["size"] > 0 else 0
-                
-                current_time = time.time()
-                if current_time - task["last_update"] >= update_interval:
-                    elapsed = current_time - task["last_update"]
-                    if elapsed > 0:
-                        task["speed"] = (copied_since_update / (1024 * 1024)) / elapsed
-                    task["last_update"] = current_time
-                    copied_since_update = 0
-                    self.root.after(0, lambda: self.update_task_display(task))
-                    
-            except PermissionError:
-                self.logger.warning(f"Permission denied copying {src} to {dst}")
-            except Exception as e:
-                self.logger.warning(f"Error copying file {src}: {e}")
+        task["rate_limit_mb"] = rate
+        limit = f"{rate:g} MB/s" if rate > 0 else "unlimited"
+        self.update_status(f"Speed limit {limit}: {task['filename']}")
+
+    def apply_global_rate_limit(self):
+        """Apply the global bandwidth limit from the tasks tab to all running copies"""
+        try:
+            rate = float(self.live_rate_limit_var.get())
+            if rate < 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Error", "Bandwidth limit must be a number of MB/s, 0 or more")
+            return
         
+        self.settings["global_rate_limit_mb"] = rate
+        if hasattr(self, "global_rate_limit_var"):
+            self.global_rate_limit_var.set(str(rate))
+        throttle = self.engine.throttle
+        throttle.configure(rate, self.throttle_destinations(), throttle.schedule)
+        self.save_settings()
+        limit = f"{rate:g} MB/s" if rate > 0 else "unlimited"
+        self.update_status(f"Bandwidth limit: {limit}")
+
+    def throttle_destinations(self) -> Dict[str, float]:
+        """Destination limits from settings, ignoring an invalid saved value"""
         try:
-            # Create destination directory if it doesn't exist
-            os.makedirs(destination, exist_ok=True)
-            shutil.copytree(source, destination, copy_function=copy_with_progress, dirs_exist_ok=True)
-        except shutil.Error as e:
-            # Handle partial copy errors - continue with what we can copy
-            self.logger.warning(f"Partial copy error for {source}: {e}")
-        except PermissionError:
-            raise Exception("دسترسی به پوشه مقصد امکان‌پذیر نیست")
-        except Exception as e:
-            raise Exception(f"خطا در کپی پوشه: {str(e)}")
+            return copy_engine.parse_destination_limits(self.settings.get("destination_rate_limits", ""))
+        except ValueError:
+            return {}
 
     def update_task_display(self, task: Dict):
-        """Update task display in the tree"""
+        """Update task display in the tree (UI thread only; workers use publish_task)"""
         try:
-            task_id = str(task["id"])
-            if self.task_tree.exists(task_id):
-                self.task_tree.set(task_id, "Progress", f"{task['progress']:.1f}%")
-                self.task_tree.set(task_id, "Copied", self.format_size(task["copied"]))
-                self.task_tree.set(task_id, "Speed", f"{task['speed']:.1f}")
-                self.task_tree.set(task_id, "Status", task["status"])
-            
+            self.refresh_task_row(task)
             self.update_overall_progress()
         except Exception as e:
             self.logger.error(f"Error updating task display: {e}")
 
+    def refresh_task_row(self, task: Dict):
+        """Write a task's progress columns into its tree row and count the change in the totals"""
+        self.copy_tasks.refresh(task)
+        task_id = str(task["id"])
+        if self.task_tree.exists(task_id):
+            self.task_tree.item(task_id, values=(
+                task["filename"],
+                task["destination"],
+                f"{task['progress']:.1f}%",
+                self.format_size(task["size"]),
+                self.format_size(task["copied"]),
+                f"{task['speed']:.1f}",
+                task["status"]
+            ))
+
     def update_overall_progress(self):
         """Update overall progress bar and label"""
         if not self.copy_tasks:
@@ -2284,22 +2752,11 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
             self.progress_label.configure(text="No tasks")
             return
         
-        total_size = sum(task["size"] for task in self.copy_tasks)
-        total_copied = sum(task["copied"] for task in self.copy_tasks)
+        # Totals and status counts are kept current by the registry as rows refresh
+        self.overall_progress.set(self.copy_tasks.progress)
         
-        if total_size > 0:
-            progress = total_copied / total_size
-            self.overall_progress.set(progress)
-        else:
-            self.overall_progress.set(0)
-        
-        # Count tasks by status
-        status_counts = {}
-        for task in self.copy_tasks:
-            status = task["status"]
-            status_counts[status] = status_counts.get(status, 0) + 1
-        
-        status_text = ", ".join([f"{status}: {count}" for status, count in status_counts.items()])
+        state_counts = self.copy_tasks.state_counts
+        status_text = ", ".join([f"{state.value}: {count}" for state, count in state_counts.items()])
         self.progress_label.configure(text=status_text)
 
     def pause_selected_task(self):
@@ -2308,29 +2765,58 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
         if not task:
             return
         
-        if task["status"] == "🔄 Running":
-            task["paused"] = True
-            task["status"] = "⏸ Paused"
-            self.update_task_display(task)
+        if task["state"] is TaskState.RUNNING:
+            self.pause_task(task)
             self.update_status(f"توقف: {task['filename']}")
-        elif task["status"] == "⏸ Paused":
-            task["paused"] = False
-            task["status"] = "🔄 Running"
-            self.update_task_display(task)
+        elif task["state"] is TaskState.PAUSED:
+            self.resume_task(task)
             self.update_status(f"ادامه: {task['filename']}")
         else:
             messagebox.showinfo("خطا", "این تسک قابل توقف/ادامه نیست!")
 
+    def pause_task(self, task: Dict):
+        """Pause a running task, freeing its worker when a checkpoint can hold its place"""
+        task["paused"] = True
+        task["state"] = TaskState.PAUSED
+        if self.settings.get("resume_checkpoints", True):
+            # The copy stops as if cancelled: it saves its checkpoint, closes its files
+            # and returns the worker to the pool for other tasks
+            task["suspended"] = True
+            task["cancelled"] = True
+        self.update_task_display(task)
+
+    def resume_task(self, task: Dict):
+        """Resume a paused task; a suspended one is queued again and continues from its checkpoint"""
+        if not task["paused"]:
+            return
+        
+        future = task.get("future")
+        if task["suspended"] and future is not None and not future.done():
+            # Still writing its checkpoint - queue it again once the worker has let go
+            future.add_done_callback(lambda _: self.root.after(0, lambda: self.resume_task(task)))
+            return
+        
+        task["paused"] = False
+        task["state"] = TaskState.RUNNING
+        if task["suspended"]:
+            task["suspended"] = False
+            task["cancelled"] = False
+            task["copied"] = 0  # The engine counts the checkpointed prefix again
+            task["speed"] = 0.0
+            self.submit_task(task)
+            self.is_copying = True
+        self.update_task_display(task)
+
     def cancel_selected_task(self):
         """Cancel the selected task"""
         task = self.get_selected_task()
         if not task:
             return
         
-        if task["status"] in ["🔄 Running", "⏸ Paused", "⏳ Pending"]:
+        if task["state"] in (TaskState.RUNNING, TaskState.PAUSED, TaskState.PENDING):
             if messagebox.askyesno("تأیید", f"آیا می‌خواهید تسک '{task['filename']}' را لغو کنید؟"):
                 task["cancelled"] = True
-                task["status"] = "❌ Cancelled"
+                task["state"] = TaskState.CANCELLED
                 if task.get("future"):
                     task["future"].cancel()
                 self.update_task_display(task)
@@ -2344,20 +2830,21 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
         if not task:
             return
         
-        if task["status"] in ["✅ Completed", "❌ Cancelled", "❌ Error"]:
+        if task["state"] in (TaskState.COMPLETED, TaskState.CANCELLED, TaskState.ERROR):
             # Reset task
             task["copied"] = 0
             task["progress"] = 0.0
             task["speed"] = 0.0
             task["cancelled"] = False
             task["paused"] = False
+            task["suspended"] = False
             task["retry_count"] = 0
             task["error_message"] = ""
             
             # Start the task
-            task["status"] = "🔄 Running"
+            task["state"] = TaskState.RUNNING
             task["start_time"] = time.time()
-            task["future"] = self.executor.submit(self.copy_task, task)
+            task["future"] = self.scheduler.submit(task, self.copy_task)
             self.update_task_display(task)
             self.update_status(f"شروع مجدد: {task['filename']}")
         else:
@@ -2369,18 +2856,26 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
         if not selected:
             return
         
-        task_id = int(selected[0])
-        if task_id > 0:
-            # Swap tasks
-            self.copy_tasks[task_id], self.copy_tasks[task_id - 1] = \
-                self.copy_tasks[task_id - 1], self.copy_tasks[task_id]
-            
-            # Update IDs
-            self.copy_tasks[task_id]["id"] = task_id
-            self.copy_tasks[task_id - 1]["id"] = task_id - 1
+        task = self.copy_tasks.get(int(selected[0]))
+        index = self.copy_tasks.position(task) if task else 0
+        if index > 0:
+            # Swap tasks; ids stay with their tasks
+            self.copy_tasks.swap(index, index - 1)
             
+            self.scheduler.reprioritize()
             self.refresh_task_tree()
-            self.task_tree.selection_set(str(task_id - 1))
+            self.task_tree.selection_set(selected[0])
+
+    def toggle_urgent_selected_task(self):
+        """Mark the selected task urgent so it runs before every normal waiting task"""
+        task = self.get_selected_task()
+        if not task:
+            return
+        
+        task["priority"] = 0 if task.get("priority", 0) > 0 else 1
+        self.scheduler.reprioritize()
+        state = "فوری" if task["priority"] > 0 else "عادی"
+        self.update_status(f"اولویت {state}: {task['filename']}")
 
     def move_task_down(self):
         """Move selected task down in the queue"""
@@ -2388,32 +2883,22 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
         if not selected:
             return
         
-        task_id = int(selected[0])
-        if task_id < len(self.copy_tasks) - 1:
-            # Swap tasks
-            self.copy_tasks[task_id], self.copy_tasks[task_id + 1] = \
-                self.copy_tasks[task_id + 1], self.copy_tasks[task_id]
-            
-            # Update IDs
-            self.copy_tasks[task_id]["id"] = task_id
-            self.copy_tasks[task_id + 1]["id"] = task_id + 1
+        task = self.copy_tasks.get(int(selected[0]))
+        index = self.copy_tasks.position(task) if task else len(self.copy_tasks)
+        if index < len(self.copy_tasks) - 1:
+            # Swap tasks; ids stay with their tasks
+            self.copy_tasks.swap(index, index + 1)
             
+            self.scheduler.reprioritize()
             self.refresh_task_tree()
-            self.task_tree.selection_set(str(task_id + 1))
+            self.task_tree.selection_set(selected[0])
 
     def clear_completed(self):
         """Clear completed tasks"""
-        completed_statuses = ["✅ Completed", "❌ Cancelled", "⏭ Skipped"]
-        initial_count = len(self.copy_tasks)
-        self.copy_tasks = [task for task in self.copy_tasks 
-                          if not any(status in task["status"] for status in completed_statuses)]
-        
-        # Reassign IDs
-        for i, task in enumerate(self.copy_tasks):
-            task["id"] = i
+        finished_states = (TaskState.COMPLETED, TaskState.CANCELLED, TaskState.SKIPPED)
+        cleared_count = self.copy_tasks.remove_where(lambda task: task["state"] in finished_states)
         
         self.refresh_task_tree()
-        cleared_count = initial_count - len(self.copy_tasks)
         self.update_status(f"پاک شد: {cleared_count} تسک تکمیل شده. باقی‌مانده: {len(self.copy_tasks)}")
 
     def clear_all_tasks(self):
@@ -2421,9 +2906,9 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
         if messagebox.askyesno("تأیید", "همه تسک‌ها پاک شوند؟ این عمل تسک‌های در حال اجرا را لغو می‌کند."):
             # Cancel all active tasks first
             for task in self.copy_tasks:
-                if task["status"] in ["🔄 Running", "⏸ Paused", "⏳ Pending"]:
+                if task["state"] in (TaskState.RUNNING, TaskState.PAUSED, TaskState.PENDING):
                     task["cancelled"] = True
-                    task["status"] = "❌ Cancelled"
+                    task["state"] = TaskState.CANCELLED
                     if task.get("future"):
                         task["future"].cancel()
             
@@ -2436,6 +2921,7 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
         self.task_tree.delete(*self.task_tree.get_children())
         
         for task in self.copy_tasks:
+            self.copy_tasks.refresh(task)
             self.task_tree.insert("", "end", iid=str(task["id"]), values=(
                 task["filename"],
                 task["destination"],
@@ -2450,16 +2936,17 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
 
     def check_all_tasks_complete(self):
         """Check if all tasks are complete"""
-        active_tasks = [task for task in self.copy_tasks 
-                       if task["status"] in ["🔄 Running", "⏳ Pending"]]
+        active_count = self.copy_tasks.count(TaskState.RUNNING, TaskState.PENDING,
+                                             TaskState.VERIFYING, TaskState.RETRYING)
         
-        if not active_tasks and self.is_copying:
+        if not active_count and self.is_copying:
             self.is_copying = False
             self.start_btn.configure(state="normal")
             self.update_status("همه تسک‌ها تکمیل شدند!")
+            self.save_buffer_tuning()  # Once per finished queue; on_closing saves as well
             
             # Show completion notification
-            completed_count = len([task for task in self.copy_tasks if task["status"] == "✅ Completed"])
+            completed_count = self.copy_tasks.count(TaskState.COMPLETED)
             if completed_count > 0:
                 messagebox.showinfo("اتمام کار", f"{completed_count} عملیات کپی با موفقیت تکمیل شد!")
 
@@ -2472,18 +2959,103 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
                 raise ValueError("Buffer size must be between 1 and 1024 KB")
             self.settings["buffer_size"] = buffer_kb * 1024
             
+            # Validate and save memory-mapped copy range
+            mmap_min = int(self.mmap_min_var.get())
+            mmap_max = int(self.mmap_max_var.get())
+            if mmap_min < 0 or mmap_max < mmap_min:
+                raise ValueError("Memory-mapped copy range must be 0 MB or more, smallest first")
+            self.settings["mmap_min_mb"] = mmap_min
+            self.settings["mmap_max_mb"] = mmap_max
+            
             # Validate and save max threads
             max_threads = int(self.threads_var.get())
             if max_threads < 1 or max_threads > 8:
                 raise ValueError("Max threads must be between 1 and 8")
             self.settings["max_threads"] = max_threads
             
+            # Validate and save buffer pool budget
+            buffer_pool_mb = int(self.buffer_pool_var.get())
+            if buffer_pool_mb < 1 or buffer_pool_mb > 4096:
+                raise ValueError("Buffer memory budget must be between 1 and 4096 MB")
+            self.settings["buffer_pool_mb"] = buffer_pool_mb
+            self.settings["preallocate"] = self.preallocate_var.get()
+            self.settings["adaptive_buffer"] = self.adaptive_buffer_var.get()
+            self.settings["avoid_page_cache"] = self.avoid_page_cache_var.get()
+            
+            # Validate and save direct I/O settings
+            direct_io_threshold = int(self.direct_io_threshold_var.get())
+            if direct_io_threshold < 1:
+                raise ValueError("Direct I/O threshold must be at least 1 MB")
+            self.settings["direct_io_auto"] = self.direct_io_auto_var.get()
+            self.settings["direct_io_threshold_mb"] = direct_io_threshold
+            
+            # Validate and save striped copy settings
+            stripe_threshold = int(self.stripe_threshold_var.get())
+            if stripe_threshold < 64:
+                raise ValueError("Parallel copy threshold must be at least 64 MB")
+            stripe_workers = int(self.stripe_workers_var.get())
+            if stripe_workers < 1 or stripe_workers > 16:
+                raise ValueError("Parallel copy workers must be between 1 and 16")
+            self.settings["stripe_threshold_mb"] = stripe_threshold
+            self.settings["stripe_workers"] = stripe_workers
+            
+            # Validate and save I/O engine settings
+            io_engine = self.io_engine_var.get()
+            if io_engine not in ("threads", "async"):
+                raise ValueError("I/O engine must be 'threads' or 'async'")
+            async_queue_depth = int(self.async_queue_depth_var.get())
+            if async_queue_depth < 1 or async_queue_depth > 256:
+                raise ValueError("Async queue depth must be between 1 and 256")
+            self.settings["io_engine"] = io_engine
+            self.settings["async_queue_depth"] = async_queue_depth
+            
+            # Validate and save per-disk task limits
+            for key, var in (("hdd_concurrency", self.hdd_concurrency_var),
+                             ("ssd_concurrency", self.ssd_concurrency_var),
+                             ("network_concurrency", self.network_concurrency_var)):
+                limit = int(var.get())
+                if limit < 1 or limit > 16:
+                    raise ValueError("Tasks per disk must be between 1 and 16")
+                self.settings[key] = limit
+            
+            # Validate and save bandwidth limits
+            global_rate_limit = float(self.global_rate_limit_var.get())
+            if global_rate_limit < 0:
+                raise ValueError("Bandwidth limit must not be negative")
+            bandwidth_schedule = self.bandwidth_schedule_var.get().strip()
+            destination_rate_limits = self.destination_rate_limits_var.get().strip()
+            copy_engine.parse_bandwidth_schedule(bandwidth_schedule)
+            copy_engine.parse_destination_limits(destination_rate_limits)
+            self.settings["global_rate_limit_mb"] = global_rate_limit
+            self.settings["bandwidth_schedule"] = bandwidth_schedule
+            self.settings["destination_rate_limits"] = destination_rate_limits
+            
+            # Validate and save small-file batching settings
+            small_file_threshold = int(self.small_file_threshold_var.get())
+            if small_file_threshold < 1:
+                raise ValueError("Small file threshold must be at least 1 KB")
+            tree_workers = int(self.tree_workers_var.get())
+            if tree_workers < 1 or tree_workers > 64:
+                raise ValueError("Directory copy workers must be between 1 and 64")
+            self.settings["small_file_threshold_kb"] = small_file_threshold
+            self.settings["tree_workers"] = tree_workers
+            
             # Validate and save progress interval
             progress_interval = float(self.progress_interval_var.get())
             if progress_interval < 0.1 or progress_interval > 2.0:
                 raise ValueError("Progress update interval must be between 0.1 and 2.0 seconds")
             self.settings["progress_update_interval"] = progress_interval
             
+            # Validate and save durability policy
+            durability_policy = self.durability_var.get()
+            if durability_policy not in copy_engine.DURABILITY_POLICIES:
+                raise ValueError("Unknown write durability policy")
+            fsync_interval = int(self.fsync_interval_var.get())
+            if fsync_interval < 1 or fsync_interval > 4096:
+                raise ValueError("Fsync interval must be between 1 and 4096 MB")
+            self.settings["durability_policy"] = durability_policy
+            self.settings["fsync_interval_mb"] = fsync_interval
+            
             # Validate retry count
             retry_count = int(self.retry_count_var.get())
             if retry_count < 1 or retry_count > 10:
@@ -2492,8 +3064,26 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
             
             # Save behavior settings
             self.settings["overwrite_policy"] = self.overwrite_var.get()
+            self.settings["sync_mode"] = self.sync_mode_var.get()
+            self.settings["sync_compare_hash"] = self.sync_compare_hash_var.get()
+            self.settings["sync_delete_extras"] = self.sync_delete_extras_var.get()
             self.settings["auto_retry"] = self.auto_retry_var.get()
             self.settings["verify_copy"] = self.verify_copy_var.get()
+            self.settings["verify_readback"] = self.verify_readback_var.get()
+            self.settings["verify_stop_on_first"] = self.verify_stop_on_first_var.get()
+            
+            # Validate folder verification workers
+            verify_workers = int(self.verify_workers_var.get())
+            if verify_workers < 1 or verify_workers > 64:
+                raise ValueError("Folder verify workers must be between 1 and 64")
+            self.settings["verify_workers"] = verify_workers
+            
+            # Validate checkpoint interval
+            checkpoint_interval = int(self.checkpoint_interval_var.get())
+            if checkpoint_interval < 16 or checkpoint_interval > 16384:
+                raise ValueError("Checkpoint interval must be between 16 and 16384 MB")
+            self.settings["resume_checkpoints"] = self.resume_checkpoints_var.get()
+            self.settings["checkpoint_interval_mb"] = checkpoint_interval
             self.settings["show_hidden_files"] = self.show_hidden_var.get()
             self.settings["create_backup"] = self.create_backup_var.get()
             self.settings["preserve_permissions"] = self.preserve_permissions_var.get()
@@ -2558,18 +3148,47 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
                 # Reset to default values
                 self.buffer_var.set("64")
                 self.buffer_slider.set(64)
+                self.mmap_min_var.set("4")
+                self.mmap_max_var.set("512")
                 
                 self.threads_var.set("4")
                 self.threads_slider.set(4)
                 
+                self.buffer_pool_var.set("64")
+                self.preallocate_var.set(True)
+                self.adaptive_buffer_var.set(True)
+                self.avoid_page_cache_var.set(False)
+                self.direct_io_auto_var.set(False)
+                self.direct_io_threshold_var.set("8192")
+                self.stripe_threshold_var.set("1024")
+                self.stripe_workers_var.set("4")
+                self.io_engine_var.set("threads")
+                self.async_queue_depth_var.set("32")
+                self.hdd_concurrency_var.set("1")
+                self.ssd_concurrency_var.set("4")
+                self.network_concurrency_var.set("2")
+                self.global_rate_limit_var.set("0")
+                self.bandwidth_schedule_var.set("")
+                self.destination_rate_limits_var.set("")
+                self.small_file_threshold_var.set("1024")
+                self.tree_workers_var.set("8")
+                
                 self.progress_interval_var.set("0.5")
                 self.progress_slider.set(0.5)
                 
+                self.durability_var.set("flush-at-end")
+                self.fsync_interval_var.set("64")
+                
                 self.retry_count_var.set("3")
                 
                 # Reset checkboxes
                 self.auto_retry_var.set(True)
                 self.verify_copy_var.set(True)
+                self.verify_readback_var.set(True)
+                self.verify_workers_var.set("8")
+                self.verify_stop_on_first_var.set(False)
+                self.resume_checkpoints_var.set(True)
+                self.checkpoint_interval_var.set("256")
                 self.show_hidden_var.set(False)
                 self.create_backup_var.set(False)
                 self.preserve_permissions_var.set(True)
@@ -2579,6 +3198,9 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
                 
                 # Reset comboboxes
                 self.overwrite_var.set("prompt")
+                self.sync_mode_var.set(False)
+                self.sync_compare_hash_var.set(False)
+                self.sync_delete_extras_var.set(False)
                 self.theme_var.set("dark_blue")
                 
                 # Update preview
@@ -2604,79 +3226,77 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
         """Handle double-click on task tree"""
         task = self.get_selected_task()
         if task:
-            if task["status"] in ["🔄 Running"]:
+            if task["state"] is TaskState.RUNNING:
                 self.pause_selected_task()
-            elif task["status"] in ["⏸ Paused", "⏳ Pending"]:
+            elif task["state"] in (TaskState.PAUSED, TaskState.PENDING):
                 self.start_selected_task()
 
     
     
     def start_individual_task(self, task_id: int):
         """Start an individual task"""
-        if task_id >= len(self.copy_tasks):
+        task = self.copy_tasks.get(task_id)
+        if not task:
             return
         
-        task = self.copy_tasks[task_id]
-        if task["status"] in ["⏳ Pending", "❌ Cancelled", "❌ Error", "⏸ Paused"]:
-            task["status"] = "🔄 Running"
+        if task["state"] is TaskState.PAUSED:
+            self.resume_task(task)
+        elif task["state"] in (TaskState.PENDING, TaskState.CANCELLED, TaskState.ERROR):
+            task["state"] = TaskState.RUNNING
             task["cancelled"] = False
             task["paused"] = False
+            task["suspended"] = False
             task["start_time"] = time.time()
-            task["future"] = self.executor.submit(self.copy_task, task)
+            task["future"] = self.scheduler.submit(task, self.copy_task)
             self.update_task_display(task)
     
     def pause_individual_task(self, task_id: int):
         """Pause/resume an individual task"""
-        if task_id >= len(self.copy_tasks):
+        task = self.copy_tasks.get(task_id)
+        if not task:
             return
         
-        task = self.copy_tasks[task_id]
-        if task["status"] == "🔄 Running":
-            task["paused"] = True
-            task["status"] = "⏸ Paused"
-            self.update_task_display(task)
+        if task["state"] is TaskState.RUNNING:
+            self.pause_task(task)
     
     def cancel_individual_task(self, task_id: int):
         """Cancel an individual task"""
-        if task_id >= len(self.copy_tasks):
+        task = self.copy_tasks.get(task_id)
+        if not task:
             return
         
-        task = self.copy_tasks[task_id]
-        if task["status"] in ["🔄 Running", "⏸ Paused", "⏳ Pending"]:
+        if task["state"] in (TaskState.RUNNING, TaskState.PAUSED, TaskState.PENDING):
             task["cancelled"] = True
-            task["status"] = "❌ Cancelled"
+            task["state"] = TaskState.CANCELLED
             if task.get("future"):
                 task["future"].cancel()
             self.update_task_display(task)
     
     def restart_individual_task(self, task_id: int):
         """Restart a cancelled or failed task"""
-        if task_id >= len(self.copy_tasks):
+        task = self.copy_tasks.get(task_id)
+        if not task:
             return
         
-        task = self.copy_tasks[task_id]
         task["copied"] = 0
         task["progress"] = 0.0
         task["speed"] = 0.0
         task["cancelled"] = False
         task["paused"] = False
+        task["suspended"] = False
         task["retry_count"] = 0
         task["error_message"] = ""
         self.start_individual_task(task_id)
     
     def remove_individual_task(self, task_id: int):
         """Remove a completed task from the list"""
-        if task_id >= len(self.copy_tasks):
+        task = self.copy_tasks.get(task_id)
+        if not task:
             return
         
-        task = self.copy_tasks[task_id]
-        if task["status"] in ["✅ Completed", "❌ Cancelled", "❌ Error"]:
+        if task["state"] in (TaskState.COMPLETED, TaskState.CANCELLED, TaskState.ERROR):
             # Remove the task
-            del self.copy_tasks[task_id]
-            
-            # Reassign IDs to remaining tasks
-            for i, remaining_task in enumerate(self.copy_tasks):
-                remaining_task["id"] = i
+            self.copy_tasks.remove_where(lambda queued: queued is task)
             
             # Refresh the tree view
             self.refresh_task_tree()
@@ -2694,17 +3314,77 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
 • Network drives: 32-128 KB - Avoid network congestion
 • Default: 64 KB - Good balance for most scenarios
 
+📈 Adaptive Buffer Size:
+• Grows or shrinks the buffer during a copy while the speed keeps improving
+• The best size is remembered per drive pair and used as the next starting size
+
+🗺 Memory-Mapped Copy (MB range):
+• Files in this size range are mapped into memory and written out directly
+• Used when the kernel copy path is off or not supported for the files
+
 👥 Max Threads (1-8):
 • Single large file: 1-2 threads - Avoid overhead
 • Many small files: 4-6 threads - Parallel processing
 • Network operations: 1-3 threads - Prevent timeout
 • Local SSD: 4-8 threads - Utilize full speed
 • Default: 4 threads - Optimal for most systems
+• Only this many tasks run at once; the rest wait in list order (⚡ urgent tasks first)
+• Moving a waiting task up or down in the tasks tab changes when it starts
+
+🧩 Parallel Copy (threshold MB, 1-16 workers):
+• Files above the threshold are split into ranges copied concurrently
+• Best on NVMe and RAID; use 1 worker to disable on spinning disks
+
+🚀 I/O Engine (queue depth 1-256):
+• Threads: each copy thread waits on one read/write at a time
+• Async: one event loop keeps many reads and writes in flight for all file copies
+• Deep queues help SSDs and network drives reach their rated speed
+• A new queue depth applies as soon as the settings are saved
+
+💽 Tasks per Disk (1-16):
+• Each task is matched to the disks holding its source and destination
+• Tasks on different disks run in parallel; extra tasks for a busy disk wait
+• HDD: 1 avoids head thrashing; SSD and network drives handle several at once
+
+🚦 Bandwidth Limits (MB/s, 0 = unlimited):
+• Global: total speed of all copies together
+• Schedule: time windows that replace the global limit, e.g. 22:00-06:00=0, 08:00-18:00=20
+• Destination Limits: path=MB/s pairs separated by ; - all copies into that folder share the limit
+• Per task: select a task and use the 🚦 button on the tasks tab
+• Changes apply to running copies without restarting them
+
+🗃 Small File Batching (threshold KB, 1-64 workers):
+• Folder copies send files below the threshold to workers in batches
+• Large numbers of tiny files copy several times faster
+
+🧠 Buffer Memory Budget (1-4096 MB):
+• Total memory all copy threads may use for buffers together
+• Workers wait for a free buffer instead of allocating past this limit
+
+📐 Preallocate Destination:
+• Reserves the full file size before copying (fallocate)
+• Reduces fragmentation and reports a full disk before copying starts
+
+🧹 Don't Pollute Page Cache:
+• Drops copied data from the OS file cache as the copy moves on
+• Large copies stop evicting the cache other programs rely on
+
+💿 Direct I/O:
+• Reads and writes bypass the OS cache entirely (O_DIRECT)
+• For files much larger than RAM; use the 💿 button on the tasks tab per task
+• Filesystems without O_DIRECT support fall back to normal copying
 
 ⏱ Progress Update (0.1-2.0 seconds):
-• Faster updates: 0.1-0.3s - Real-time feedback
+• Faster updates: 0.1-0.3s - Real-time feedback (0.1s = 10 updates per second)
 • Balanced: 0.5s - Good performance + responsiveness  
-• Slower updates: 1.0-2.0s - Better for slow systems""",
+• Slower updates: 1.0-2.0s - Better for slow systems
+• Copies report progress in the background; the task list is redrawn once per interval
+
+💽 Write Durability:
+• none: Leave write-back entirely to the OS (fastest)
+• flush-at-end: Hand all data to the OS when the file is done (default)
+• fsync-at-end: Wait until the file is on disk before completing
+• fsync-every-N-MB: Also sync every N MB (safest, slowest)""",
             
             "behavior": """🎯 Behavior Settings Help:
 
@@ -2712,6 +3392,13 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
 • Prompt: Ask user what to do (safest)
 • Overwrite: Replace existing files automatically
 • Skip: Keep existing files, skip duplicates
+• Update-delta: Compare existing files block by block and rewrite only the changed blocks
+  (ideal for re-syncing large VM images and archives that change a little each time)
+
+🔁 Sync Folders:
+• Copies only files that are new or whose size/modified time changed
+• Compare by Hash: check equal-sized files by content instead of modified time
+• Delete Extras: remove destination files and folders not in the source (use with care)
 
 🔄 Auto Retry:
 • Enabled: Automatically retry failed operations
@@ -2720,7 +3407,19 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
 ✅ Verify Copy:
 • Enabled: Check file integrity after copying (slower but safer)
 • Disabled: Skip verification (faster but less safe)
-
+• Files are hashed while they copy (xxHash if installed, otherwise BLAKE2)
+• Read Back Destination: re-read the copy once and compare hashes
+• Kernel and parallel copies never hold the data, so both sides are hashed after them
+• Folders are verified by several workers at once (1-64); each bad file is logged
+• Stop at First Mismatch: fail the task as soon as one file differs
+
+📌 Resume Interrupted Copies:
+• Running copies save a checkpoint to disk every N MB (16-16384)
+• Restarted or retried tasks continue after the last verified offset
+• Folder copies also remember finished files and skip them
+• Kernel and parallel copies keep checkpoints as well; a resume checks the copied prefix
+• Pausing a task saves its checkpoint and frees its worker; resuming queues it again
+• With checkpoints off, a paused task keeps its worker until it is resumed
 🗂 Show Hidden Files:
 • Show system and hidden files in explorer
 
@@ -2792,16 +3491,6 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
         """Update progress interval from slider"""
         self.progress_interval_var.set(f"{value:.1f}")
     
-    def check_disk_space(self, path: str, required_size: int) -> bool:
-        """Check if there's enough disk space"""
-        try:
-            free_space = psutil.disk_usage(path).free
-            # Add 10% buffer to required size
-            required_with_buffer = required_size * 1.1
-            return free_space > required_with_buffer
-        except:
-            return True  # If we can't check, assume it's okay
-    
     def on_closing(self):
         """Handle application closing"""
         if self.is_copying:
@@ -2816,9 +3505,12 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
         # Save settings and cleanup
         self.save_settings()
         self.save_cache()
+        self.save_buffer_tuning()
         
         if self.executor:
             self.executor.shutdown(wait=False)
+        if self.engine:
+            self.engine.close()
         
         self.root.destroy()
 
@@ -3047,33 +3739,14 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
             dest_file = os.path.join(destination_path, filename)
             
             # Check if already exists in queue
-            if any(task["source"] == source_path and task["destination"] == dest_file 
-                   for task in self.copy_tasks):
+            if self.copy_tasks.find(source_path, dest_file):
                 return  # Already in queue
             
             # Create and add task
-            task_id = len(self.copy_tasks)
+            task_id = self.copy_tasks.new_id()
             file_size = self.get_file_size(source_path)
             
-            task = {
-                "id": task_id,
-                "source": source_path,
-                "destination": dest_file,
-                "filename": filename,
-                "size": file_size,
-                "copied": 0,
-                "progress": 0.0,
-                "speed": 0.0,
-                "status": "🚀 Auto-Starting",
-                "paused": False,
-                "cancelled": False,
-                "completed": False,
-                "start_time": time.time(),
-                "last_update": time.time(),
-                "retry_count": 0,
-                "error_message": "",
-                "future": None
-            }
+            task = CopyTask(source_path, dest_file, file_size, task_id, state=TaskState.STARTING)
             
             self.copy_tasks.append(task)
             
@@ -3085,12 +3758,12 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
                 self.format_size(file_size),
                 "0 B",
                 "0.0",
-                "🚀 Auto-Starting"
+                task["status"]
             ))
             
             # Start immediately
-            task["status"] = "🔄 Running"
-            task["future"] = self.executor.submit(self.copy_task, task)
+            task["state"] = TaskState.RUNNING
+            task["future"] = self.scheduler.submit(task, self.copy_task)
             self.update_task_display(task)
             
         except Exception as e:
@@ -3270,33 +3943,14 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
                     dest_file = os.path.join(destination_path, filename)
                     
                     # Check if already exists
-                    if any(task["source"] == file_path and task["destination"] == dest_file 
-                           for task in self.copy_tasks):
+                    if self.copy_tasks.find(file_path, dest_file):
                         continue
                     
                     # Add to queue
                     file_size = self.get_file_size(file_path)
-                    task_id = len(self.copy_tasks)
+                    task_id = self.copy_tasks.new_id()
                     
-                    task = {
-                        "id": task_id,
-                        "source": file_path,
-                        "destination": dest_file,
-                        "filename": filename,
-                        "size": file_size,
-                        "copied": 0,
-                        "progress": 0.0,
-                        "speed": 0.0,
-                        "status": "🚀 Auto-Starting",
-                        "paused": False,
-                        "cancelled": False,
-                        "completed": False,
-                        "start_time": time.time(),
-                        "last_update": time.time(),
-                        "retry_count": 0,
-                        "error_message": "",
-                        "future": None
-                    }
+                    task = CopyTask(file_path, dest_file, file_size, task_id, state=TaskState.STARTING)
                     
                     self.copy_tasks.append(task)
                     
@@ -3308,12 +3962,12 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
                         self.format_size(file_size),
                         "0 B",
                         "0.0",
-                        "🚀 Auto-Starting"
+                        task["status"]
                     ))
                     
                     # Start immediately
-                    task["status"] = "🔄 Running"
-                    task["future"] = self.executor.submit(self.copy_task, task)
+                    task["state"] = TaskState.RUNNING
+                    task["future"] = self.scheduler.submit(task, self.copy_task)
                     self.update_task_display(task)
                     added_count += 1
                     
@@ -3323,33 +3977,14 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
                     dest_dir = os.path.join(destination_path, dirname)
                     
                     # Check if already exists
-                    if any(task["source"] == file_path and task["destination"] == dest_dir 
-                           for task in self.copy_tasks):
+                    if self.copy_tasks.find(file_path, dest_dir):
                         continue
                     
                     # Calculate directory size
                     dir_size = self.get_directory_size(file_path)
-                    task_id = len(self.copy_tasks)
+                    task_id = self.copy_tasks.new_id()
                     
-                    task = {
-                        "id": task_id,
-                        "source": file_path,
-                        "destination": dest_dir,
-                        "filename": dirname,
-                        "size": dir_size,
-                        "copied": 0,
-                        "progress": 0.0,
-                        "speed": 0.0,
-                        "status": "🚀 Auto-Starting",
-                        "paused": False,
-                        "cancelled": False,
-                        "completed": False,
-                        "start_time": time.time(),
-                        "last_update": time.time(),
-                        "retry_count": 0,
-                        "error_message": "",
-                        "future": None
-                    }
+                    task = CopyTask(file_path, dest_dir, dir_size, task_id, state=TaskState.STARTING)
                     
                     self.copy_tasks.append(task)
                     
@@ -3361,12 +3996,12 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
                         self.format_size(dir_size),
                         "0 B",
                         "0.0",
-                        "🚀 Auto-Starting"
+                        task["status"]
                     ))
                     
                     # Start immediately
-                    task["status"] = "🔄 Running"
-                    task["future"] = self.executor.submit(self.copy_task, task)
+                    task["state"] = TaskState.RUNNING
+                    task["future"] = self.scheduler.submit(task, self.copy_task)
                     self.update_task_display(task)
                     added_count += 1
             
@@ -3401,16 +4036,6 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
     def run(self):
         """Run the application"""
         try:
-            # Handle command line arguments for context menu integration
-            if len(sys.argv) > 1:
-                if sys.argv[1] == "copy" and len(sys.argv) > 2:
-                    # Add file to clipboard (for future implementation)
-                    pass
-                elif sys.argv[1] == "paste" and len(sys.argv) > 2:
-                    # Set destination and paste (for future implementation)
-                    if hasattr(self, 'dest_entry') and self.dest_entry:
-                        self.dest_entry.insert(0, sys.argv[2])
-            
             # Restore window geometry
             if "window_geometry" in self.settings:
                 self.root.geometry(self.settings["window_geometry"])
@@ -3423,6 +4048,10 @@ Persian File Copier Pro نرم‌افزاری پیشرفته و قدرتمند 
 
 def main():
     """Main entry point"""
+    # Context menu "copy"/"paste" and the other headless commands never start Tk
+    if copy_cli.is_cli_command(sys.argv[1:]):
+        sys.exit(copy_cli.main(sys.argv[1:]))
+    
     try:
         # Always use CTk for consistent styling, enable DnD within the app
         root = ctk.CTk()
@@ -82,6 +82,11 @@ def launch_application():
 
 def main():
     """Main launcher function"""
+    # Headless commands (copy, sync, verify, scan, paste) need neither Tk nor customtkinter
+    from copy_cli import is_cli_command, main as cli_main
+    if is_cli_command(sys.argv[1:]):
+        sys.exit(cli_main(sys.argv[1:]))
+    
     print("=" * 50)
     print("Persian File Copier Pro - Launcher")
     print("=" * 50)
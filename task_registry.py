@@ -0,0 +1,160 @@
+"""
+Task registry for Persian File Copier Pro
+Holds the copy tasks in queue order, indexes them and keeps running totals for overall progress
+"""
+
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from copy_engine import CopyTask, TaskState
+
+
+class TaskRegistry:
+    """Ordered list of CopyTasks with hash indexes and totals kept up to date by deltas.
+
+    Task ids are handed out by new_id() and never reused or renumbered, so they stay valid
+    as tree item ids while tasks are reordered or removed. Tasks are indexed by id, by
+    (source, destination) for duplicate checks, and by state.
+
+    Workers change task fields freely. Whenever the UI refreshes a task it calls refresh(task),
+    which folds the change since that task's previous refresh into total_size, total_copied
+    and the state index. Overall progress then costs O(1) instead of a pass over every task.
+    Adding and removing tasks adjusts the totals the same way.
+    """
+
+    def __init__(self):
+        self._tasks: List[CopyTask] = []
+        self._by_id: Dict[int, CopyTask] = {}
+        self._by_path: Dict[Tuple[str, str], CopyTask] = {}
+        self._by_state: Dict[TaskState, Dict[int, CopyTask]] = {}  # As of each task's last refresh
+        self._positions: Optional[Dict[int, int]] = None  # Task id -> list index, rebuilt after removals
+        self._seen: Dict[int, tuple] = {}  # Task id -> (size, copied, state) last counted
+        self._next_id = 0
+        self.total_size = 0
+        self.total_copied = 0
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __iter__(self) -> Iterator[CopyTask]:
+        return iter(self._tasks)
+
+    def __getitem__(self, index: int) -> CopyTask:
+        return self._tasks[index]
+
+    def __delitem__(self, index: int):
+        self._forget(self._tasks.pop(index))
+        self._positions = None
+
+    def new_id(self) -> int:
+        """Next unused task id"""
+        task_id = self._next_id
+        self._next_id += 1
+        return task_id
+
+    def append(self, task: CopyTask):
+        if task.id in self._by_id:
+            raise ValueError(f"Task id {task.id} is already registered")
+        self._next_id = max(self._next_id, task.id + 1)
+        if self._positions is not None:
+            self._positions[task.id] = len(self._tasks)
+        self._tasks.append(task)
+        self._by_id[task.id] = task
+        self._by_path[(task.source, task.destination)] = task
+        self._count(task)
+
+    def pop(self, index: int = -1) -> CopyTask:
+        task = self._tasks.pop(index)
+        self._forget(task)
+        self._positions = None
+        return task
+
+    def clear(self):
+        self._tasks.clear()
+        self._by_id.clear()
+        self._by_path.clear()
+        self._by_state.clear()
+        self._positions = None
+        self._seen.clear()
+        self.total_size = 0
+        self.total_copied = 0
+
+    def remove_where(self, predicate: Callable[[CopyTask], bool]) -> int:
+        """Drop every task the predicate matches and return how many went"""
+        kept = []
+        for task in self._tasks:
+            if predicate(task):
+                self._forget(task)
+            else:
+                kept.append(task)
+        removed = len(self._tasks) - len(kept)
+        self._tasks = kept
+        if removed:
+            self._positions = None
+        return removed
+
+    def swap(self, first: int, second: int):
+        self._tasks[first], self._tasks[second] = self._tasks[second], self._tasks[first]
+        if self._positions is not None:
+            self._positions[self._tasks[first].id] = first
+            self._positions[self._tasks[second].id] = second
+
+    def get(self, task_id: int) -> Optional[CopyTask]:
+        return self._by_id.get(task_id)
+
+    def find(self, source: str, destination: str) -> Optional[CopyTask]:
+        """The queued task copying source to destination, if any"""
+        return self._by_path.get((source, destination))
+
+    def position(self, task: CopyTask) -> int:
+        """Index of the task in queue order; tasks no longer registered sort after every other"""
+        positions = self._positions
+        if positions is None:
+            positions = self._positions = {queued.id: index for index, queued in enumerate(self._tasks)}
+        return positions.get(task.id, len(self._tasks))
+
+    def with_state(self, *states: TaskState) -> List[CopyTask]:
+        """Tasks whose last refreshed state is one of states"""
+        return [task for state in states for task in self._by_state.get(state, {}).values()]
+
+    def refresh(self, task: CopyTask):
+        """Fold the task's current size, copied bytes and state into the totals"""
+        if self._by_id.get(task.id) is not task:
+            return  # Not (or no longer) registered
+        self._uncount(task)
+        self._count(task)
+
+    def count(self, *states: TaskState) -> int:
+        return sum(len(self._by_state.get(state, ())) for state in states)
+
+    @property
+    def state_counts(self) -> Dict[TaskState, int]:
+        return {state: len(tasks) for state, tasks in self._by_state.items()}
+
+    @property
+    def progress(self) -> float:
+        """Overall copied fraction, 0.0-1.0"""
+        return self.total_copied / self.total_size if self.total_size > 0 else 0.0
+
+    def _count(self, task: CopyTask):
+        snapshot = (task.size, task.copied, task.state)
+        self._seen[task.id] = snapshot
+        self.total_size += snapshot[0]
+        self.total_copied += snapshot[1]
+        self._by_state.setdefault(snapshot[2], {})[task.id] = task
+
+    def _uncount(self, task: CopyTask):
+        size, copied, state = self._seen.pop(task.id)
+        self.total_size -= size
+        self.total_copied -= copied
+        tasks = self._by_state[state]
+        del tasks[task.id]
+        if not tasks:
+            del self._by_state[state]
+
+    def _forget(self, task: CopyTask):
+        if self._by_id.get(task.id) is not task:
+            return
+        del self._by_id[task.id]
+        if self._by_path.get((task.source, task.destination)) is task:
+            del self._by_path[(task.source, task.destination)]
+        self._uncount(task)
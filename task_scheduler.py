@@ -0,0 +1,187 @@
+"""
+Task scheduler for Persian File Copier Pro
+Runs copy tasks with per-device concurrency limits on top of the shared thread pool
+"""
+
+import os
+import threading
+from concurrent.futures import Executor, Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Filesystems whose "device" is a server on the network
+NETWORK_FSTYPES = {"nfs", "nfs4", "cifs", "smbfs", "smb3", "afpfs", "9p", "fuse.sshfs", "sshfs", "davfs", "fuse.rclone"}
+
+# How many tasks may use one device at a time, by kind of device
+DEFAULT_DEVICE_LIMITS = {"hdd": 1, "ssd": 4, "network": 2, "unknown": 4}
+
+
+def physical_disk(device: str) -> Optional[str]:
+    """Map a partition such as /dev/sda1 or /dev/nvme0n1p2 to its disk (sda, nvme0n1) via sysfs"""
+    name = os.path.basename(device)
+    block_path = os.path.join("/sys/class/block", name)
+    if not name or not os.path.exists(block_path):
+        return None
+    if os.path.exists(os.path.join(block_path, "partition")):
+        # Partitions live in a directory named after their parent disk
+        return os.path.basename(os.path.dirname(os.path.realpath(block_path)))
+    return name
+
+
+def disk_kind(disk: Optional[str], fstype: str = "") -> str:
+    """Classify a disk as hdd, ssd, network or unknown"""
+    if fstype.lower() in NETWORK_FSTYPES:
+        return "network"
+    if not disk:
+        return "unknown"
+    try:
+        with open(os.path.join("/sys/block", disk, "queue", "rotational"), "r") as f:
+            return "hdd" if f.read().strip() == "1" else "ssd"
+    except OSError:
+        return "unknown"
+
+
+class DeviceScheduler:
+    """Hands tasks to the executor only while every device they touch has a free slot.
+
+    A task touches the device holding its source and the one holding its destination.
+    Tasks on different devices run in parallel; tasks sharing a spinning disk run one
+    after another. At most max_running tasks (0 = no cap) are handed to the executor at
+    once, so everything else waits here where it can still be reordered.
+
+    Waiting tasks are dispatched by task["priority"] (higher first), then by order_of(task)
+    (the task's place in the queue), then in submission order. A task never overtakes a
+    better-placed task waiting for the same device.
+
+    order_of is only called from submit() and reprioritize(), on the caller's thread; the
+    result is kept here, so dispatching from worker threads never reads the caller's queue.
+    """
+
+    def __init__(self, executor: Executor, drives_provider: Callable[[], List[Dict]],
+                 limits: Optional[Dict[str, int]] = None,
+                 on_wait: Optional[Callable[[Dict], None]] = None,
+                 kind_of: Callable[[Optional[str], str], str] = disk_kind,
+                 max_running: int = 0, order_of: Optional[Callable[[Dict], int]] = None):
+        self.executor = executor
+        self.drives_provider = drives_provider  # Current drive list, as collected by scan_all_drives
+        self.limits = dict(DEFAULT_DEVICE_LIMITS, **(limits or {}))
+        self.on_wait = on_wait  # Called for tasks that have to wait for a device
+        self.kind_of = kind_of
+        self.max_running = max(0, int(max_running))
+        self.order_of = order_of or (lambda task: 0)
+        self.active: Dict[str, int] = {}  # Device -> running tasks
+        self.running = 0
+        self.pending: List[Tuple[Dict, Callable, Tuple[Tuple[str, str], ...], Future, int]] = []
+        self._order: Dict[Future, int] = {}  # Waiting task's future -> order_of(task) when last read
+        self._sequence = 0
+        self._kinds: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def device_for(self, path: str) -> Tuple[str, str]:
+        """Return (device, kind) for the drive holding path, using the longest matching mount point"""
+        path = os.path.abspath(path)
+        best = None
+        for drive in self.drives_provider():
+            mount = drive.get("mountpoint", "")
+            if not mount:
+                continue
+            if path == mount or path.startswith(mount.rstrip("/\\") + os.sep):
+                if best is None or len(mount) > len(best["mountpoint"]):
+                    best = drive
+        if best is None:
+            return "unknown", "unknown"
+
+        disk = physical_disk(best.get("device", ""))
+        device = disk or best.get("device") or best["mountpoint"]
+        if device not in self._kinds:
+            self._kinds[device] = self.kind_of(disk, best.get("fstype", ""))
+        return device, self._kinds[device]
+
+    def devices_for(self, task: Dict) -> Tuple[Tuple[str, str], ...]:
+        devices = {self.device_for(task["source"]), self.device_for(task["destination"])}
+        return tuple(sorted(devices))
+
+    def limit(self, kind: str) -> int:
+        return max(1, int(self.limits.get(kind, self.limits["unknown"])))
+
+    def set_limits(self, limits: Dict[str, int]):
+        """Change per-kind limits; waiting tasks that now fit start immediately"""
+        with self._lock:
+            self.limits.update(limits)
+            self._dispatch()
+
+    def set_max_running(self, max_running: int):
+        """Change how many tasks may be with the executor at once"""
+        with self._lock:
+            self.max_running = max(0, int(max_running))
+            self._dispatch()
+
+    def reprioritize(self):
+        """Re-sort the waiting tasks after priorities or queue positions changed"""
+        with self._lock:
+            for task, _, _, future, _ in self.pending:
+                self._order[future] = self.order_of(task)
+            self._dispatch()
+
+    def submit(self, task: Dict, fn: Callable[[Dict], object]) -> Future:
+        """Queue fn(task) and return a future that finishes with it"""
+        devices = self.devices_for(task)
+        order = self.order_of(task)
+        with self._lock:
+            for queued_task, _, _, future, _ in self.pending:
+                if queued_task is task and not future.cancelled():
+                    return future  # Already waiting
+
+            future = Future()
+            self._order[future] = order
+            self._sequence += 1
+            self.pending.append((task, fn, devices, future, self._sequence))
+            self._dispatch()
+            if any(entry[3] is future for entry in self.pending) and self.on_wait:
+                self.on_wait(task)
+        return future
+
+    def is_waiting(self, task: Dict) -> bool:
+        with self._lock:
+            return any(entry[0] is task for entry in self.pending)
+
+    def _queue_key(self, entry) -> Tuple:
+        task, _, _, future, sequence = entry
+        return -task.get("priority", 0), self._order.get(future, 0), sequence
+
+    def _dispatch(self):
+        """Start every waiting task whose devices have room, best-placed first (lock held)"""
+        self.pending.sort(key=self._queue_key)
+        blocked = set()  # Devices a better-placed waiting task is queued for
+        still_pending = []
+        for entry in self.pending:
+            task, fn, devices, future, _ = entry
+            if future.cancelled():
+                self._order.pop(future, None)
+                continue
+            names = {device for device, _ in devices}
+            fits = all(self.active.get(device, 0) < self.limit(kind) for device, kind in devices)
+            has_room = not self.max_running or self.running < self.max_running
+            if fits and has_room and not names & blocked:
+                for device in names:
+                    self.active[device] = self.active.get(device, 0) + 1
+                self.running += 1
+                self._order.pop(future, None)
+                self.executor.submit(self._run, task, fn, names, future)
+            else:
+                blocked |= names
+                still_pending.append(entry)
+        self.pending = still_pending
+
+    def _run(self, task: Dict, fn: Callable[[Dict], object], devices: set, future: Future):
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(task))
+                except BaseException as e:
+                    future.set_exception(e)
+        finally:
+            with self._lock:
+                for device in devices:
+                    self.active[device] -= 1
+                self.running -= 1
+                self._dispatch()
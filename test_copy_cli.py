@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Test script for the Persian File Copier Pro command line
+Runs the headless commands in-process and checks their JSON output and exit codes
+"""
+
+import sys
+import os
+import io
+import json
+import tempfile
+from contextlib import contextmanager, redirect_stdout
+from pathlib import Path
+
+# Add current directory to path to import the command line
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import copy_cli
+
+
+def run_cli(*argv):
+    """Run one command and return (exit code, parsed JSON lines)"""
+    output = io.StringIO()
+    with redirect_stdout(output):
+        exit_code = copy_cli.main(list(argv))
+    events = [json.loads(line) for line in output.getvalue().splitlines() if line.strip()]
+    return exit_code, events
+
+
+@contextmanager
+def home_directory(path):
+    """Point the home folder at path so the clipboard, checkpoints and tuning stay out of the real one"""
+    previous = {name: os.environ.get(name) for name in ("HOME", "USERPROFILE")}
+    os.environ["HOME"] = os.environ["USERPROFILE"] = str(path)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+@contextmanager
+def working_directory(path):
+    """Run inside path so anything written to the working folder stays out of the repo"""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def make_tree(root: Path):
+    (root / "sub").mkdir(parents=True)
+    (root / "big.bin").write_bytes(os.urandom(2 * 1024 * 1024))
+    (root / "sub" / "small.txt").write_text("hello")
+
+
+def test_copy_and_verify():
+    """Test copy and verify commands, including a mismatch exit code"""
+    print("Testing copy and verify commands...")
+
+    with tempfile.TemporaryDirectory() as temp_dir, working_directory(temp_dir), \
+            home_directory(Path(temp_dir) / "home"):
+        temp_path = Path(temp_dir)
+        settings = str(temp_path / "settings.json")  # Missing file - engine defaults
+        source = temp_path / "source"
+        make_tree(source)
+        (temp_path / "dest").mkdir()
+
+        exit_code, events = run_cli("copy", str(source), str(source / "big.bin"), str(temp_path / "dest"),
+                                    "--settings", settings, "--interval", "0")
+        assert exit_code == copy_cli.EXIT_OK, events
+        done = [event for event in events if event["event"] == "done"]
+        assert len(done) == 2 and all(event["result"] == "completed" for event in done)
+        assert any(event["event"] == "progress" for event in events)
+        assert events[-1]["event"] == "summary" and events[-1]["completed"] == 2
+        assert (temp_path / "dest" / "source" / "sub" / "small.txt").read_text() == "hello"
+        assert (temp_path / "dest" / "big.bin").read_bytes() == (source / "big.bin").read_bytes()
+        print("✓ Folder and file copied with JSON progress")
+
+        exit_code, events = run_cli("verify", str(source), str(temp_path / "dest" / "source"), "--settings", settings)
+        assert exit_code == copy_cli.EXIT_OK and events[-1]["match"]
+
+        (temp_path / "dest" / "source" / "sub" / "small.txt").write_text("HELLO")
+        exit_code, events = run_cli("verify", str(source), str(temp_path / "dest" / "source"), "--settings", settings)
+        assert exit_code == copy_cli.EXIT_MISMATCH
+        assert events[-1]["mismatches"] == [os.path.join("sub", "small.txt")]
+        print("✓ Verify reports mismatches with exit code 3")
+
+        exit_code, events = run_cli("copy", str(temp_path / "missing"), str(temp_path / "dest"),
+                                    "--settings", settings)
+        assert exit_code == copy_cli.EXIT_USAGE
+        exit_code, _ = run_cli("unknown-command")
+        assert exit_code == copy_cli.EXIT_USAGE
+        print("✓ Bad arguments exit with code 2")
+
+    return True
+
+
+def test_sync_and_scan():
+    """Test that sync copies only changes and scan counts the tree"""
+    print("\nTesting sync and scan commands...")
+
+    with tempfile.TemporaryDirectory() as temp_dir, working_directory(temp_dir), \
+            home_directory(Path(temp_dir) / "home"):
+        temp_path = Path(temp_dir)
+        settings = str(temp_path / "settings.json")
+        source = temp_path / "source"
+        mirror = temp_path / "mirror"
+        make_tree(source)
+
+        exit_code, _ = run_cli("sync", str(source), str(mirror), "--settings", settings, "--quiet")
+        assert exit_code == copy_cli.EXIT_OK
+        (mirror / "extra.txt").write_text("not in source")
+        (source / "sub" / "small.txt").write_text("changed")
+
+        exit_code, events = run_cli("sync", str(source), str(mirror), "--settings", settings,
+                                    "--quiet", "--delete-extras")
+        assert exit_code == copy_cli.EXIT_OK
+        assert not any(event["event"] == "progress" for event in events)
+        assert (mirror / "sub" / "small.txt").read_text() == "changed"
+        assert not (mirror / "extra.txt").exists()
+        print("✓ Sync mirrored the changes and removed extras")
+
+        exit_code, events = run_cli("scan", str(source), "--files", "--settings", settings)
+        assert exit_code == copy_cli.EXIT_OK
+        summary = events[-1]
+        assert summary["files"] == 2 and summary["directories"] == 1
+        assert summary["bytes"] == 2 * 1024 * 1024 + len("changed")
+        assert len([event for event in events if event["event"] == "file"]) == 2
+        print("✓ Scan counted files, folders and bytes")
+
+        # State lives in the home folder; the working folder is left alone
+        state = temp_path / "home" / copy_cli.STATE_DIR
+        assert (state / copy_cli.TUNING_FILE).exists()
+        assert not (temp_path / copy_cli.TUNING_FILE).exists() and not (temp_path / copy_cli.CHECKPOINT_DIR).exists()
+        os.remove(state / copy_cli.TUNING_FILE)
+        run_cli("scan", str(source), "--settings", settings)
+        run_cli("verify", str(source), str(mirror), "--settings", settings)
+        assert not (state / copy_cli.TUNING_FILE).exists()
+        print("✓ Tuning saved under the home folder, and only by commands that copy")
+
+    return True
+
+
+def test_copy_and_paste():
+    """Test that paste finds what copy remembered when run from another folder"""
+    print("\nTesting copy and paste commands...")
+
+    with tempfile.TemporaryDirectory() as temp_dir, home_directory(Path(temp_dir) / "home"):
+        temp_path = Path(temp_dir)
+        settings = str(temp_path / "settings.json")
+        source = temp_path / "source"
+        make_tree(source)
+        (temp_path / "somewhere").mkdir()
+        (temp_path / "elsewhere").mkdir()
+
+        with working_directory(temp_path / "somewhere"):
+            exit_code, events = run_cli("copy", str(source / "big.bin"), "--settings", settings)
+        assert exit_code == copy_cli.EXIT_OK and events[-1]["paths"] == [str(source / "big.bin")]
+        assert os.path.exists(temp_path / "home" / copy_cli.STATE_DIR / copy_cli.CLIPBOARD_FILE)
+
+        with working_directory(temp_path / "elsewhere"):
+            exit_code, events = run_cli("paste", str(temp_path / "pasted"), "--settings", settings)
+            assert exit_code == copy_cli.EXIT_OK, events
+            assert (temp_path / "pasted" / "big.bin").read_bytes() == (source / "big.bin").read_bytes()
+            exit_code, events = run_cli("paste", str(temp_path / "pasted"), "--settings", settings)
+            assert exit_code == copy_cli.EXIT_USAGE  # The clipboard was emptied
+        print("✓ Paste from another folder copied the remembered file")
+
+    return True
+
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Persian File Copier Pro - Command Line Tests")
+    print("=" * 50)
+
+    tests = [
+        test_copy_and_verify,
+        test_sync_and_scan,
+        test_copy_and_paste
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"✗ Test {test.__name__} failed with exception: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"Test Results: {passed} passed, {failed} failed")
+    print("=" * 50)
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
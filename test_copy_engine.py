@@ -0,0 +1,1130 @@
+#!/usr/bin/env python3
+"""
+Test script for the Persian File Copier Pro copy engine
+Exercises the file transfer routines without requiring a GUI display
+"""
+
+import sys
+import errno
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add current directory to path to import the engine
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import copy_engine
+
+
+def make_task(source, destination, size=None):
+    """Build a running task like the ones FileCopierApp starts"""
+    size = os.path.getsize(source) if size is None else size
+    return copy_engine.CopyTask(str(source), str(destination), size, state=copy_engine.TaskState.RUNNING)
+
+
+def test_kernel_copy():
+    """Test the default copy path and that the method is recorded"""
+    print("\nTesting kernel copy path...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        source = temp_path / "source.bin"
+        data = os.urandom(3 * 1024 * 1024 + 123)
+        source.write_bytes(data)
+
+        task = make_task(source, temp_path / "dest.bin")
+        method = copy_engine.copy_file(task, 64 * 1024)
+
+        assert (temp_path / "dest.bin").read_bytes() == data
+        assert task["copied"] == len(data)
+        assert task["progress"] == 100.0
+        assert task["copy_method"] == method
+        expected = [name for name, _ in copy_engine.kernel_copy_methods()] or ["readwrite"]
+        assert method == expected[0], f"Unexpected copy method {method}"
+        print(f"✓ File copied via {method}")
+
+        return True
+
+
+def test_readwrite_fallback():
+    """Test the user-space loop used when zero-copy is disabled"""
+    print("\nTesting read/write fallback...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        source = temp_path / "source.bin"
+        data = os.urandom(300 * 1024 + 7)
+        source.write_bytes(data)
+
+        updates = []
+        task = make_task(source, temp_path / "dest.bin")
+        method = copy_engine.copy_file(task, 32 * 1024, progress_callback=lambda: updates.append(1),
+                                       update_interval=0, options=copy_engine.CopyOptions(zero_copy=False))
+
+        assert method == "readwrite"
+        assert (temp_path / "dest.bin").read_bytes() == data
+        assert updates, "Progress callback was never called"
+        print("✓ Read/write loop copies correctly and reports progress")
+
+        return True
+
+
+def test_cancelled_copy():
+    """Test that a cancelled task stops without copying"""
+    print("\nTesting cancellation...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        source = temp_path / "source.bin"
+        source.write_bytes(os.urandom(1024 * 1024))
+
+        task = make_task(source, temp_path / "dest.bin")
+        task["cancelled"] = True
+        copy_engine.copy_file(task, 64 * 1024)
+
+        assert task["copied"] == 0
+        print("✓ Cancelled task copies nothing")
+
+        return True
+
+
+def test_durability_policies():
+    """Test that every durability policy produces an identical copy"""
+    print("\nTesting durability policies...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        source = temp_path / "source.bin"
+        data = os.urandom(2 * 1024 * 1024 + 5)
+        source.write_bytes(data)
+
+        for policy in copy_engine.DURABILITY_POLICIES:
+            for zero_copy in (True, False):
+                dest = temp_path / f"dest-{policy}-{zero_copy}.bin"
+                task = make_task(source, dest)
+                options = copy_engine.CopyOptions(zero_copy=zero_copy,
+                                                  durability=copy_engine.DurabilityPolicy(policy, 1))
+                copy_engine.copy_file(task, 256 * 1024, options=options)
+                assert dest.read_bytes() == data, f"Copy differs with policy {policy}"
+        print("✓ All durability policies copy correctly")
+
+        # Unknown policies fall back to the default
+        assert copy_engine.DurabilityPolicy("bogus").policy == "flush-at-end"
+        print("✓ Unknown policy falls back to flush-at-end")
+
+        # Striped workers report writes at once; every interval is synced exactly once
+        policy = copy_engine.DurabilityPolicy("fsync-every-N-MB", 1)
+        fsyncs = []
+        real_fsync = copy_engine.os.fsync
+        copy_engine.os.fsync = fsyncs.append
+        try:
+            with open(temp_path / "synced.bin", "wb") as dst:
+                def report_writes():
+                    for _ in range(1000):
+                        policy.after_write(dst, 64 * 1024)
+
+                workers = [threading.Thread(target=report_writes) for _ in range(8)]
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+        finally:
+            copy_engine.os.fsync = real_fsync
+        assert len(fsyncs) == 8 * 1000 * 64 // 1024 and policy.unsynced == 0
+        print("✓ Concurrent writers fsync once per interval")
+
+        return True
+
+
+def test_buffer_pool():
+    """Test buffer reuse and the memory budget of the shared pool"""
+    print("\nTesting buffer pool...")
+
+    pool = copy_engine.BufferPool(1024 * 1024)
+    first = pool.acquire(512 * 1024)
+    pool.release(first)
+    assert pool.acquire(512 * 1024) is first, "Idle buffer was not reused"
+    print("✓ Idle buffers are reused")
+
+    pool.release(first)
+
+    # Oversized requests are clamped to the budget; idle buffers of
+    # another size are evicted to make room for them
+    big = pool.acquire(8 * 1024 * 1024)
+    assert len(big) == pool.budget
+    assert pool.allocated == pool.budget
+    pool.release(big)
+    print("✓ Pool never allocates past its budget")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        source = temp_path / "source.bin"
+        data = os.urandom(700 * 1024 + 3)
+        source.write_bytes(data)
+
+        task = make_task(source, temp_path / "dest.bin")
+        copy_engine.copy_file(task, 64 * 1024, options=copy_engine.CopyOptions(zero_copy=False, pool=pool))
+        assert (temp_path / "dest.bin").read_bytes() == data
+        print("✓ Read/write loop copies through pooled buffers")
+
+    return True
+
+
+def test_striped_copy():
+    """Test that a file split across several workers is reassembled correctly"""
+    print("\nTesting striped copy...")
+
+    if not copy_engine.STRIPED_COPY_SUPPORTED:
+        print("⚠ Positional I/O not available, skipping")
+        return True
+
+    original_stripe_size = copy_engine.STRIPE_SIZE
+    copy_engine.STRIPE_SIZE = 256 * 1024  # Many small stripes exercise the work sharing
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            source = temp_path / "source.bin"
+            data = os.urandom(5 * 1024 * 1024 + 999)
+            source.write_bytes(data)
+
+            task = make_task(source, temp_path / "dest.bin")
+            method = copy_engine.copy_file_striped(task, 64 * 1024,
+                                                   options=copy_engine.CopyOptions(stripe_workers=4))
+
+            assert method == "striped" and task["copy_method"] == "striped"
+            assert (temp_path / "dest.bin").read_bytes() == data
+            assert task["copied"] == len(data)
+            print("✓ Striped copy matches the source")
+
+            # A cancelled copy leaves no full-size, zero-filled destination behind
+            task = make_task(source, temp_path / "cancelled.bin")
+
+            def cancel_midway():
+                if task["copied"] >= len(data) // 2:
+                    task["cancelled"] = True
+
+            copy_engine.copy_file_striped(task, 64 * 1024, cancel_midway, update_interval=0,
+                                          options=copy_engine.CopyOptions(stripe_workers=4))
+            assert os.path.getsize(task["destination"]) == 0
+            print("✓ Cancelled striped copy truncated")
+    finally:
+        copy_engine.STRIPE_SIZE = original_stripe_size
+
+    return True
+
+
+def test_copy_tree():
+    """Test the batched directory copy with a mix of small and large files"""
+    print("\nTesting batched directory copy...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        source = temp_path / "tree"
+        expected = {}
+        for i in range(150):
+            sub_dir = source / f"dir{i % 7}" / f"nested{i % 3}"
+            sub_dir.mkdir(parents=True, exist_ok=True)
+            data = os.urandom(i * 17)
+            (sub_dir / f"file{i}.bin").write_bytes(data)
+            expected[f"dir{i % 7}/nested{i % 3}/file{i}.bin"] = data
+        (source / "empty_dir").mkdir()
+        big = os.urandom(2 * 1024 * 1024)
+        (source / "big.bin").write_bytes(big)
+        expected["big.bin"] = big
+
+        task = make_task(source, temp_path / "copy", size=sum(len(d) for d in expected.values()))
+        summary = copy_engine.copy_tree(task, 64 * 1024,
+                                        options=copy_engine.CopyOptions(tree_workers=4))
+
+        assert summary["errors"] == 0
+        assert summary["files"] == len(expected)
+        for relative_path, data in expected.items():
+            assert (temp_path / "copy" / relative_path).read_bytes() == data, relative_path
+        assert (temp_path / "copy" / "empty_dir").is_dir()
+        assert task["copied"] == task["size"]
+        print(f"✓ Copied {summary['files']} files in {summary['directories']} directories")
+
+    return True
+
+
+def test_preallocation():
+    """Test that preallocated copies end up with exactly the source size"""
+    print("\nTesting destination preallocation...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        source = temp_path / "source.bin"
+        data = os.urandom(1024 * 1024 + 77)
+        source.write_bytes(data)
+
+        for zero_copy in (True, False):
+            dest = temp_path / f"dest-{zero_copy}.bin"
+            task = make_task(source, dest)
+            copy_engine.copy_file(task, 64 * 1024,
+                                  options=copy_engine.CopyOptions(zero_copy=zero_copy, preallocate=True))
+            assert dest.read_bytes() == data
+        print("✓ Preallocated copies match the source")
+
+        # A cancelled copy must not leave the full-size reservation behind
+        task = make_task(source, temp_path / "cancelled.bin")
+        task["cancelled"] = True
+        copy_engine.copy_file(task, 64 * 1024, options=copy_engine.CopyOptions(preallocate=True))
+        assert os.path.getsize(temp_path / "cancelled.bin") == 0
+        print("✓ Reservation is trimmed when the copy stops early")
+
+    return True
+
+
+def test_page_cache_hints():
+    """Test that copies with page-cache dropping enabled stay correct"""
+    print("\nTesting page cache hints...")
+
+    original_window = copy_engine.CACHE_DROP_WINDOW
+    copy_engine.CACHE_DROP_WINDOW = 128 * 1024  # Several drop windows in a small file
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            source = temp_path / "source.bin"
+            data = os.urandom(1024 * 1024 + 11)
+            source.write_bytes(data)
+
+            for zero_copy in (True, False):
+                dest = temp_path / f"dest-{zero_copy}.bin"
+                task = make_task(source, dest)
+                copy_engine.copy_file(task, 64 * 1024,
+                                      options=copy_engine.CopyOptions(zero_copy=zero_copy, drop_cache=True))
+                assert dest.read_bytes() == data
+            print("✓ Copies with cache dropping match the source")
+    finally:
+        copy_engine.CACHE_DROP_WINDOW = original_window
+
+    return True
+
+
+def test_direct_io_copy():
+    """Test the O_DIRECT path, including an unaligned tail, or its buffered fallback"""
+    print("\nTesting direct I/O copy...")
+
+    # The repository directory is usually on a real disk; /tmp may be tmpfs
+    for base_dir in (os.path.dirname(os.path.abspath(__file__)), None):
+        with tempfile.TemporaryDirectory(dir=base_dir) as temp_dir:
+            temp_path = Path(temp_dir)
+            source = temp_path / "source.bin"
+            data = os.urandom(3 * 1024 * 1024 + 1234)
+            source.write_bytes(data)
+
+            task = make_task(source, temp_path / "dest.bin")
+            method = copy_engine.copy_file_direct(task, 64 * 1024)
+
+            assert (temp_path / "dest.bin").read_bytes() == data
+            assert task["copied"] == len(data)
+            print(f"✓ Copied via {method} in {temp_dir}")
+
+    return True
+
+
+def test_mmap_copy():
+    """Test the memory-mapped path used for medium files without a kernel copy path"""
+    print("\nTesting memory-mapped copy...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        source = temp_path / "source.bin"
+        data = os.urandom(9 * 1024 * 1024 + 321)
+        source.write_bytes(data)
+
+        updates = []
+        task = make_task(source, temp_path / "dest.bin")
+        options = copy_engine.CopyOptions(zero_copy=False, mmap_min_size=1024 * 1024)
+        method = copy_engine.copy_file(task, 64 * 1024, progress_callback=lambda: updates.append(1),
+                                       update_interval=0, options=options)
+
+        assert method == "mmap"
+        assert (temp_path / "dest.bin").read_bytes() == data
+        assert len(updates) > 1, "Progress was not reported per slice"
+        print("✓ Medium file copied through a memory map with sliced progress")
+
+        # Below the range the buffered loop is used
+        small = temp_path / "small.bin"
+        small.write_bytes(data[:1000])
+        task = make_task(small, temp_path / "small-copy.bin")
+        assert copy_engine.copy_file(task, 64 * 1024, options=options) == "readwrite"
+        print("✓ Files outside the range use the read/write loop")
+
+    return True
+
+
+def test_adaptive_buffer():
+    """Test throughput-driven buffer tuning and its per-mount memory"""
+    print("\nTesting adaptive buffer sizing...")
+
+    # Simulated device that is fastest with 1MB chunks
+    clock = [1000.0]
+    real_time = copy_engine.time.time
+    copy_engine.time.time = lambda: clock[0]
+    try:
+        session = copy_engine.TuningSession(64 * 1024)
+        while not session.settled:
+            size = session.size
+            rate = 100e6 if size == 1024 * 1024 else 100e6 * min(size, 1024 * 1024) / (2 * 1024 * 1024)
+            clock[0] += copy_engine.TUNING_WINDOW
+            session.record(int(rate * copy_engine.TUNING_WINDOW))
+    finally:
+        copy_engine.time.time = real_time
+
+    assert session.best_size == 1024 * 1024, f"Settled on {session.best_size}"
+    assert session.size == session.best_size
+    print("✓ Tuner climbs to the fastest chunk size and settles there")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        source = temp_path / "source.bin"
+        data = os.urandom(3 * 1024 * 1024 + 77)
+        source.write_bytes(data)
+        state_file = temp_path / "tuning.json"
+
+        # Resizing mid-copy must not lose or duplicate data
+        tuner = copy_engine.BufferTuner(str(state_file))
+        options = copy_engine.CopyOptions(zero_copy=False, mmap_max_size=0, tuner=tuner)
+        window = copy_engine.TUNING_WINDOW
+        copy_engine.TUNING_WINDOW = 0
+        try:
+            task = make_task(source, temp_path / "dest.bin")
+            assert copy_engine.copy_file(task, 32 * 1024, options=options) == "readwrite"
+        finally:
+            copy_engine.TUNING_WINDOW = window
+        assert (temp_path / "dest.bin").read_bytes() == data
+        print("✓ Data intact while the buffer size changes")
+
+        tuner.save()
+        remembered = copy_engine.BufferTuner(str(state_file))
+        size = remembered.initial_size(str(source), str(temp_path / "other.bin"), 4096)
+        assert size == tuner.initial_size(str(source), str(temp_path / "dest.bin"), 4096)
+        assert size != 4096, "Best size was not remembered for the mount pair"
+        print("✓ Best size persisted and reused for the same mount pair")
+
+    return True
+
+
+def test_streaming_hash():
+    """Test that content hashes come from the copied chunks and the read-back pass"""
+    print("\nTesting streaming content hashes...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        source = temp_path / "source.bin"
+        data = os.urandom(6 * 1024 * 1024 + 5)
+        source.write_bytes(data)
+        expected = copy_engine.hash_file(str(source), "blake2b")
+
+        for mmap_max_size in (0, 64 * 1024 * 1024):
+            task = make_task(source, temp_path / "dest.bin")
+            options = copy_engine.CopyOptions(zero_copy=False, hash_algorithm="blake2b",
+                                              mmap_min_size=1024 * 1024, mmap_max_size=mmap_max_size)
+            method = copy_engine.copy_file(task, 256 * 1024, options=options)
+            assert method in ("readwrite", "mmap"), f"Hashing copy used {method}"
+            assert task["source_hash"] == expected
+            assert task["destination_hash"] == expected
+            print(f"✓ {method} copy streamed the source hash and read back the destination")
+
+        options = copy_engine.CopyOptions(zero_copy=False, hash_algorithm="blake2b", readback=False)
+        task = make_task(source, temp_path / "trusted.bin")
+        copy_engine.copy_file(task, 256 * 1024, options=options)
+        assert task["source_hash"] == expected and task["destination_hash"] == ""
+        print("✓ Read-back skipped when the write path is trusted")
+
+        if copy_engine.DIRECT_IO_SUPPORTED:
+            task = make_task(source, temp_path / "direct.bin")
+            copy_engine.copy_file_direct(task, 1024 * 1024, options=copy_engine.CopyOptions(hash_algorithm="blake2b"))
+            assert task["source_hash"] == expected == task["destination_hash"]
+            print("✓ Direct I/O copy hashed as well")
+
+    return True
+
+
+def test_verified_fast_paths():
+    """Test that verification keeps the kernel and striped paths and hashes both sides afterwards"""
+    print("\nTesting verified kernel and striped copies...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        source = temp_path / "source.bin"
+        source.write_bytes(os.urandom(3 * 1024 * 1024 + 11))
+        expected = copy_engine.hash_file(str(source), copy_engine.DEFAULT_HASH_ALGORITHM)
+        settings = {"verify_copy": True, "stripe_threshold_mb": 0, "stripe_workers": 1}
+        engine = copy_engine.CopyEngine(settings, str(temp_path / "checkpoints"), str(temp_path / "tuning.json"))
+
+        task = make_task(source, temp_path / "kernel.bin")
+        assert engine.run_task(task) == "completed"
+        if copy_engine.kernel_copy_methods():
+            assert task["copy_method"] in ("copy_file_range", "sendfile"), task["copy_method"]
+        assert task["source_hash"] == expected == task["destination_hash"]
+        print(f"✓ Verified default copy used {task['copy_method']}")
+
+        if copy_engine.STRIPED_COPY_SUPPORTED:
+            settings["stripe_workers"] = 4
+            task = make_task(source, temp_path / "striped.bin")
+            assert engine.run_task(task) == "completed"
+            assert task["copy_method"] == "striped"
+            assert task["source_hash"] == expected == task["destination_hash"]
+            print("✓ Verified huge-file copy stayed striped")
+
+            # A stale hash from an earlier attempt never stands in for the new copy
+            task["source_hash"] = task["destination_hash"] = "stale"
+            engine.copy_file(task)
+            Path(task["destination"]).write_bytes(b"corrupt" + source.read_bytes()[7:])
+            assert not engine.verify(task)
+            print("✓ Corrupted striped copy fails verification")
+
+    return True
+
+
+def test_verify_tree():
+    """Test the parallel directory verifier"""
+    print("\nTesting directory verification...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        source = temp_path / "source"
+        for i in range(150):
+            folder = source / f"dir{i % 7}"
+            folder.mkdir(parents=True, exist_ok=True)
+            (folder / f"file{i}.txt").write_bytes(os.urandom(100 + i))
+        (source / "big.bin").write_bytes(os.urandom(2 * 1024 * 1024))
+
+        destination = temp_path / "copy"
+        shutil.copytree(source, destination)
+        task = make_task(source, destination, size=0)
+        options = copy_engine.CopyOptions(hash_algorithm="blake2b", verify_workers=4)
+
+        summary = copy_engine.verify_tree(task, options)
+        assert summary["verified"] == 151 and not summary["mismatches"]
+        print("✓ Identical tree verified")
+
+        # Same size, different content; a missing file; a truncated file
+        damaged = destination / "dir3" / "file3.txt"
+        damaged.write_bytes(bytes(len(damaged.read_bytes())))
+        (destination / "dir4" / "file4.txt").unlink()
+        with open(destination / "big.bin", "r+b") as f:
+            f.truncate(1024)
+
+        reported = []
+        summary = copy_engine.verify_tree(task, options, on_mismatch=lambda path, reason: reported.append(path))
+        reasons = dict(summary["mismatches"])
+        assert reasons == {
+            os.path.join("dir3", "file3.txt"): "content differs",
+            os.path.join("dir4", "file4.txt"): "missing",
+            "big.bin": "size differs"
+        }, reasons
+        assert sorted(reported) == sorted(reasons)
+        print("✓ Content, missing and size mismatches reported per file")
+
+        summary = copy_engine.verify_tree(task, copy_engine.CopyOptions(hash_algorithm="blake2b", verify_workers=1),
+                                          stop_on_first=True)
+        assert len(summary["mismatches"]) == 1
+        print("✓ Stops at the first mismatch when asked")
+
+    return True
+
+
+def test_checkpoint_resume():
+    """Test that interrupted copies resume from a verified checkpoint"""
+    print("\nTesting checkpointed resume...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        source = temp_path / "source.bin"
+        data = os.urandom(6 * 1024 * 1024 + 99)
+        source.write_bytes(data)
+        destination = temp_path / "dest.bin"
+        store = copy_engine.CheckpointStore(str(temp_path / "checkpoints"), interval=1024 * 1024)
+        options = copy_engine.CopyOptions(zero_copy=False, mmap_max_size=0, hash_algorithm="blake2b",
+                                          checkpoints=store)
+
+        task = make_task(source, destination)
+
+        def cancel_halfway():
+            if task["copied"] >= 3 * 1024 * 1024:
+                task["cancelled"] = True
+
+        copy_engine.copy_file(task, 256 * 1024, progress_callback=cancel_halfway, update_interval=0,
+                              options=options)
+        state = store.load(str(source), str(destination))
+        assert state and state["offset"] >= 3 * 1024 * 1024
+        assert destination.read_bytes() == data[:state["offset"]]
+        print(f"✓ Cancelled copy checkpointed at {state['offset']} bytes")
+
+        # Restart: only the rest is written, and the hash still covers the whole file
+        task.update(cancelled=False, copied=0)
+        reads = []
+        real_write_all = copy_engine._write_all
+        copy_engine._write_all = lambda dst, view: (reads.append(len(view)), real_write_all(dst, view))
+        try:
+            copy_engine.copy_file(task, 256 * 1024, options=options)
+        finally:
+            copy_engine._write_all = real_write_all
+        assert destination.read_bytes() == data
+        assert sum(reads) == len(data) - state["offset"]
+        assert task["copied"] == len(data)
+        assert task["source_hash"] == copy_engine.hash_file(str(source), "blake2b")
+        assert not store.exists(str(source), str(destination))
+        print("✓ Restart resumed after the checkpoint and cleared it")
+
+        # A damaged prefix is not trusted
+        task.update(cancelled=False, copied=0)
+        copy_engine.copy_file(task, 256 * 1024, progress_callback=cancel_halfway, update_interval=0,
+                              options=options)
+        with open(destination, "r+b") as f:
+            f.write(b"garbage")
+        task.update(cancelled=False, copied=0)
+        copy_engine.copy_file(task, 256 * 1024, options=options)
+        assert destination.read_bytes() == data
+        print("✓ Altered destination prefix copied again from the start")
+
+        # Directory tasks skip the files an earlier run finished
+        tree = temp_path / "tree"
+        tree.mkdir()
+        for i in range(20):
+            (tree / f"file{i}.txt").write_bytes(os.urandom(1000))
+        tree_copy = temp_path / "tree-copy"
+        shutil.copytree(tree, tree_copy)
+        (tree_copy / "file7.txt").unlink()
+        tree_checkpoint = store.begin_tree(str(tree), str(tree_copy))
+        for i in range(20):
+            tree_checkpoint.file_done(f"file{i}.txt")
+        tree_checkpoint.commit()
+
+        copied = []
+        real_copyfile = copy_engine.shutil.copyfile
+        copy_engine.shutil.copyfile = lambda src, dst: (copied.append(os.path.basename(src)), real_copyfile(src, dst))
+        try:
+            task = make_task(tree, tree_copy, size=20 * 1000)
+            copy_engine.copy_tree(task, 64 * 1024, options=options)
+        finally:
+            copy_engine.shutil.copyfile = real_copyfile
+        assert copied == ["file7.txt"], copied
+        assert (tree_copy / "file7.txt").read_bytes() == (tree / "file7.txt").read_bytes()
+        assert task["copied"] == 20 * 1000
+        print("✓ Folder copy resumed with only the unfinished file")
+
+        # Periodic saves append to a journal; committing folds it back into the checkpoint
+        original_interval = copy_engine.TREE_CHECKPOINT_SECONDS
+        copy_engine.TREE_CHECKPOINT_SECONDS = 0
+        try:
+            tree_checkpoint = store.begin_tree(str(tree), str(tree_copy))
+            for i in range(5):
+                tree_checkpoint.file_done(f"file{i}.txt")
+        finally:
+            copy_engine.TREE_CHECKPOINT_SECONDS = original_interval
+        journal = Path(store.journal_path(str(tree), str(tree_copy)))
+        assert store.load(str(tree), str(tree_copy))["completed_files"] == []
+        with open(journal, "a", encoding="utf-8") as f:
+            f.write('"file5.t')  # Cut short by a crash
+        resumed = store.begin_tree(str(tree), str(tree_copy)).resume()
+        assert resumed == {f"file{i}.txt" for i in range(5)}, resumed
+        tree_checkpoint.commit()
+        assert not journal.exists()
+        assert store.load(str(tree), str(tree_copy))["completed_files"] == sorted(resumed)
+        store.clear(str(tree), str(tree_copy))
+        print("✓ Folder checkpoints append to a journal and compact on commit")
+
+    return True
+
+
+def test_checkpoint_fast_paths():
+    """Test that offset-only checkpoints keep the kernel and striped paths and resume them"""
+    print("\nTesting checkpoints without hashing...")
+
+    original_stripe_size = copy_engine.STRIPE_SIZE
+    copy_engine.STRIPE_SIZE = 256 * 1024
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            source = temp_path / "source.bin"
+            data = os.urandom(5 * 1024 * 1024 + 777)
+            source.write_bytes(data)
+            store = copy_engine.CheckpointStore(str(temp_path / "checkpoints"), interval=1024 * 1024)
+            options = copy_engine.CopyOptions(checkpoints=store)
+
+            task = make_task(source, temp_path / "kernel.bin")
+            method = copy_engine.copy_file(task, 64 * 1024, options=options)
+            assert Path(task["destination"]).read_bytes() == data
+            if copy_engine.kernel_copy_methods():
+                assert method in ("copy_file_range", "sendfile"), method
+            print(f"✓ Checkpointed copy without verification used {method}")
+
+            if copy_engine.STRIPED_COPY_SUPPORTED:
+                # One worker finishes stripes in order, so the frontier has passed several
+                # stripes by the time the cancel lands
+                options.stripe_workers = 1
+                task = make_task(source, temp_path / "striped.bin")
+
+                def cancel_midway():
+                    if task["copied"] >= 2 * 1024 * 1024:
+                        task["cancelled"] = True
+
+                copy_engine.copy_file_striped(task, 64 * 1024, cancel_midway, update_interval=0,
+                                              options=options)
+                state = store.load(task["source"], task["destination"])
+                assert state and 0 < state["offset"] < len(data) and not state["prefix_hash"]
+                assert Path(task["destination"]).read_bytes() == data[:state["offset"]]
+                print(f"✓ Cancelled striped copy kept its {state['offset']}-byte prefix")
+
+                options.stripe_workers = 4
+                task.update(cancelled=False, copied=0)
+                copy_engine.copy_file_striped(task, 64 * 1024, options=options)
+                assert Path(task["destination"]).read_bytes() == data
+                assert task["copied"] == len(data)
+                assert not store.exists(task["source"], task["destination"])
+                print("✓ Striped copy resumed after the checkpointed prefix")
+
+            engine = copy_engine.CopyEngine({"durability_policy": "none"}, str(temp_path / "checkpoints"),
+                                            str(temp_path / "tuning.json"))
+            assert not engine.options().checkpoints.sync
+            engine.reconfigure({"durability_policy": "fsync-at-end"})
+            assert engine.options().checkpoints.sync
+            print("✓ Checkpoints fsync only under the fsync policies")
+    finally:
+        copy_engine.STRIPE_SIZE = original_stripe_size
+
+    return True
+
+
+def test_delta_update():
+    """Test in-place delta updates of an existing destination"""
+    print("\nTesting delta updates...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        block = copy_engine.DELTA_BLOCK_SIZE
+        old = bytearray(os.urandom(8 * block + 500))
+        destination = temp_path / "image.bin"
+        destination.write_bytes(old)
+
+        new = bytearray(old)
+        new[3 * block + 10:3 * block + 20] = os.urandom(10)
+        new += os.urandom(block // 2)  # Grown at the end
+        source = temp_path / "source.bin"
+        source.write_bytes(new)
+
+        task = make_task(source, destination)
+        options = copy_engine.CopyOptions(hash_algorithm="blake2b")
+        summary = copy_engine.copy_file_delta(task, options=options)
+        assert destination.read_bytes() == new
+        assert summary["blocks"] == 9
+        assert summary["changed_blocks"] == 2, summary  # The edited block and the changed tail
+        assert task["copied"] == len(new) and task["copy_method"] == "delta"
+        assert task["source_hash"] == task["destination_hash"]
+        print(f"✓ Rewrote {summary['changed_blocks']} of {summary['blocks']} blocks")
+
+        # Shrunk source truncates the destination
+        source.write_bytes(new[:2 * block])
+        summary = copy_engine.copy_file_delta(make_task(source, destination), options=options)
+        assert destination.read_bytes() == new[:2 * block]
+        assert summary["changed_blocks"] == 0
+        print("✓ Unchanged blocks left alone and destination truncated")
+
+        # A 1MB buffer budget shared by several delta tasks must not deadlock
+        options = copy_engine.CopyOptions(pool=copy_engine.BufferPool(1024 * 1024))
+        tasks = []
+        for i in range(3):
+            copy_path = temp_path / f"copy{i}.bin"
+            copy_path.write_bytes(old)
+            tasks.append(make_task(temp_path / "image.bin", copy_path))
+        threads = [threading.Thread(target=copy_engine.copy_file_delta, args=(task,), kwargs={"options": options},
+                                    daemon=True) for task in tasks]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+            assert not thread.is_alive(), "Delta update stuck waiting for pool buffers"
+        assert all(Path(task["destination"]).read_bytes() == new[:2 * block] for task in tasks)
+        print("✓ Concurrent delta updates finish on a small buffer budget")
+
+    return True
+
+
+def test_sync_tree():
+    """Test the mirror mode that copies only new and changed files"""
+    print("\nTesting folder sync...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        source = temp_path / "source"
+        (source / "docs").mkdir(parents=True)
+        for i in range(10):
+            (source / "docs" / f"note{i}.txt").write_bytes(os.urandom(200))
+        (source / "data.bin").write_bytes(os.urandom(5000))
+
+        destination = temp_path / "backup"
+        task = make_task(source, destination, size=0)
+        summary = copy_engine.sync_tree(task, 64 * 1024)
+        assert summary["copied"] == 11 and summary["unchanged"] == 0
+        print("✓ First sync copies everything")
+
+        # Change one file, add one, leave stale files at the destination
+        (source / "docs" / "note3.txt").write_bytes(os.urandom(300))
+        (source / "new.txt").write_bytes(b"new")
+        (destination / "stale.txt").write_bytes(b"old")
+        (destination / "old_dir" / "deep").mkdir(parents=True)
+        (destination / "old_dir" / "deep" / "x.txt").write_bytes(b"x")
+
+        task = make_task(source, destination, size=0)
+        summary = copy_engine.sync_tree(task, 64 * 1024)
+        assert summary["copied"] == 2 and summary["unchanged"] == 10, summary
+        assert summary["deleted"] == 0 and (destination / "stale.txt").exists()
+        assert (destination / "docs" / "note3.txt").read_bytes() == (source / "docs" / "note3.txt").read_bytes()
+        print("✓ Only new and changed files copied")
+
+        # Same size and mtime but different content is only caught by hashing
+        data = bytearray((source / "data.bin").read_bytes())
+        data[0] ^= 0xFF
+        (destination / "data.bin").write_bytes(data)
+        shutil.copystat(source / "data.bin", destination / "data.bin")
+        plan = copy_engine.plan_sync(str(source), str(destination))
+        assert "data.bin" not in plan["copy"]
+        task = make_task(source, destination, size=0)
+        summary = copy_engine.sync_tree(task, 64 * 1024, compare_hash=True, delete_extras=True)
+        assert summary["copied"] == 1 and summary["deleted"] == 2, summary
+        assert (destination / "data.bin").read_bytes() == (source / "data.bin").read_bytes()
+        assert not (destination / "stale.txt").exists() and not (destination / "old_dir").exists()
+        print("✓ Hash comparison and deleting extras")
+
+    return True
+
+
+def test_free_space_check():
+    """Test that sync, delta and resumed copies only need room for what they still write"""
+    print("\nTesting free space checks...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        source = temp_path / "source"
+        (source / "sub").mkdir(parents=True)
+        (source / "big.bin").write_bytes(os.urandom(3 * 1024 * 1024))
+        (source / "sub" / "small.txt").write_text("hello")
+        mirror = temp_path / "mirror"
+        shutil.copytree(source, mirror)
+        settings = {"sync_mode": True, "verify_copy": False}
+        engine = copy_engine.CopyEngine(settings, str(temp_path / "checkpoints"), str(temp_path / "tuning.json"))
+
+        real_disk_usage = shutil.disk_usage
+        shutil.disk_usage = lambda path: real_disk_usage(path)._replace(free=1024 * 1024)
+        try:
+            task = make_task(source, mirror, size=copy_engine.path_size(str(source)))
+            assert engine.run_task(task) == "completed"
+            print("✓ Up-to-date sync runs on a nearly full disk")
+
+            (source / "big.bin").write_bytes(os.urandom(3 * 1024 * 1024))
+            later = time.time() + 60  # Past the sync mtime tolerance
+            os.utime(source / "big.bin", (later, later))
+            try:
+                engine.run_task(make_task(source, mirror, size=task["size"]))
+                assert False, "Changed file larger than the free space should fail"
+            except OSError as e:
+                assert e.errno == errno.ENOSPC
+
+            settings.update(sync_mode=False, overwrite_policy="update-delta")
+            delta_task = make_task(source / "big.bin", mirror / "big.bin")
+            assert engine.run_task(delta_task) == "completed"
+            assert (mirror / "big.bin").read_bytes() == (source / "big.bin").read_bytes()
+            print("✓ Delta update needs only the growth")
+
+            settings.update(overwrite_policy="overwrite")
+            try:
+                engine.run_task(make_task(source / "big.bin", temp_path / "fresh.bin"))
+                assert False, "A fresh copy larger than the free space should fail"
+            except OSError as e:
+                assert e.errno == errno.ENOSPC
+            print("✓ Fresh copies still need room for the whole file")
+        finally:
+            shutil.disk_usage = real_disk_usage
+
+    return True
+
+
+def test_async_engine():
+    """Test the deep-queue asyncio engine"""
+    print("\nTesting async copy engine...")
+
+    engine = copy_engine.AsyncCopyEngine(queue_depth=8, chunk_size=256 * 1024)
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            sources = []
+            for i in range(3):
+                source = temp_path / f"source{i}.bin"
+                source.write_bytes(os.urandom(3 * 1024 * 1024 + i * 1000))
+                sources.append(source)
+
+            # Several tasks share the engine at once
+            options = copy_engine.CopyOptions(hash_algorithm="blake2b")
+            tasks = [make_task(source, temp_path / f"dest{i}.bin") for i, source in enumerate(sources)]
+            threads = [threading.Thread(target=engine.copy_file, args=(task,), kwargs={"options": options})
+                       for task in tasks]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            for source, task in zip(sources, tasks):
+                assert Path(task["destination"]).read_bytes() == source.read_bytes()
+                assert task["copy_method"] == "async" and task["copied"] == task["size"]
+                assert task["source_hash"] == copy_engine.hash_file(str(source), "blake2b") == task["destination_hash"]
+            print("✓ Concurrent tasks copied with in-order hashes")
+
+            # Cancel midway, then resume from the checkpoint
+            store = copy_engine.CheckpointStore(str(temp_path / "checkpoints"), interval=1024 * 1024)
+            options = copy_engine.CopyOptions(checkpoints=store)
+            task = make_task(sources[0], temp_path / "resumed.bin")
+
+            def cancel_halfway():
+                if task["copied"] >= 2 * 1024 * 1024:
+                    task["cancelled"] = True
+
+            engine.copy_file(task, progress_callback=cancel_halfway, update_interval=0, options=options)
+            assert store.exists(task["source"], task["destination"])
+            task.update(cancelled=False, copied=0)
+            engine.copy_file(task, options=options)
+            assert Path(task["destination"]).read_bytes() == sources[0].read_bytes()
+            assert not store.exists(task["source"], task["destination"])
+            print("✓ Cancelled async copy resumed from its checkpoint")
+
+            # Chunks are read into pooled buffers, so a small budget caps the data in flight
+            for budget in (512 * 1024, 128 * 1024):
+                pool = copy_engine.BufferPool(budget)
+                options = copy_engine.CopyOptions(pool=pool, hash_algorithm="blake2b")
+                task = make_task(sources[1], temp_path / "pooled.bin")
+                engine.copy_file(task, options=options)
+                assert Path(task["destination"]).read_bytes() == sources[1].read_bytes()
+                assert task["source_hash"] == task["destination_hash"]
+                assert 0 < pool.allocated <= budget
+                assert sum(len(buffer) for idle in pool._free.values() for buffer in idle) == pool.allocated
+            print("✓ Async chunks stay within the buffer pool budget and are all returned")
+
+            # fsyncs and checkpoint writes stay off the loop thread shared by every task
+            class RecordingPolicy(copy_engine.DurabilityPolicy):
+                threads = set()
+
+                def after_write(self, dst, nbytes):
+                    self.threads.add(threading.current_thread().name)
+                    super().after_write(dst, nbytes)
+
+                def finish(self, dst):
+                    self.threads.add(threading.current_thread().name)
+                    super().finish(dst)
+
+            store = copy_engine.CheckpointStore(str(temp_path / "checkpoints"), interval=256 * 1024, sync=True)
+            options = copy_engine.CopyOptions(durability=RecordingPolicy("fsync-every-N-MB", 1),
+                                              checkpoints=store, hash_algorithm="blake2b")
+            task = make_task(sources[2], temp_path / "synced.bin")
+            engine.copy_file(task, options=options)
+            assert Path(task["destination"]).read_bytes() == sources[2].read_bytes()
+            assert RecordingPolicy.threads and "aio-loop" not in RecordingPolicy.threads
+            print("✓ Async fsyncs run on the I/O pool, not the event loop")
+    finally:
+        engine.close()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        engine = copy_engine.CopyEngine({"async_queue_depth": 4}, str(temp_path / "checkpoints"),
+                                        str(temp_path / "tuning.json"))
+        try:
+            async_engine = engine.get_async_engine()
+            assert async_engine.queue_depth == 4
+            engine.reconfigure({"async_queue_depth": 16})
+            assert engine.get_async_engine() is async_engine and async_engine.queue_depth == 16
+            assert async_engine.executor._max_workers == 16
+
+            source = temp_path / "source.bin"
+            source.write_bytes(os.urandom(2 * 1024 * 1024 + 123))
+            task = make_task(source, temp_path / "dest.bin")
+            async_engine.copy_file(task, options=engine.options())
+            assert Path(task["destination"]).read_bytes() == source.read_bytes()
+            print("✓ Reconfigure applies a new async queue depth")
+        finally:
+            engine.close()
+
+    return True
+
+
+def test_rate_limits():
+    """Test per-task and per-destination bandwidth limits and the time-of-day schedule"""
+    print("\nTesting bandwidth limits...")
+
+    schedule = copy_engine.parse_bandwidth_schedule("22:00-06:00=0, 08:00-18:00=20")
+    throttle = copy_engine.Throttle(global_rate_mb=5, schedule=schedule)
+    at = lambda hour: time.struct_time((2026, 1, 1, hour, 30, 0, 3, 1, -1))
+    assert throttle.current_global_rate(at(23)) == 0
+    assert throttle.current_global_rate(at(3)) == 0
+    assert throttle.current_global_rate(at(9)) == 20 * 1024 * 1024
+    assert throttle.current_global_rate(at(19)) == 5 * 1024 * 1024
+    for bad in ("25:00-06:00=1", "22:00=1", "08:00-09:00=-1"):
+        try:
+            copy_engine.parse_bandwidth_schedule(bad)
+            assert False, bad
+        except ValueError:
+            pass
+    print("✓ Schedule windows, including ones past midnight, pick the global rate")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        source = temp_path / "source.bin"
+        source.write_bytes(os.urandom(2 * 1024 * 1024 + 512 * 1024))
+
+        # A new task starts with an empty bucket: 2.5MB at 1MB/s takes about 2.5 seconds
+        task = make_task(source, temp_path / "task_limited.bin")
+        task["rate_limit_mb"] = 1
+        started = time.monotonic()
+        copy_engine.copy_file(task, 256 * 1024)
+        elapsed = time.monotonic() - started
+        assert Path(task["destination"]).read_bytes() == source.read_bytes()
+        assert elapsed >= 2, elapsed
+        print(f"✓ Per-task limit held the copy to {elapsed:.1f}s")
+
+        # A destination limit lifted while the copy waits takes effect immediately
+        limited = temp_path / "limited"
+        limited.mkdir()
+        throttle = copy_engine.Throttle(
+            destination_limits=copy_engine.parse_destination_limits(f"{limited}=0.25")
+        )
+        task = make_task(source, limited / "dest.bin")
+        assert len(throttle.limiters_for(task)) == 2
+        assert len(throttle.limiters_for(make_task(source, temp_path / "other.bin"))) == 1
+        timer = threading.Timer(0.3, throttle.configure)
+        timer.start()
+        started = time.monotonic()
+        copy_engine.copy_file(task, 256 * 1024, options=copy_engine.CopyOptions(throttle=throttle))
+        elapsed = time.monotonic() - started
+        timer.join()
+        assert Path(task["destination"]).read_bytes() == source.read_bytes()
+        assert elapsed < 2, elapsed
+        print("✓ Destination limit applied and lifted live")
+
+    return True
+
+
+def test_pause_releases_worker():
+    """Test that a checkpointed task paused like a cancel returns at once and resumes in place"""
+    print("\nTesting pause with checkpoint...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        source = temp_path / "source.bin"
+        source.write_bytes(os.urandom(3 * 1024 * 1024))
+        store = copy_engine.CheckpointStore(str(temp_path / "checkpoints"), interval=256 * 1024)
+        # The read/write loop moves small chunks; a kernel copy would take the file in one call
+        options = copy_engine.CopyOptions(checkpoints=store, zero_copy=False)
+
+        # Slow the copy down so the pause lands midway
+        task = make_task(source, temp_path / "dest.bin")
+        task["rate_limit_mb"] = 2
+
+        def pause_midway():
+            if task["copied"] >= 1024 * 1024 and not task["paused"]:
+                task.update(paused=True, suspended=True, cancelled=True)
+
+        copy_engine.copy_file(task, 256 * 1024, pause_midway, update_interval=0, options=options)
+        assert task["copied"] < task["size"]
+        assert store.exists(task["source"], task["destination"])
+        print("✓ Paused copy returned its worker and kept its checkpoint")
+
+        # Resume: the checkpointed prefix is counted again but not throttled again
+        task.update(paused=False, suspended=False, cancelled=False, copied=0, rate_limit_mb=0)
+        copy_engine.copy_file(task, 256 * 1024, options=options)
+        assert Path(task["destination"]).read_bytes() == source.read_bytes()
+        assert task["copied"] == task["size"]
+        assert not store.exists(task["source"], task["destination"])
+        print("✓ Resumed copy finished from its checkpoint")
+
+    return True
+
+
+def test_copy_task():
+    """Test the slotted task: key access, state labels and size against a dict"""
+    print("\nTesting copy task...")
+
+    task = copy_engine.CopyTask("/data/photos/", "/backup/photos", 1000, task_id=7)
+    assert task["filename"] == "photos" and task.get("priority") == 0
+    assert task["state"] is copy_engine.TaskState.PENDING and task["status"] == "⏳ Pending"
+    task.update(state=copy_engine.TaskState.ERROR, error_message="Insufficient disk space")
+    assert task["status"] == "❌ Error: Insufficient disk space"
+    task["state"] = copy_engine.TaskState.RETRYING
+    task["retry_count"] = 2
+    assert task["status"] == "🔄 Retry 2"
+    print("✓ Status labels come from the state")
+
+    for key in ("status", "no_such_field", "get"):
+        try:
+            task[key] = 1
+            assert False, f"{key} should not be writable"
+        except KeyError:
+            pass
+    assert not hasattr(task, "__dict__") and task.get("no_such_field", "x") == "x"
+
+    fields = {name: task[name] for name in copy_engine.CopyTask.__slots__}
+    assert sys.getsizeof(task) * 3 < sys.getsizeof(fields)
+    print("✓ Unknown keys refused; no per-task dict")
+
+    return True
+
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Persian File Copier Pro - Copy Engine Tests")
+    print("=" * 50)
+
+    tests = [
+        test_kernel_copy,
+        test_readwrite_fallback,
+        test_cancelled_copy,
+        test_durability_policies,
+        test_buffer_pool,
+        test_striped_copy,
+        test_copy_tree,
+        test_preallocation,
+        test_page_cache_hints,
+        test_direct_io_copy,
+        test_mmap_copy,
+        test_adaptive_buffer,
+        test_streaming_hash,
+        test_verified_fast_paths,
+        test_verify_tree,
+        test_checkpoint_resume,
+        test_checkpoint_fast_paths,
+        test_delta_update,
+        test_sync_tree,
+        test_free_space_check,
+        test_async_engine,
+        test_rate_limits,
+        test_pause_releases_worker,
+        test_copy_task
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"✗ Test {test.__name__} failed with exception: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"Test Results: {passed} passed, {failed} failed")
+    print("=" * 50)
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
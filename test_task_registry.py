@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Test script for the Persian File Copier Pro task registry
+Checks the running progress totals without requiring a GUI display
+"""
+
+import sys
+import os
+
+# Add current directory to path to import the registry
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import task_registry
+from copy_engine import CopyTask, TaskState
+
+
+def make_task(task_id, size, state=TaskState.PENDING):
+    return CopyTask(f"/source/{task_id}", f"/dest/{task_id}", size, task_id, state)
+
+
+def assert_totals_match(registry):
+    """The running totals must equal a full re-count"""
+    assert registry.total_size == sum(task["size"] for task in registry)
+    assert registry.total_copied == sum(task["copied"] for task in registry)
+    counts = {}
+    for task in registry:
+        counts[task.state] = counts.get(task.state, 0) + 1
+    assert registry.state_counts == counts, (registry.state_counts, counts)
+
+
+def test_running_totals():
+    """Test that refresh folds field changes into the totals"""
+    print("Testing running totals...")
+
+    registry = task_registry.TaskRegistry()
+    for i in range(5):
+        registry.append(make_task(i, 1000))
+    assert registry.total_size == 5000 and registry.count(TaskState.PENDING) == 5
+
+    task = registry[2]
+    task["copied"] = 400
+    task.state = TaskState.RUNNING
+    assert registry.total_copied == 0  # Not counted until refreshed
+    registry.refresh(task)
+    assert registry.total_copied == 400 and registry.count(TaskState.RUNNING) == 1
+    assert_totals_match(registry)
+
+    task["copied"] = 1000
+    task.state = TaskState.COMPLETED
+    registry.refresh(task)
+    registry.refresh(task)  # Refreshing twice counts once
+    assert registry.progress == 0.2
+    assert_totals_match(registry)
+    print("✓ Totals follow refreshed tasks")
+
+    return True
+
+
+def test_removal():
+    """Test that removing tasks takes their last counted values out of the totals"""
+    print("\nTesting removal...")
+
+    registry = task_registry.TaskRegistry()
+    for i in range(6):
+        registry.append(make_task(i, 100 * (i + 1), TaskState.COMPLETED if i % 2 else TaskState.PENDING))
+
+    removed = registry.remove_where(lambda task: task.state is TaskState.COMPLETED)
+    assert removed == 3 and len(registry) == 3
+    assert_totals_match(registry)
+
+    popped = registry.pop(0)
+    del registry[0]
+    registry.refresh(popped)  # No longer registered - ignored
+    assert len(registry) == 1
+    assert_totals_match(registry)
+
+    registry.swap(0, 0)
+    registry.clear()
+    assert registry.total_size == 0 and not registry.state_counts and registry.progress == 0.0
+    print("✓ Removed tasks leave the totals")
+
+    return True
+
+
+def test_indexes():
+    """Test lookups by id, path and state, and that ids survive reordering and removal"""
+    print("\nTesting indexes...")
+
+    registry = task_registry.TaskRegistry()
+    for _ in range(4):
+        task_id = registry.new_id()
+        registry.append(make_task(task_id, 100))
+    assert [task.id for task in registry] == [0, 1, 2, 3]
+
+    assert registry.get(2).source == "/source/2" and registry.get(9) is None
+    assert registry.find("/source/3", "/dest/3") is registry.get(3)
+    assert registry.find("/source/3", "/dest/elsewhere") is None
+    print("✓ Tasks found by id and by source and destination")
+
+    registry.swap(0, 1)
+    assert [task.id for task in registry] == [1, 0, 2, 3]
+    assert registry.position(registry.get(0)) == 1
+
+    first = registry.get(1)
+    first.state = TaskState.COMPLETED
+    registry.refresh(first)
+    assert registry.with_state(TaskState.COMPLETED) == [first]
+    registry.remove_where(lambda task: task.state is TaskState.COMPLETED)
+    assert registry.get(1) is None and registry.find("/source/1", "/dest/1") is None
+    assert registry.position(registry.get(3)) == 2 and registry.position(first) == len(registry)
+    assert_totals_match(registry)
+
+    assert registry.new_id() == 4  # Ids are never handed out twice
+    try:
+        registry.append(make_task(0, 100))
+        assert False, "Duplicate id should be refused"
+    except ValueError:
+        pass
+    print("✓ Ids stay put through swaps and removals")
+
+    return True
+
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Persian File Copier Pro - Task Registry Tests")
+    print("=" * 50)
+
+    tests = [
+        test_running_totals,
+        test_removal,
+        test_indexes
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"✗ Test {test.__name__} failed with exception: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"Test Results: {passed} passed, {failed} failed")
+    print("=" * 50)
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
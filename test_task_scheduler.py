@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Test script for the Persian File Copier Pro task scheduler
+Checks per-device concurrency limits without requiring a GUI display
+"""
+
+import sys
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add current directory to path to import the scheduler
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import task_scheduler
+
+
+def make_scheduler(temp_dir, executor, **kwargs):
+    """Scheduler over two fake drives: an HDD and an SSD mounted inside temp_dir"""
+    hdd = os.path.join(temp_dir, "hdd")
+    ssd = os.path.join(temp_dir, "ssd")
+    os.makedirs(hdd)
+    os.makedirs(ssd)
+    # Fake devices have no sysfs entries; the fstype field carries the kind instead
+    drives = [
+        {"device": "/dev/fake-hdd", "mountpoint": hdd, "fstype": "hdd"},
+        {"device": "/dev/fake-ssd", "mountpoint": ssd, "fstype": "ssd"},
+        {"device": "/dev/fake-root", "mountpoint": temp_dir, "fstype": "ssd"}
+    ]
+    scheduler = task_scheduler.DeviceScheduler(
+        executor,
+        lambda: drives,
+        kind_of=lambda disk, fstype: fstype,
+        **kwargs
+    )
+    return scheduler, hdd, ssd
+
+
+def run_tracked(scheduler, tasks):
+    """Run tasks that sleep briefly and return the peak concurrency seen per tag"""
+    running = {}
+    peaks = {}
+    lock = threading.Lock()
+
+    def work(task):
+        with lock:
+            running[task["tag"]] = running.get(task["tag"], 0) + 1
+            peaks[task["tag"]] = max(peaks.get(task["tag"], 0), running[task["tag"]])
+        time.sleep(0.05)
+        with lock:
+            running[task["tag"]] -= 1
+        return task["tag"]
+
+    futures = [scheduler.submit(task, work) for task in tasks]
+    results = [future.result(timeout=10) for future in futures]
+    assert results == [task["tag"] for task in tasks]
+    return peaks
+
+
+def test_device_mapping():
+    """Test that paths map to the drive with the longest matching mount point"""
+    print("Testing device mapping...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            scheduler, hdd, ssd = make_scheduler(temp_dir, executor)
+            assert scheduler.device_for(os.path.join(hdd, "a", "b.txt")) == ("/dev/fake-hdd", "hdd")
+            assert scheduler.device_for(os.path.join(ssd, "c.txt")) == ("/dev/fake-ssd", "ssd")
+            assert scheduler.device_for(os.path.join(temp_dir, "other")) == ("/dev/fake-root", "ssd")
+            print("✓ Paths mapped to their drives")
+
+            task = {"source": os.path.join(hdd, "x"), "destination": os.path.join(hdd, "y")}
+            assert len(scheduler.devices_for(task)) == 1
+            print("✓ Copy within one disk uses a single slot")
+
+    return True
+
+
+def test_device_limits():
+    """Test that tasks on the same HDD run one at a time while the SSD runs several"""
+    print("\nTesting per-device limits...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            waiting = []
+            scheduler, hdd, ssd = make_scheduler(temp_dir, executor, limits={"hdd": 1, "ssd": 3},
+                                                 on_wait=waiting.append)
+            tasks = []
+            for i in range(4):
+                tasks.append({"tag": "hdd", "source": os.path.join(hdd, f"s{i}"),
+                              "destination": os.path.join(hdd, f"d{i}")})
+                tasks.append({"tag": "ssd", "source": os.path.join(ssd, f"s{i}"),
+                              "destination": os.path.join(ssd, f"d{i}")})
+
+            peaks = run_tracked(scheduler, tasks)
+            assert peaks["hdd"] == 1, peaks
+            assert 1 < peaks["ssd"] <= 3, peaks
+            assert any(task["tag"] == "hdd" for task in waiting)
+            print(f"✓ Peak concurrency HDD={peaks['hdd']}, SSD={peaks['ssd']}")
+
+            assert not scheduler.pending and not any(scheduler.active.values())
+            print("✓ All slots released")
+
+    return True
+
+
+def test_cancel_waiting_task():
+    """Test that a task cancelled while waiting never runs"""
+    print("\nTesting cancellation of waiting tasks...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            scheduler, hdd, _ = make_scheduler(temp_dir, executor, limits={"hdd": 1})
+            release = threading.Event()
+            ran = []
+
+            def work(task):
+                ran.append(task["tag"])
+                release.wait(5)
+
+            first = {"tag": "first", "source": os.path.join(hdd, "a"), "destination": os.path.join(hdd, "b")}
+            second = {"tag": "second", "source": os.path.join(hdd, "c"), "destination": os.path.join(hdd, "d")}
+            first_future = scheduler.submit(first, work)
+            second_future = scheduler.submit(second, work)
+            assert scheduler.is_waiting(second)
+            assert scheduler.submit(second, work) is second_future  # No duplicate queue entries
+            assert second_future.cancel()
+            release.set()
+            first_future.result(timeout=5)
+            time.sleep(0.1)
+            assert ran == ["first"]
+            print("✓ Cancelled waiting task was dropped")
+
+    return True
+
+
+def test_priority_queue():
+    """Test that only max_running tasks start and the rest follow priority and queue order"""
+    print("\nTesting priority queue...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            positions = {}
+            callers = []
+
+            def order_of(task):
+                callers.append(threading.current_thread())
+                return positions[task["tag"]]
+
+            scheduler, _, ssd = make_scheduler(temp_dir, executor, max_running=1, order_of=order_of)
+            release = threading.Event()
+            ran = []
+
+            def work(task):
+                ran.append(task["tag"])
+                if task["tag"] == "long":
+                    release.wait(5)
+
+            tasks = {}
+            for position, tag in enumerate(["long", "a", "b", "c"]):
+                positions[tag] = position
+                tasks[tag] = {"tag": tag, "priority": 0, "source": os.path.join(ssd, tag),
+                              "destination": os.path.join(ssd, tag + ".copy")}
+            futures = [scheduler.submit(task, work) for task in tasks.values()]
+            assert scheduler.running == 1 and len(scheduler.pending) == 3
+            print("✓ Only one task handed to the workers")
+
+            # Move "b" to the end of the list and make "c" urgent
+            positions["b"], positions["c"] = 3, 2
+            tasks["c"]["priority"] = 1
+            scheduler.reprioritize()
+            release.set()
+            for future in futures:
+                future.result(timeout=5)
+            assert ran == ["long", "c", "a", "b"], ran
+            print("✓ Waiting tasks ran in priority and queue order")
+            assert all(caller is threading.main_thread() for caller in callers)
+            print("✓ Queue positions read only on the submitting thread")
+
+    return True
+
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Persian File Copier Pro - Task Scheduler Tests")
+    print("=" * 50)
+
+    tests = [
+        test_device_mapping,
+        test_device_limits,
+        test_cancel_waiting_task,
+        test_priority_queue
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"✗ Test {test.__name__} failed with exception: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"Test Results: {passed} passed, {failed} failed")
+    print("=" * 50)
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)